@@ -1,11 +1,12 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from py3dtiles import TemporalBoundingVolume
 from py3dtiles import TemporalTileSet
 from py3dtiles import TemporalTransaction
 from py3dtiles import TemporalPrimaryTransaction, TemporalTransactionAggregate
-from py3dtiles import TriangleSoup
 
+from ..Common import triangle_soup_from_wkb_multipolygon
 from .temporal_utils import debug_msg
 from .temporal_graph import TemporalGraph, Edge
 from .temporal_building import TemporalBuilding
@@ -14,7 +15,7 @@ from .citym_cityobject import CityMCityObjects
 from .citym_building import CityMBuildings
 from .CityTiler import CityTiler
 
-from .database_accesses import open_data_bases
+from .database_accesses import open_data_bases, iterate_query, set_streaming_itersize
 
 
 class CityTemporalTiler(CityTiler):
@@ -56,25 +57,49 @@ class CityTemporalTiler(CityTiler):
                 print("Exiting.")
                 sys.exit(1)
 
+    def get_worker_initializer(self):
+        """
+        The geometries are retrieved from the databases before the tiles are created,
+        so the processes creating tiles don't need a database connection.
+        :return: None
+        """
+        return None
+
     def get_surfaces_merged(self, cursors, cityobjects, objects_type):
         """
         Get the surfaces of all the cityobjects and transform them into TriangleSoup
         Surfaces of the same cityObject are merged into one geometry
+        The databases (one per time stamp) are queried concurrently, each one by its own thread.
         """
-        cityobjects_with_geom = list()
-        for cityobject in cityobjects:
+        cityobjects_with_time_stamp_key = dict()
+        for index, cityobject in enumerate(cityobjects):
             try:
-                id = '(' + str(cityobject.get_database_id()) + ')'
                 time_stamp = cityobject.get_time_stamp()
-                cursors[time_stamp].execute(objects_type.sql_query_geometries(id, False))
-                for t in cursors[time_stamp].fetchall():
-                    geom_as_string = t[1]
-                    cityobject.geom = TriangleSoup.from_wkb_multipolygon(geom_as_string)
-                    cityobject.set_box()
-                    cityobjects_with_geom.append(cityobject)
             except AttributeError:
                 continue
-        return objects_type(cityobjects_with_geom)
+            cityobjects_with_time_stamp_key.setdefault(time_stamp, list()).append((index, cityobject))
+
+        def get_surfaces_of_time_stamp(time_stamp):
+            cityobjects_with_geom = list()
+            for index, cityobject in cityobjects_with_time_stamp_key[time_stamp]:
+                try:
+                    id = '(' + str(cityobject.get_database_id()) + ')'
+                    for t in iterate_query(cursors[time_stamp], objects_type.sql_query_geometries(id, False)):
+                        geom_as_string = t[1]
+                        cityobject.geom = triangle_soup_from_wkb_multipolygon(geom_as_string)
+                        cityobject.set_box()
+                        cityobjects_with_geom.append((index, cityobject))
+                except AttributeError:
+                    continue
+            return cityobjects_with_geom
+
+        cityobjects_with_geom = list()
+        with ThreadPoolExecutor(max(1, len(cityobjects_with_time_stamp_key))) as executor:
+            for result in executor.map(get_surfaces_of_time_stamp, cityobjects_with_time_stamp_key):
+                cityobjects_with_geom.extend(result)
+        # Keep the order of the cityobjects
+        cityobjects_with_geom.sort(key=lambda indexed_cityobject: indexed_cityobject[0])
+        return objects_type([cityobject for _, cityobject in cityobjects_with_geom])
 
     def from_3dcitydb(self, cursors, buildings):
         """
@@ -304,6 +329,7 @@ def main():
             sys.exit(1)
 
     # Extract the information form the databases
+    set_streaming_itersize(cli_args.itersize)
     cursors = open_data_bases(cli_args.paths)
     time_stamped_cursors = dict()
     for index in range(len(cursors)):
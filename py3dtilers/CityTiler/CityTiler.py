@@ -6,7 +6,18 @@ from .citym_building import CityMBuildings
 from .citym_relief import CityMReliefs
 from .citym_waterbody import CityMWaterBodies
 from .citym_bridge import CityMBridges
-from .database_accesses import open_data_base
+from .database_accesses import open_data_base, open_connection_pool, set_streaming_itersize
+
+
+def open_worker_data_base(db_config_file_path):
+    """
+    Open a new database connection in a worker process.
+    A forked process can't share the connection of its parent, so each worker uses its own cursor.
+    :param db_config_file_path: the path to the database configuration file
+    """
+    # Keep a reference to the inherited cursor, otherwise its destruction would close the connection of the parent
+    open_worker_data_base.parent_cursor = CityMCityObjects.get_cursor()
+    CityMCityObjects.set_cursor(open_data_base(db_config_file_path))
 
 
 class CityTiler(Tiler):
@@ -43,6 +54,18 @@ class CityTiler(Tiler):
                                  action='store_true',
                                  help='When defined, add colors to the features depending on their CityGML objectclass.')
 
+        self.parser.add_argument('--geometry_chunk_size',
+                                 nargs='?',
+                                 type=int,
+                                 help='Set the maximum number of cityObjects whose geometries are retrieved by a single query.\
+                                     The value must be an integer.')
+
+        self.parser.add_argument('--itersize',
+                                 nargs='?',
+                                 type=int,
+                                 help='When defined, the results of the queries are streamed with server-side cursors.\
+                                     The flag must be followed by the number of rows fetched at once.')
+
     def get_output_dir(self):
         """
         Return the directory name for the tileset.
@@ -72,28 +95,59 @@ class CityTiler(Tiler):
             return self.args.kd_tree_max
         return int(self.DEFAULT_KD_TREE_MAX / 20) if self.args.with_texture else self.DEFAULT_KD_TREE_MAX
 
+    def get_worker_initializer(self):
+        """
+        Each process creating tiles opens its own connection to the database.
+        :return: a (function, arguments) tuple
+        """
+        return open_worker_data_base, (self.files[0],)
+
+    def get_geometry_workers(self):
+        """
+        When the connection pool contains several connections, the geometries of several tiles
+        are fetched concurrently, each thread using its own connection of the pool.
+        :return: a (number of threads, function, arguments) tuple or None
+        """
+        connection_pool = CityMCityObjects.get_connection_pool()
+        if connection_pool is None or connection_pool.maxconn <= 1:
+            return None
+        return connection_pool.maxconn, CityMCityObjects.thread_cursor, ()
+
     def set_features_centroid(self, cursor, cityobjects, objects_type):
         """
         Set the centroid of each CityObject. Only the CityObjects with a centroid (and a geometry) are kept.
+        The centroids of all the CityObjects are computed by a single query.
         :param cursor: a database access cursor.
         :param cityobjects: the CityGML objects found in the database.
         :param objects_type: a class name among CityMCityObject derived classes.
         """
+        # The CityObjects are all the objects of this type in the database, so the query doesn't filter the ids
+        centroids = CityMCityObjects.retrieve_centroids(cursor, objects_type, cityobjects)
+        has_centroid = ~np.isnan(centroids).any(axis=1)
         cityobjects_with_centroid = list()
-        for cityobject in cityobjects:
-            try:
-                id = cityobject.get_database_id()
-                cursor.execute(objects_type.sql_query_centroid(id))
-                centroid = cursor.fetchall()
-                if centroid is not None:
-                    cityobject.centroid = np.array([centroid[0][0], centroid[0][1], centroid[0][2]])
-                    cityobjects_with_centroid.append(cityobject)
-            except AttributeError:
-                continue
-            except ValueError:
-                continue
+        for cityobject, centroid, keep in zip(cityobjects, centroids, has_centroid):
+            if keep:
+                cityobject.centroid = centroid
+                cityobjects_with_centroid.append(cityobject)
         cityobjects.set_features(cityobjects_with_centroid)
 
+    def set_features_size_estimate(self, cursor, cityobjects, objects_type):
+        """
+        Set the estimated size of each CityObject, used to balance the tiles by size (--max_tile_size).
+        The geometries are only retrieved when the tiles are created, so the sizes of all the CityObjects
+        are estimated by a single query.
+        :param cursor: a database access cursor.
+        :param cityobjects: the CityGML objects found in the database.
+        :param objects_type: a class name among CityMCityObject derived classes.
+        """
+        sizes = CityMCityObjects.retrieve_size_estimates(cursor, objects_type, cityobjects, self.args.with_texture)
+        for cityobject, size in zip(cityobjects, sizes):
+            if not np.isnan(size):
+                cityobject.size_estimate = size
+        if self.args.with_texture:
+            # The textures are still bounded by the number of textured features in each tile (see get_kd_tree_max)
+            print("The size of the textures can't be estimated before they are retrieved, --max_tile_size only limits the size of the geometries.")
+
     def from_3dcitydb(self, cursor, objects_type):
         """
         Create a 3DTiles tileset from the objects contained in a database.
@@ -111,6 +165,8 @@ class CityTiler(Tiler):
             raise ValueError(f'The database does not contain any {objects_type.__name__} object')
 
         self.set_features_centroid(cursor, cityobjects, objects_type)
+        if self.get_max_tile_size() is not None:
+            self.set_features_size_estimate(cursor, cityobjects, objects_type)
 
         extension_name = None
         if CityMBuildings.is_bth_set():
@@ -139,9 +195,14 @@ def main():
     elif args.type == "bridge":
         objects_type = CityMBridges
 
+    if args.geometry_chunk_size is not None:
+        CityMCityObjects.set_geometry_chunk_size(args.geometry_chunk_size)
+    set_streaming_itersize(args.itersize)
+
     print('Connecting to database...')
     cursor = open_data_base(city_tiler.files[0])
     objects_type.set_cursor(cursor)
+    objects_type.set_connection_pool(open_connection_pool(city_tiler.files[0]))
 
     tileset = city_tiler.from_3dcitydb(cursor, objects_type)
 
@@ -157,6 +218,7 @@ def main():
     tileset.add_asset_extras(origin)
 
     cursor.close()
+    objects_type.get_connection_pool().closeall()
     tileset.write_as_json(city_tiler.get_output_dir())
 
 
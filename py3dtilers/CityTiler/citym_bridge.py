@@ -67,7 +67,7 @@ class CityMBridges(CityMCityObjects):
             query = \
                 "SELECT surface_geometry.id, ST_AsBinary(ST_Multi( " + \
                 "surface_geometry.geometry)), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, bridge.bridge_root_id " + \
                 "FROM citydb.surface_geometry JOIN citydb.bridge " + \
                 "ON surface_geometry.root_id=bridge.lod2_multi_surface_id " + \
                 "JOIN citydb.objectclass ON bridge.objectclass_id = objectclass.id " + \
@@ -76,7 +76,7 @@ class CityMBridges(CityMCityObjects):
             query = \
                 "SELECT bridge.bridge_root_id, ST_AsBinary(ST_Multi(ST_Collect( " + \
                 "surface_geometry.geometry))), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, bridge.bridge_root_id " + \
                 "FROM citydb.surface_geometry JOIN citydb.bridge " + \
                 "ON surface_geometry.root_id=bridge.lod2_multi_surface_id " + \
                 "JOIN citydb.objectclass ON bridge.objectclass_id = objectclass.id " + \
@@ -86,26 +86,35 @@ class CityMBridges(CityMCityObjects):
         return query
 
     @staticmethod
-    def sql_query_centroid(id):
+    def sql_surface_geometry_tables():
         """
-        param id: the ID of the cityGML object
-        return: the [x, y, z] coordinates of the centroid of the cityGML object
+        :return: the column containing the database id of the bridges, and the tables (and their joins)
+                linking the bridges to their surface geometries
         """
+        tables = \
+            "citydb.surface_geometry JOIN citydb.bridge " + \
+            "ON surface_geometry.root_id=bridge.lod2_multi_surface_id"
+        return "bridge.bridge_root_id", tables
 
-        query = \
-            "SELECT " + \
-            "ST_X(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Y(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Z(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))) " + \
-            "FROM citydb.surface_geometry JOIN citydb.bridge " + \
-            "ON surface_geometry.root_id=bridge.lod2_multi_surface_id " + \
-            "WHERE bridge.bridge_root_id = " + str(id) + \
-            " GROUP BY bridge.bridge_root_id"
+    @staticmethod
+    def sql_query_centroids(bridges_ids=None):
+        """
+        :param bridges_ids: a formatted list of database ids of the bridges whose centroids are sought.
+                        When None, the centroids of all the bridges are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMBridges.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_centroids_of(root_id_column, tables, bridges_ids)
 
-        return query
+    @staticmethod
+    def sql_query_sizes(bridges_ids=None):
+        """
+        :param bridges_ids: a formatted list of database ids of the bridges whose sizes are sought.
+                        When None, the sizes of all the bridges are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMBridges.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_sizes_of(root_id_column, tables, bridges_ids)
 
     @staticmethod
     def sql_query_geometries_with_texture_coordinates(bridges_ids_arg):
@@ -122,7 +131,7 @@ class CityMBridges(CityMCityObjects):
                  "ST_AsBinary(ST_Multi(surface_geometry.geometry)) as geom , "
                  "ST_AsBinary(ST_Multi(ST_Translate("
                  "ST_Scale(textureparam.texture_coordinates, 1, -1), 0, 1))) as uvs, "
-                 "tex_image_uri AS uri FROM citydb.bridge JOIN "
+                 "tex_image_uri AS uri, bridge.bridge_root_id FROM citydb.bridge JOIN "
                  "citydb.surface_geometry ON surface_geometry.root_id="
                  "bridge.lod2_multi_surface_id JOIN citydb.textureparam ON "
                  "textureparam.surface_geometry_id=surface_geometry.id "
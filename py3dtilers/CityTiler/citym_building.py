@@ -96,7 +96,7 @@ class CityMBuildings(CityMCityObjects):
             query = \
                 "SELECT surface_geometry.id, ST_AsBinary(ST_Multi( " + \
                 "surface_geometry.geometry)), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, building.building_root_id " + \
                 "FROM citydb.surface_geometry JOIN citydb.thematic_surface " + \
                 "ON surface_geometry.root_id=thematic_surface.lod2_multi_surface_id " + \
                 "JOIN citydb.building ON thematic_surface.building_id = building.id " + \
@@ -106,7 +106,7 @@ class CityMBuildings(CityMCityObjects):
             query = \
                 "SELECT building.building_root_id, ST_AsBinary(ST_Multi(ST_Collect( " + \
                 "surface_geometry.geometry))), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, building.building_root_id " + \
                 "FROM citydb.surface_geometry JOIN citydb.thematic_surface " + \
                 "ON surface_geometry.root_id=thematic_surface.lod2_multi_surface_id " + \
                 "JOIN citydb.building ON thematic_surface.building_id = building.id " + \
@@ -130,7 +130,7 @@ class CityMBuildings(CityMCityObjects):
         query = ("SELECT surface_geometry.id, "
                  "ST_AsBinary(ST_Multi(surface_geometry.geometry)) as geom , "
                  "ST_AsBinary(ST_Multi(ST_Translate(ST_Scale(textureparam.texture_coordinates, 1, -1), 0, 1))) as uvs, "
-                 "tex_image_uri AS uri FROM citydb.building JOIN "
+                 "tex_image_uri AS uri, building.building_root_id FROM citydb.building JOIN "
                  "citydb.thematic_surface ON building.id=thematic_surface.building_id JOIN "
                  "citydb.surface_geometry ON surface_geometry.root_id="
                  "thematic_surface.lod2_multi_surface_id JOIN citydb.textureparam ON "
@@ -141,27 +141,36 @@ class CityMBuildings(CityMCityObjects):
         return query
 
     @staticmethod
-    def sql_query_centroid(id):
+    def sql_surface_geometry_tables():
         """
-        param id: the ID of the cityGML object
-        return: the [x, y, z] coordinates of the centroid of the cityGML object
+        :return: the column containing the database id of the buildings, and the tables (and their joins)
+                linking the buildings to their surface geometries
         """
-
-        query = \
-            "SELECT " + \
-            "ST_X(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Y(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Z(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))) " + \
-            "FROM citydb.surface_geometry JOIN citydb.thematic_surface " + \
+        tables = \
+            "citydb.surface_geometry JOIN citydb.thematic_surface " + \
             "ON surface_geometry.root_id=thematic_surface.lod2_multi_surface_id " + \
-            "JOIN citydb.building ON thematic_surface.building_id = building.id " + \
-            "WHERE building.building_root_id = " + str(id) + \
-            " GROUP BY building.building_root_id"
+            "JOIN citydb.building ON thematic_surface.building_id = building.id"
+        return "building.building_root_id", tables
 
-        return query
+    @staticmethod
+    def sql_query_centroids(buildings_ids=None):
+        """
+        :param buildings_ids: a formatted list of database ids of the buildings whose centroids are sought.
+                        When None, the centroids of all the buildings are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMBuildings.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_centroids_of(root_id_column, tables, buildings_ids)
+
+    @staticmethod
+    def sql_query_sizes(buildings_ids=None):
+        """
+        :param buildings_ids: a formatted list of database ids of the buildings whose sizes are sought.
+                        When None, the sizes of all the buildings are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMBuildings.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_sizes_of(root_id_column, tables, buildings_ids)
 
     @staticmethod
     def create_batch_table_extension(extension_name, ids=None, objects=None):
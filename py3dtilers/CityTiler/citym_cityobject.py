@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
+from contextlib import contextmanager
 from io import BytesIO
-from py3dtiles import TriangleSoup
+import numpy as np
+import threading
 import os
 
-from ..Common import Feature, FeatureList
+from ..Common import Feature, FeatureList, triangle_soup_from_wkb_multipolygon
 from ..Texture import Texture
+from .database_accesses import iterate_query
 
 
 class CityMCityObject(Feature):
@@ -53,19 +56,33 @@ class CityMCityObject(Feature):
         """
         return self.texture_uri is not None
 
+    def is_geom_in_database(self):
+        """
+        Return True if the geometry of the feature must be retrieved from the database.
+        :return: a boolean
+        """
+        return True
+
     def get_geom(self, user_arguments=None, feature_list=None, material_indexes=dict()):
         """
         Set the geometry of the feature.
         :return: a list of Feature
         """
         id = '(' + str(self.get_database_id()) + ')'
-        cursor = self.objects_type.get_cursor()
+        rows = self.objects_type.retrieve_geometries(self.objects_type.get_cursor(), id, self.objects_type, user_arguments)
+        return self.create_geoms_from_rows(rows, user_arguments, feature_list, material_indexes)
+
+    def create_geoms_from_rows(self, rows, user_arguments=None, feature_list=None, material_indexes=dict()):
+        """
+        Create the features from the rows returned by the geometry query of this object.
+        :param rows: the rows (id, geometry, classname or uvs, [texture uri]) of this object
+        :param user_arguments: the Namespace containing the arguments of the command line
+        :param feature_list: the FeatureList containing the feature
+        :param material_indexes: a dictionary with the surface classnames as keys and the material indexes as values
+        :return: a list of Feature
+        """
         cityobjects_with_geom = list()
-        if user_arguments.with_texture:
-            cursor.execute(self.objects_type.sql_query_geometries_with_texture_coordinates(id))
-        else:
-            cursor.execute(self.objects_type.sql_query_geometries(id, user_arguments.split_surfaces))
-        for t in cursor.fetchall():
+        for t in rows:
             try:
                 feature_id = t[0]
                 geom_as_string = t[1]
@@ -88,7 +105,7 @@ class CityMCityObject(Feature):
                                 feature_list.add_materials([material])
                             cityobject.material_index = material_indexes[surface_classname]
 
-                    cityobject.geom = TriangleSoup.from_wkb_multipolygon(geom_as_string, associated_data)
+                    cityobject.geom = triangle_soup_from_wkb_multipolygon(geom_as_string, associated_data)
                     if len(cityobject.geom.triangles[0]) > 0:
                         cityobject.set_box()
                         cityobject.centroid = self.centroid
@@ -107,6 +124,14 @@ class CityMCityObjects(FeatureList):
 
     gml_cursor = None
 
+    # A pool of connections used by the threads fetching geometries concurrently.
+    # Each of those threads has its own cursor, stored in thread_cursors
+    connection_pool = None
+    thread_cursors = threading.local()
+
+    # The maximum number of objects whose geometries are retrieved by a single query
+    geometry_chunk_size = 1000
+
     def __init__(self, cityMCityObjects=None):
         if self.color_config is None:
             config_path = os.path.join(os.path.dirname(__file__), "..", "Color", "citytiler_config.json")
@@ -123,11 +148,41 @@ class CityMCityObjects(FeatureList):
         for feature in self.get_features():
             uri = feature.texture_uri
             if uri not in uri_dict:
-                stream = self.get_image_from_binary(uri, self.__class__, CityMCityObjects.gml_cursor)
+                stream = self.get_image_from_binary(uri, self.__class__, CityMCityObjects.get_cursor())
                 uri_dict[uri] = Texture(stream)
-            texture_dict[feature.get_id()] = uri_dict[uri].get_cropped_texture_image(feature.geom.triangles[1])
+            texture_dict[feature.get_id()] = uri_dict[uri].get_cropped_texture_image(feature.get_data_as_array(0))
         return texture_dict
 
+    def set_features_geom(self, user_arguments=None):
+        """
+        Set the geometry of the features.
+        Keep only the features with geometry.
+        The geometries are retrieved with one query per chunk of features instead of one query per feature.
+        The rows are dispatched to the features by the root object id, which is the last column of each row.
+        """
+        features_with_geom = list()
+        material_indexes = dict()
+        chunk_size = CityMCityObjects.geometry_chunk_size
+        for i in range(0, len(self.features), chunk_size):
+            chunk = self.features[i:i + chunk_size]
+            geoms_with_id_key = dict()
+            for feature in chunk:
+                if feature.is_geom_in_database():
+                    geoms_with_id_key[feature.get_database_id()] = (feature, list())
+            if len(geoms_with_id_key) > 0:
+                ids_arg = '(' + ','.join([str(id) for id in geoms_with_id_key]) + ')'
+                # Each row is converted as soon as it is received, so only the triangles are kept in memory
+                for row in self.retrieve_geometries(self.get_cursor(), ids_arg, chunk[0].objects_type, user_arguments):
+                    if row[-1] in geoms_with_id_key:
+                        feature, geoms = geoms_with_id_key[row[-1]]
+                        geoms.extend(feature.create_geoms_from_rows([row], user_arguments, self, material_indexes))
+            for feature in chunk:
+                if feature.is_geom_in_database():
+                    features_with_geom.extend(geoms_with_id_key[feature.get_database_id()][1])
+                else:
+                    features_with_geom.extend(feature.get_geom(user_arguments, self, material_indexes))
+        self.set_features(features_with_geom)
+
     def filter(self, filter_function):
         """
         Filter the features. Keep only those accepted by the filter function.
@@ -148,9 +203,52 @@ class CityMCityObjects(FeatureList):
     def get_cursor():
         """
         Return the current cursor to be able to execute queries in the database.
+        In a thread with its own connection, return the cursor of this connection.
         :return: the cursor of the current database
         """
-        return CityMCityObjects.gml_cursor
+        cursor = getattr(CityMCityObjects.thread_cursors, 'cursor', None)
+        return cursor if cursor is not None else CityMCityObjects.gml_cursor
+
+    @staticmethod
+    def set_connection_pool(connection_pool):
+        """
+        Set the pool of connections used by the threads fetching geometries concurrently.
+        :param connection_pool: a psycopg2 ThreadedConnectionPool
+        """
+        CityMCityObjects.connection_pool = connection_pool
+
+    @staticmethod
+    def get_connection_pool():
+        """
+        Return the pool of connections used by the threads fetching geometries concurrently.
+        :return: a psycopg2 ThreadedConnectionPool or None
+        """
+        return CityMCityObjects.connection_pool
+
+    @staticmethod
+    @contextmanager
+    def thread_cursor():
+        """
+        Take a connection from the pool and use its cursor for the queries executed by the current thread.
+        The cursor is closed and the connection is given back to the pool on exit.
+        """
+        connection = CityMCityObjects.connection_pool.getconn()
+        cursor = connection.cursor()
+        CityMCityObjects.thread_cursors.cursor = cursor
+        try:
+            yield cursor
+        finally:
+            CityMCityObjects.thread_cursors.cursor = None
+            cursor.close()
+            CityMCityObjects.connection_pool.putconn(connection)
+
+    @staticmethod
+    def set_geometry_chunk_size(chunk_size):
+        """
+        Set the maximum number of objects whose geometries are retrieved by a single query.
+        :param chunk_size: a number greater than 0
+        """
+        CityMCityObjects.geometry_chunk_size = max(1, chunk_size)
 
     @staticmethod
     def sql_query_objects():
@@ -181,8 +279,6 @@ class CityMCityObjects(FeatureList):
             no_input = True
         else:
             no_input = False
-        cursor.execute(objects_type.sql_query_objects(cityobjects))
-
         if no_input:
             result_objects = objects_type()
             object_type = objects_type.object_type
@@ -193,7 +289,7 @@ class CityMCityObjects(FeatureList):
             for cityobject in cityobjects:
                 objects_with_gmlid_key[cityobject.get_gml_id()] = cityobject
 
-        for obj in cursor.fetchall():
+        for obj in iterate_query(cursor, objects_type.sql_query_objects(cityobjects)):
             object_id = obj[0]
             gml_id = obj[1]
             if no_input:
@@ -212,12 +308,29 @@ class CityMCityObjects(FeatureList):
     def sql_query_geometries():
         """
         Virtual method: all CityMCityObjects and childs classes instances should
-        implement this method.
+        implement this method. The last column of the rows must be the id of the
+        root object, used to dispatch the rows to the objects.
 
         :return: no return value.
         """
         pass
 
+    @staticmethod
+    def retrieve_geometries(cursor, objects_ids, objects_type, user_arguments):
+        """
+        :param cursor: a database access cursor
+        :param objects_ids: a formatted list of database ids, e.g. "(1,2,3)"
+        :param objects_type: a class name among CityMCityObject derived classes.
+                        For example, objects_type can be "CityMBuilding".
+        :param user_arguments: the Namespace containing the arguments of the command line
+        :return: an iterator over the rows containing the geometries of the objects
+        """
+        if user_arguments.with_texture:
+            query = objects_type.sql_query_geometries_with_texture_coordinates(objects_ids)
+        else:
+            query = objects_type.sql_query_geometries(objects_ids, user_arguments.split_surfaces)
+        return iterate_query(cursor, query)
+
     @staticmethod
     def sql_query_textures(image_uri):
         """
@@ -262,7 +375,7 @@ class CityMCityObjects(FeatureList):
         return stream
 
     @staticmethod
-    def sql_query_centroid():
+    def sql_query_centroids():
         """
         Virtual method: all CityMCityObjects and childs classes instances should
         implement this method.
@@ -271,6 +384,105 @@ class CityMCityObjects(FeatureList):
         """
         pass
 
+    @staticmethod
+    def sql_query_centroids_of(root_id_column, tables, objects_ids=None):
+        """
+        Create a query computing the centroids of several objects at once.
+        The centroid of an object is the point of its geometry which is the closest to its 2D centroid.
+        :param root_id_column: the column containing the database id of the objects
+        :param tables: the tables (and their joins) linking the objects to their surface geometries
+        :param objects_ids: a formatted list of database ids. When None, the centroids of all the objects are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        query = \
+            "SELECT root_id, ST_X(centroid), ST_Y(centroid), ST_Z(centroid) FROM (" + \
+            "SELECT root_id, ST_3DClosestPoint(geom, ST_Centroid(geom)) AS centroid FROM (" + \
+            "SELECT " + root_id_column + " AS root_id, " + \
+            "ST_Multi(ST_Collect(surface_geometry.geometry)) AS geom " + \
+            "FROM " + tables + " "
+        if objects_ids is not None:
+            query += "WHERE " + root_id_column + " IN " + objects_ids + " "
+        query += "GROUP BY " + root_id_column + ") AS objects) AS centroids"
+        return query
+
+    @staticmethod
+    def retrieve_centroids(cursor, objects_type, cityobjects, objects_ids=None):
+        """
+        Compute the centroids of the objects with a single query.
+        :param cursor: a database access cursor
+        :param objects_type: a class name among CityMCityObject derived classes.
+                        For example, objects_type can be "CityMBuilding".
+        :param cityobjects: the objects whose centroids are sought
+        :param objects_ids: a formatted list of database ids passed to the query.
+                        When None, the centroids of all the objects of this type are computed.
+        :return: a (n, 3) array aligned with the objects. The centroids not found in the database are NaN.
+        """
+        index_with_id_key = dict()
+        for index, cityobject in enumerate(cityobjects):
+            index_with_id_key[cityobject.get_database_id()] = index
+
+        centroids = np.full((len(cityobjects), 3), np.nan)
+        for row in iterate_query(cursor, objects_type.sql_query_centroids(objects_ids)):
+            index = index_with_id_key.get(row[0])
+            if index is not None:
+                centroids[index] = [np.nan if value is None else value for value in row[1:4]]
+        return centroids
+
+    @staticmethod
+    def sql_query_sizes():
+        """
+        Virtual method: all CityMCityObjects and childs classes instances should
+        implement this method.
+
+        :return: no return value.
+        """
+        pass
+
+    @staticmethod
+    def sql_query_sizes_of(root_id_column, tables, objects_ids=None):
+        """
+        Create a query counting the points and the polygons of the geometries of several objects at once.
+        :param root_id_column: the column containing the database id of the objects
+        :param tables: the tables (and their joins) linking the objects to their surface geometries
+        :param objects_ids: a formatted list of database ids. When None, the sizes of all the objects are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        query = \
+            "SELECT " + root_id_column + ", SUM(ST_NPoints(surface_geometry.geometry)), " + \
+            "COUNT(surface_geometry.geometry) " + \
+            "FROM " + tables + " "
+        if objects_ids is not None:
+            query += "WHERE " + root_id_column + " IN " + objects_ids + " "
+        query += "GROUP BY " + root_id_column
+        return query
+
+    @staticmethod
+    def retrieve_size_estimates(cursor, objects_type, cityobjects, with_texture=False, objects_ids=None):
+        """
+        Estimate the size of the objects in a tile with a single query, before their geometries are retrieved.
+        A polygon of n points (the first point being repeated at the end) is triangulated into n - 3 triangles.
+        :param cursor: a database access cursor
+        :param objects_type: a class name among CityMCityObject derived classes.
+                        For example, objects_type can be "CityMBuilding".
+        :param cityobjects: the objects whose sizes are sought
+        :param with_texture: True when the UVs of the vertices are written in the tiles
+        :param objects_ids: a formatted list of database ids passed to the query.
+                        When None, the sizes of all the objects of this type are computed.
+        :return: an array of sizes (in bytes) aligned with the objects. The sizes not found in the database are NaN.
+        """
+        index_with_id_key = dict()
+        for index, cityobject in enumerate(cityobjects):
+            index_with_id_key[cityobject.get_database_id()] = index
+
+        sizes = np.full(len(cityobjects), np.nan)
+        nb_data_components = 2 if with_texture else 0
+        for row in iterate_query(cursor, objects_type.sql_query_sizes(objects_ids)):
+            index = index_with_id_key.get(row[0])
+            if index is not None and row[1] is not None:
+                nb_triangles = max(int(row[1]) - 3 * int(row[2]), 0)
+                sizes[index] = Feature.get_size_of_triangles(nb_triangles, nb_data_components)
+        return sizes
+
     @staticmethod
     def sql_query_geometries_with_texture_coordinates():
         """
@@ -76,7 +76,7 @@ class CityMReliefs(CityMCityObjects):
         if split_surfaces:
             query = \
                 "SELECT relief_feature.id, ST_AsBinary(ST_Multi(surface_geometry.geometry)), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, relief_feature.id " + \
                 "FROM citydb.relief_feature JOIN citydb.relief_feat_to_rel_comp " + \
                 "ON relief_feature.id=relief_feat_to_rel_comp.relief_feature_id " + \
                 "JOIN citydb.tin_relief " + \
@@ -87,7 +87,7 @@ class CityMReliefs(CityMCityObjects):
         else:
             query = \
                 "SELECT relief_feature.id, ST_AsBinary(ST_Multi(ST_Collect(surface_geometry.geometry))), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, relief_feature.id " + \
                 "FROM citydb.relief_feature JOIN citydb.relief_feat_to_rel_comp " + \
                 "ON relief_feature.id=relief_feat_to_rel_comp.relief_feature_id " + \
                 "JOIN citydb.tin_relief " + \
@@ -111,7 +111,7 @@ class CityMReliefs(CityMCityObjects):
             ("SELECT surface_geometry.id, "
              "ST_AsBinary(ST_Multi(surface_geometry.geometry)) as geom, "
              "ST_AsBinary(ST_Multi(ST_Translate(ST_Scale(textureparam.texture_coordinates, 1, -1), 0, 1))) as uvs, "
-             "tex_image_uri AS uri "
+             "tex_image_uri AS uri, relief_feature.id "
              "FROM citydb.relief_feature JOIN citydb.relief_feat_to_rel_comp "
              "ON relief_feature.id=relief_feat_to_rel_comp.relief_feature_id "
              "JOIN citydb.tin_relief "
@@ -128,26 +128,35 @@ class CityMReliefs(CityMCityObjects):
         return query
 
     @staticmethod
-    def sql_query_centroid(id):
+    def sql_surface_geometry_tables():
         """
-        param id: the ID of the cityGML object
-        return: the [x, y, z] coordinates of the centroid of the cityGML object
+        :return: the column containing the database id of the reliefs, and the tables (and their joins)
+                linking the reliefs to their surface geometries
         """
-
-        query = \
-            "SELECT " + \
-            "ST_X(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Y(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Z(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))) " + \
-            "FROM citydb.relief_feature JOIN citydb.relief_feat_to_rel_comp " + \
+        tables = \
+            "citydb.relief_feature JOIN citydb.relief_feat_to_rel_comp " + \
             "ON relief_feature.id=relief_feat_to_rel_comp.relief_feature_id " + \
             "JOIN citydb.tin_relief " + \
             "ON relief_feat_to_rel_comp.relief_component_id=tin_relief.id " + \
-            "JOIN citydb.surface_geometry ON surface_geometry.root_id=tin_relief.surface_geometry_id " + \
-            "WHERE relief_feature.id = " + str(id) + \
-            " GROUP BY relief_feature.id"
+            "JOIN citydb.surface_geometry ON surface_geometry.root_id=tin_relief.surface_geometry_id"
+        return "relief_feature.id", tables
 
-        return query
+    @staticmethod
+    def sql_query_centroids(reliefs_ids=None):
+        """
+        :param reliefs_ids: a formatted list of database ids of the reliefs whose centroids are sought.
+                        When None, the centroids of all the reliefs are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMReliefs.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_centroids_of(root_id_column, tables, reliefs_ids)
+
+    @staticmethod
+    def sql_query_sizes(reliefs_ids=None):
+        """
+        :param reliefs_ids: a formatted list of database ids of the reliefs whose sizes are sought.
+                        When None, the sizes of all the reliefs are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMReliefs.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_sizes_of(root_id_column, tables, reliefs_ids)
@@ -77,7 +77,7 @@ class CityMWaterBodies(CityMCityObjects):
         if split_surfaces:
             query = \
                 "SELECT waterbody.id, ST_AsBinary(ST_Multi(surface_geometry.geometry)), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, waterbody.id " + \
                 "FROM citydb.waterbody JOIN citydb.waterbod_to_waterbnd_srf " + \
                 "ON waterbody.id=waterbod_to_waterbnd_srf.waterbody_id " + \
                 "JOIN citydb.waterboundary_surface " + \
@@ -88,7 +88,7 @@ class CityMWaterBodies(CityMCityObjects):
         else:
             query = \
                 "SELECT waterbody.id, ST_AsBinary(ST_Multi(ST_Collect(surface_geometry.geometry))), " + \
-                "objectclass.classname " + \
+                "objectclass.classname, waterbody.id " + \
                 "FROM citydb.waterbody JOIN citydb.waterbod_to_waterbnd_srf " + \
                 "ON waterbody.id=waterbod_to_waterbnd_srf.waterbody_id " + \
                 "JOIN citydb.waterboundary_surface " + \
@@ -112,7 +112,7 @@ class CityMWaterBodies(CityMCityObjects):
             ("SELECT surface_geometry.id, "
              "ST_AsBinary(ST_Multi(surface_geometry.geometry)) as geom, "
              "ST_AsBinary(ST_Multi(ST_Translate(ST_Scale(textureparam.texture_coordinates, 1, -1), 0, 1))) as uvs, "
-             "tex_image_uri AS uri "
+             "tex_image_uri AS uri, waterbody.id "
              "FROM citydb.waterbody JOIN citydb.waterbod_to_waterbnd_srf "
              "ON waterbody.id=waterbod_to_waterbnd_srf.waterbody_id "
              "JOIN citydb.waterboundary_surface "
@@ -129,26 +129,35 @@ class CityMWaterBodies(CityMCityObjects):
         return query
 
     @staticmethod
-    def sql_query_centroid(id):
+    def sql_surface_geometry_tables():
         """
-        param id: the ID of the cityGML object
-        return: the [x, y, z] coordinates of the centroid of the cityGML object
+        :return: the column containing the database id of the water bodies, and the tables (and their joins)
+                linking the water bodies to their surface geometries
         """
-
-        query = \
-            "SELECT " + \
-            "ST_X(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Y(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))), " + \
-            "ST_Z(ST_3DClosestPoint(ST_Multi(ST_Collect(surface_geometry.geometry)) " + \
-            ",ST_Centroid(ST_Multi(ST_Collect(surface_geometry.geometry))))) " + \
-            "FROM citydb.waterbody JOIN citydb.waterbod_to_waterbnd_srf " + \
+        tables = \
+            "citydb.waterbody JOIN citydb.waterbod_to_waterbnd_srf " + \
             "ON waterbody.id=waterbod_to_waterbnd_srf.waterbody_id " + \
             "JOIN citydb.waterboundary_surface " + \
             "ON waterbod_to_waterbnd_srf.waterboundary_surface_id=waterboundary_surface.id " + \
-            "JOIN citydb.surface_geometry ON surface_geometry.root_id=waterboundary_surface.lod3_surface_id " + \
-            "WHERE waterbody.id = " + str(id) + \
-            " GROUP BY waterbody.id"
+            "JOIN citydb.surface_geometry ON surface_geometry.root_id=waterboundary_surface.lod3_surface_id"
+        return "waterbody.id", tables
 
-        return query
+    @staticmethod
+    def sql_query_centroids(water_bodies_ids=None):
+        """
+        :param water_bodies_ids: a formatted list of database ids of the water bodies whose centroids are sought.
+                        When None, the centroids of all the water bodies are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMWaterBodies.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_centroids_of(root_id_column, tables, water_bodies_ids)
+
+    @staticmethod
+    def sql_query_sizes(water_bodies_ids=None):
+        """
+        :param water_bodies_ids: a formatted list of database ids of the water bodies whose sizes are sought.
+                        When None, the sizes of all the water bodies are computed.
+        :return: a string containing the right SQL query that should be executed.
+        """
+        root_id_column, tables = CityMWaterBodies.sql_surface_geometry_tables()
+        return CityMCityObjects.sql_query_sizes_of(root_id_column, tables, water_bodies_ids)
@@ -3,13 +3,30 @@ Functions used to open the database.
 """
 
 
+import itertools
 import sys
 import yaml
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 
+# The number of rows fetched at once from a server-side cursor. When None, the
+# queries use client-side cursors and their whole result is fetched at once.
+streaming_itersize = None
 
-def open_data_base(db_config_file_path):
+# Used to give a unique name to each server-side cursor
+cursor_counter = itertools.count()
+
+# The maximum number of connections of a pool, when PG_POOL_SIZE is not defined in the configuration
+DEFAULT_POOL_SIZE = 1
+
+
+def read_db_config(db_config_file_path):
+    """
+    Read and check the database configuration file.
+    :param db_config_file_path: the path to the .yml configuration file
+    :return: the configuration as a dictionary
+    """
     with open(db_config_file_path, 'r') as db_config_file:
         try:
             db_config = yaml.load(db_config_file, Loader=yaml.FullLoader)
@@ -24,25 +41,32 @@ def open_data_base(db_config_file_path):
         print(("ERROR: Database is not properly defined in '{0}', please refer to README.md"
                .format(db_config_file_path)))
         sys.exit()
+    return db_config
 
-    # Connect to database
-    db = psycopg2.connect(
-        "postgresql://{0}:{1}@{2}:{3}/{4}"
+
+def get_connection_parameters(db_config):
+    """
+    Return the parameters used to connect to the database.
+    :param db_config: the database configuration
+    :return: the DSN and the keyword arguments of the connection
+    """
+    dsn = "postgresql://{0}:{1}@{2}:{3}/{4}" \
         .format(db_config['PG_USER'],
                 db_config['PG_PASSWORD'],
                 db_config['PG_HOST'],
                 db_config['PG_PORT'],
-                db_config['PG_NAME']),
+                db_config['PG_NAME'])
+    parameters = dict(
         # fetch method will return named tuples instead of regular tuples
         cursor_factory=psycopg2.extras.NamedTupleCursor,
-        # Refer to note standing after this fuction call on why those
+        # Refer to note standing after this dictionary on why those
         # keepalives parameters are here required.
         keepalives=1,
         keepalives_idle=30,
         keepalives_interval=10,
         keepalives_count=5
     )
-    # Why using the keepalives flags in the above psycopg2 constructor ?
+    # Why using the keepalives flags in the above connection parameters ?
     # In the context of having to tile cities, such a connection can be
     # used for bulk querries (think of retrieving the geometries of all the
     # buildings of a large city). And it seems that dealing with bulk
@@ -59,6 +83,13 @@ def open_data_base(db_config_file_path):
     #
     # Concerning the keepalives connect parameters, refer to
     # https://www.postgresql.org/docs/current/libpq-connect.html#LIBPQ-PARAMKEYWORDS
+    return dsn, parameters
+
+
+def open_data_base(db_config_file_path):
+    # Connect to database
+    dsn, parameters = get_connection_parameters(read_db_config(db_config_file_path))
+    db = psycopg2.connect(dsn, **parameters)
 
     try:
         # Open a cursor to perform database operations
@@ -71,8 +102,56 @@ def open_data_base(db_config_file_path):
     return cursor
 
 
+def open_connection_pool(db_config_file_path):
+    """
+    Create a pool of connections to the database. The connections are opened when they are first used.
+    The maximum number of connections is defined by PG_POOL_SIZE in the configuration file.
+    :param db_config_file_path: the path to the .yml configuration file
+    :return: a psycopg2 ThreadedConnectionPool
+    """
+    db_config = read_db_config(db_config_file_path)
+    pool_size = max(1, int(db_config.get('PG_POOL_SIZE', DEFAULT_POOL_SIZE)))
+    dsn, parameters = get_connection_parameters(db_config)
+    return psycopg2.pool.ThreadedConnectionPool(0, pool_size, dsn, **parameters)
+
+
 def open_data_bases(db_config_file_paths):
     cursors = list()
     for file_path in db_config_file_paths:
         cursors.append(open_data_base(file_path))
     return cursors
+
+
+def set_streaming_itersize(itersize):
+    """
+    Stream the results of the queries with server-side cursors.
+    :param itersize: the number of rows fetched at once, None to disable streaming
+    """
+    global streaming_itersize
+    streaming_itersize = None if itersize is None else max(1, itersize)
+
+
+def iterate_query(cursor, query, parameters=None):
+    """
+    Execute a query and iterate over the resulting rows.
+    When streaming is enabled, the rows are fetched by batches of streaming_itersize rows
+    from a server-side (named) cursor opened on the connection of the cursor. Otherwise,
+    the query is executed by the cursor.
+    :param cursor: a database access cursor
+    :param query: the query to execute
+    :param parameters: the parameters of the query
+    :return: an iterator over the rows
+    """
+    if streaming_itersize is None:
+        cursor.execute(query, parameters)
+        yield from cursor
+        return
+
+    named_cursor = cursor.connection.cursor('py3dtilers_cursor_' + str(next(cursor_counter)),
+                                            cursor_factory=psycopg2.extras.NamedTupleCursor)
+    named_cursor.itersize = streaming_itersize
+    try:
+        named_cursor.execute(query, parameters)
+        yield from named_cursor
+    finally:
+        named_cursor.close()
@@ -2,6 +2,7 @@ import itertools
 
 from py3dtiles import BatchTableHierarchy
 from ..Common import TreeWithChildrenAndParent
+from .database_accesses import iterate_query
 
 
 def retrieve_buildings_and_sub_parts(cursor, buildingIds, classes, hierarchy):
@@ -14,12 +15,13 @@ def retrieve_buildings_and_sub_parts(cursor, buildingIds, classes, hierarchy):
     #   - collect the hierarchical information
     buildindsAndSubParts = []
 
-    cursor.execute(
+    rows = iterate_query(
+        cursor,
         "SELECT building.id, building_parent_id,"
         "       cityobject.gmlid, cityobject.objectclass_id "
         "FROM citydb.building JOIN citydb.cityobject ON building.id=cityobject.id "
         "                        WHERE building_root_id IN " + buildingIds)
-    for t in cursor.fetchall():
+    for t in rows:
         buildindsAndSubParts.append(
             {'internalId': t[0], 'gmlid': t[2], 'class': t[3]})
         hierarchy.addNodeToParent(t[0], t[1])
@@ -44,19 +46,21 @@ def retrieve_geometric_instances(cursor, buildingIds, classes, hierarchy):
     # building's sub-divisions (Building is an "abstraction" from which
     # inherits concrete building class as well building-subdivisions (parts).
     # We must first collect all the buildings and their parts:
-    cursor.execute(
+    rows = iterate_query(
+        cursor,
         "SELECT building.id "
         "FROM citydb.building JOIN citydb.cityobject ON building.id=cityobject.id "
         "                        WHERE building_root_id IN " + buildingIds)
 
-    subBuildingIds = tuple([t[0] for t in cursor.fetchall()])
+    subBuildingIds = tuple([t[0] for t in rows])
 
     # Then proceed with collecting the required information for those objects:
     geometricInstances = []
-    cursor.execute(
+    rows = iterate_query(
+        cursor,
         "SELECT cityobject.id, cityobject.gmlid, "
         "       thematic_surface.building_id, thematic_surface.objectclass_id, "
-        "ST_AsBinary(ST_Multi(ST_Collect(surface_geometry.geometry))) "
+        "ST_Collect(surface_geometry.geometry) IS NULL "
         "FROM citydb.surface_geometry JOIN citydb.thematic_surface "
         "ON surface_geometry.root_id=thematic_surface.lod2_multi_surface_id "
         "JOIN citydb.cityobject ON thematic_surface.id=cityobject.id "
@@ -65,13 +69,13 @@ def retrieve_geometric_instances(cursor, buildingIds, classes, hierarchy):
         "        thematic_surface.building_id, thematic_surface.objectclass_id",
         (subBuildingIds,))
     # In the above request we won't collect the geometry. However we still
-    # retrieve it in order to disregard the instances without geometry. This
-    # is because
+    # check if it is empty in order to disregard the instances without geometry
+    # (only a boolean is sent, not the geometry itself). This is because
     #   - we need the BTH data indexes to match the geometrical data indexes
     #   - when building (verb) the gltf (held in the B3dm) geometries we
     #     had to drop instances without geometrical content...
-    for t in cursor.fetchall():
-        if t[4] is None:
+    for t in rows:
+        if t[4]:
             # Some thematic surface may have no geometry (due to a cityGML
             # exporter bug?): simply ignore them.
             continue
@@ -108,8 +112,7 @@ def create_batch_table_hierarchy(cursor, buildingIds):
 
     # ##### Retrieve the class names
     classDict = {}
-    cursor.execute("SELECT id, classname FROM citydb.objectclass")
-    for t in cursor.fetchall():
+    for t in iterate_query(cursor, "SELECT id, classname FROM citydb.objectclass"):
         # TODO: allow custom fields to be added (here + in queries)
         classDict[t[0]] = (t[1], ['gmlid'])
 
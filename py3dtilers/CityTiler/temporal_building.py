@@ -40,6 +40,13 @@ class TemporalBuilding(CityMBuilding):
         # This should be of type date and by default is manipulated as string:
         return self.temporal_id.split('::')[0]
 
+    def is_geom_in_database(self):
+        """
+        The geometry of a temporal building is retrieved (from the database of its time stamp) before the tiling.
+        :return: False
+        """
+        return False
+
     def get_geom(self, user_arguments=None, feature_list=None, material_indexes=dict):
         """
         Get the geometry of the feature.
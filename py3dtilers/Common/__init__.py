@@ -1,4 +1,10 @@
-from .kd_tree import kd_tree
+from .reprojection import get_transformer, reproject_vertices
+from .wkb_decoder import triangle_soup_from_wkb_multipolygon
+from .kd_tree import kd_tree, kd_tree_indices
+from .polygon_index import find_containing_polygons
+from .extrusion import extrude_rings
+from .normals import compute_face_normals, compute_vertex_normals
+from .feature_store import FeatureStore
 from .feature import Feature, FeatureList
 from .tree_with_children_and_parent import TreeWithChildrenAndParent
 from .group import Groups
@@ -10,12 +16,24 @@ from .lod1_node import Lod1Node
 from .loa_node import LoaNode
 from .lod_tree import LodTree
 from .obj_writer import ObjWriter
+from .gltf_writer import GlTFWriter
+from .tile_compression import TileCompressor, MeshoptCompressor, DracoCompressor, get_tile_compressor
+from .tile_hierarchy import TileHierarchy
 from .tileset_creation import FromGeometryTreeToTileset
 from .tiler import Tiler
 
-__all__ = ['kd_tree',
+__all__ = ['get_transformer',
+           'reproject_vertices',
+           'triangle_soup_from_wkb_multipolygon',
+           'kd_tree',
+           'kd_tree_indices',
+           'find_containing_polygons',
+           'extrude_rings',
+           'compute_face_normals',
+           'compute_vertex_normals',
            'Feature',
            'FeatureList',
+           'FeatureStore',
            'TreeWithChildrenAndParent',
            'Groups',
            'ExtrudedPolygon',
@@ -27,5 +45,11 @@ __all__ = ['kd_tree',
            'LoaNode',
            'LodTree',
            'ObjWriter',
+           'GlTFWriter',
+           'TileCompressor',
+           'MeshoptCompressor',
+           'DracoCompressor',
+           'get_tile_compressor',
            'Tiler',
+           'TileHierarchy',
            'FromGeometryTreeToTileset']
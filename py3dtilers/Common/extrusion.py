@@ -0,0 +1,59 @@
+import numpy as np
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def get_wall_indices(ring_sizes):
+    """
+    Compute the indices of the wall triangles of extruded rings.
+    The bottom points of the rings are indexed first, followed by the top points (in the same order).
+    Each edge of a ring creates two triangles.
+    Most footprints share the same few ring sizes, so the indices are cached (and read-only).
+    :param ring_sizes: a tuple containing the number of points of each ring
+    :return: a (2 * n_points, 3) array of indices
+    """
+    ring_sizes = [size for size in ring_sizes if size > 0]
+    nb_points = sum(ring_sizes)
+    current = np.arange(nb_points)
+    # The next point of the last point of a ring is the first point of this ring
+    following = current + 1
+    ring_ends = np.cumsum(ring_sizes, dtype=np.int64)
+    following[ring_ends - 1] = ring_ends - ring_sizes
+
+    indices = np.empty((nb_points, 6), dtype=np.int64)
+    indices[:, [0, 3]] = current[:, np.newaxis]
+    indices[:, 1] = nb_points + current
+    indices[:, [2, 4]] = nb_points + following[:, np.newaxis]
+    indices[:, 5] = following
+    indices = indices.reshape(-1, 3)
+    indices.setflags(write=False)
+    return indices
+
+
+def extrude_rings(rings, roof_triangles, height, roof_vertices=None, with_floor=False):
+    """
+    Extrude rings to create a triangulated 3D mesh: the roof, (optionally) the floor and the walls.
+    All the triangles are created at once by indexing the arrays of points.
+    :param rings: the rings of the footprint (the exterior ring, then the interior rings), as (n, 3) arrays of points
+    :param roof_triangles: a (n_triangles, 3) array of indices of the points of the footprint triangulation
+    :param height: the height of the extrusion
+    :param roof_vertices: the (n, 3) points indexed by the roof triangles. By default, the points of the rings (stacked)
+    :param with_floor: when True, also create the floor (the roof triangles at the bottom, reversed)
+
+    :return: a (n_triangles, 3, 3) array containing the roof triangles, the floor triangles and the wall triangles
+    """
+    rings = [np.asarray(ring, dtype=np.float64).reshape(-1, 3) for ring in rings]
+    bottom = np.concatenate(rings) if len(rings) > 0 else np.empty((0, 3), dtype=np.float64)
+    offset = np.array([0, 0, height], dtype=np.float64)
+    if roof_vertices is None:
+        roof_vertices = bottom
+    roof_vertices = np.asarray(roof_vertices, dtype=np.float64)
+    roof_triangles = np.asarray(roof_triangles, dtype=np.int64).reshape(-1, 3)
+
+    blocks = [roof_vertices[roof_triangles] + offset]
+    if with_floor:
+        blocks.append(roof_vertices[roof_triangles[:, ::-1]])
+
+    vertices = np.concatenate((bottom, bottom + offset))
+    blocks.append(vertices[get_wall_indices(tuple(len(ring) for ring in rings))])
+    return np.concatenate(blocks)
@@ -2,6 +2,21 @@ import numpy as np
 from py3dtiles import BoundingVolumeBox, TriangleSoup
 from typing import List
 from ..Color import ColorConfig
+from .reprojection import reproject_vertices
+
+
+def as_triangle_array(triangles):
+    """
+    Convert triangles (or the data associated to their vertices, like UVs or colors)
+    into a single contiguous array.
+    :param triangles: a list of triangles, where each triangle is a list of 3 vertices
+    :return: a (n_triangles, 3, n_components) float array
+    """
+    if isinstance(triangles, np.ndarray) and triangles.dtype == np.float64 and triangles.flags.c_contiguous:
+        return triangles
+    if len(triangles) == 0:
+        return np.empty((0, 3, 3), dtype=np.float64)
+    return np.ascontiguousarray(triangles, dtype=np.float64)
 
 
 class Feature(object):
@@ -10,6 +25,11 @@ class Feature(object):
     used with the corresponding tiler.
     """
 
+    # Used to estimate the size of a feature in a tile: the vertices are written as float32 (position, normal,
+    # batch id and the associated data like UVs), and the texture pixels are counted as RGB
+    BYTES_PER_COMPONENT = 4
+    BYTES_PER_TEXTURE_PIXEL = 3
+
     def __init__(self, id=None):
         """
         :param id: given identifier
@@ -32,6 +52,13 @@ class Feature(object):
 
         self.has_vertex_colors = False
 
+        # Where the geometry is loaded from when it isn't in memory (a FeatureStore, or the source of the feature),
+        # and the position of the geometry in this store
+        self.geom_store = None
+        self.geom_entries = None
+        # The estimated size of the feature in a tile, kept when the geometry isn't in memory
+        self.size_estimate = None
+
         self.set_id(id)
 
     def set_id(self, id):
@@ -86,29 +113,123 @@ class Feature(object):
     def get_geom_as_triangles(self):
         """
         Return the triangles of this feature.
-        :return: a list of triangles
+        The triangles are a (n_triangles, 3, 3) array, which can be iterated as a list of triangles.
+        :return: the triangles
+        """
+        return self.get_geom_as_array()
+
+    def get_geom_as_array(self):
         """
+        Return the positions of the triangles of this feature as a contiguous array.
+        :return: a (n_triangles, 3, 3) float array
+        """
+        self.geom.triangles[0] = as_triangle_array(self.geom.triangles[0])
         return self.geom.triangles[0]
 
+    def get_data_as_array(self, index):
+        """
+        Return the data associated to the vertices (UVs, vertex colors) as a contiguous array.
+        :param index: the index of the associated data
+        :return: a (n_triangles, 3, n_components) float array
+        """
+        self.geom.triangles[1 + index] = as_triangle_array(self.geom.triangles[1 + index])
+        return self.geom.triangles[1 + index]
+
     def set_triangles(self, triangles):
         """
         Set the triangles of this feature.
-        :param triangles: a list of triangles.
+        :param triangles: a list of triangles or a (n_triangles, 3, 3) array.
+        """
+        self.geom.triangles[0] = as_triangle_array(triangles)
+
+    def compact_geom(self):
+        """
+        Store the triangles and their associated data as contiguous arrays
+        instead of lists of per-vertex arrays.
         """
-        self.geom.triangles[0] = triangles
+        self.geom.triangles = [as_triangle_array(data) for data in self.geom.triangles]
 
     def set_box(self):
         """
         Set the BoundingVolumeBox of this feature from its triangles.
         Also set the centroid.
         """
-        bbox = self.geom.getBbox()
+        # Every geometry goes through set_box once created, compact it here
+        self.compact_geom()
+        positions = self.get_geom_as_array()
+        self.set_box_from_mins_maxs(positions.min(axis=(0, 1)), positions.max(axis=(0, 1)))
+
+    def set_box_from_mins_maxs(self, mins, maxs):
+        """
+        Set the BoundingVolumeBox of this feature from the extent of its geometry, without reading the triangles.
+        Also set the centroid.
+        :param mins: the minimal [x, y, z] coordinates
+        :param maxs: the maximal [x, y, z] coordinates
+        """
         self.box = BoundingVolumeBox()
-        self.box.set_from_mins_maxs(np.append(bbox[0], bbox[1]))
+        self.box.set_from_mins_maxs(np.append(mins, maxs))
 
         # Set centroid from Bbox center
         self.centroid = np.array(self.box.get_center())
 
+    def store_geom(self, feature_store):
+        """
+        Move the geometry of this feature into a FeatureStore. The geometry is released from memory
+        and loaded back when the geometry of the feature is requested (see get_geom).
+        The bounding box and the centroid must be set beforehand, they are kept in memory.
+        :param feature_store: a FeatureStore
+        """
+        if self.geom is None or len(self.geom.triangles) == 0 or self.geom_store is not None:
+            return
+        self.size_estimate = self.get_size_estimate()
+        self.set_geom_source(feature_store, feature_store.add(self.geom.triangles))
+        self.geom.triangles = list()
+
+    def set_geom_source(self, source, entries):
+        """
+        Set where the geometry of this feature is loaded from when it is requested (see get_geom).
+        This allows to distribute the features with their bounding box only, then to load the geometries tile by tile.
+        :param source: an object with a get(entries) method returning the arrays of the geometry (e.g. a FeatureStore)
+        :param entries: the position of the geometry in the source
+        """
+        self.geom_store = source
+        self.geom_entries = entries
+
+    def load_geom(self):
+        """
+        Load the geometry of this feature from its source, if the geometry isn't in memory.
+        """
+        if self.geom_store is not None:
+            self.geom.triangles = self.geom_store.get(self.geom_entries)
+            self.geom_store = None
+            self.geom_entries = None
+
+    @staticmethod
+    def get_size_of_triangles(nb_triangles, nb_data_components=0):
+        """
+        Estimate the size of triangles in a tile.
+        :param nb_triangles: the number of triangles
+        :param nb_data_components: the number of components of the data associated to each vertex (e.g. 2 for UVs)
+        :return: a size in bytes
+        """
+        # Position (3), normal (3) and batch id (1) of each vertex
+        return nb_triangles * 3 * (7 + nb_data_components) * Feature.BYTES_PER_COMPONENT
+
+    def get_size_estimate(self):
+        """
+        Estimate the size of this feature in a tile, from its number of triangles, the data associated
+        to its vertices and the area of its texture. Used to balance the tiles by size instead of by number of features.
+        :return: a size in bytes, or None when the geometry isn't known yet (e.g. it is read from a database tile by tile)
+        """
+        if self.geom is None or len(self.geom.triangles) == 0:
+            return self.size_estimate
+        nb_data_components = sum(np.shape(data)[-1] if len(data) > 0 else 0 for data in self.geom.triangles[1:])
+        size = Feature.get_size_of_triangles(len(self.geom.triangles[0]), nb_data_components)
+        if self.has_texture():
+            width, height = self.get_texture().size
+            size += width * height * Feature.BYTES_PER_TEXTURE_PIXEL
+        return size
+
     def get_texture(self):
         """
         Return the texture image of this feature.
@@ -135,6 +256,7 @@ class Feature(object):
         Get the geometry of the feature.
         :return: a boolean
         """
+        self.load_geom()
         if self.geom is not None and len(self.geom.triangles) > 0 and len(self.get_geom_as_triangles()) > 0:
             return [self]
         else:
@@ -280,53 +402,90 @@ class FeatureList(object):
         self.add_material(material)
         return i
 
+    def get_vertex_array(self):
+        """
+        Return the positions of the triangles of all the features stacked in a single array.
+        :return: a (n_vertices, 3) array and the number of vertices of each feature
+        """
+        positions = [feature.get_geom_as_array().reshape(-1, 3) for feature in self.get_features()]
+        counts = np.array([len(feature_positions) for feature_positions in positions], dtype=np.int64)
+        if len(positions) == 0:
+            return np.empty((0, 3), dtype=np.float64), counts
+        return np.concatenate(positions), counts
+
+    def set_vertex_array(self, vertices, counts):
+        """
+        Set the positions of the triangles of all the features from a single array.
+        :param vertices: a (n_vertices, 3) array, as returned by get_vertex_array
+        :param counts: the number of vertices of each feature
+        """
+        for feature, positions in zip(self.get_features(), np.split(vertices, np.cumsum(counts)[:-1])):
+            feature.set_triangles(positions.reshape(-1, 3, 3))
+            feature.set_box()
+
+    def transform_features(self, transform=None, center=False):
+        """
+        Transform the vertices of all the features in a single pass.
+        The vertices are stacked, transformed, optionally centered on [0, 0, 0],
+        then written back into the features.
+        :param transform: a function taking and returning a (n_vertices, 3) array
+        :param center: when True, translate the features by minus their centroid
+        :return: the centroid of the features after the transformation (before centering)
+        """
+        return FeatureList.transform_feature_lists([self], transform, center)[0]
+
+    @staticmethod
+    def transform_feature_lists(feature_lists: List['FeatureList'], transform=None, center=False):
+        """
+        Transform the vertices of several FeatureList with a single call of the transform function.
+        When centering, each FeatureList is centered on its own centroid.
+        :param feature_lists: a list of FeatureList
+        :param transform: a function taking and returning a (n_vertices, 3) array
+        :param center: when True, translate the features of each FeatureList by minus its centroid
+        :return: the centroid of each FeatureList after the transformation (before centering)
+        """
+        stacked = [feature_list.get_vertex_array() for feature_list in feature_lists]
+        vertices = np.concatenate([list_vertices for list_vertices, _ in stacked])
+        if transform is not None and len(vertices) > 0:
+            vertices = transform(vertices)
+
+        centroids = list()
+        list_sizes = [len(list_vertices) for list_vertices, _ in stacked]
+        for feature_list, (_, counts), list_vertices in zip(feature_lists, stacked, np.split(vertices, np.cumsum(list_sizes)[:-1])):
+            if len(counts) == 0:
+                centroids.append(np.array([0., 0., 0.]))
+                continue
+            # Same centroid as get_centroid(): the average of the centers of the features' boxes
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            mins = np.minimum.reduceat(list_vertices, starts, axis=0)
+            maxs = np.maximum.reduceat(list_vertices, starts, axis=0)
+            centroid = ((mins + maxs) / 2).mean(axis=0)
+            if center:
+                list_vertices = list_vertices - centroid
+            feature_list.set_vertex_array(list_vertices, counts)
+            centroids.append(centroid)
+        return centroids
+
     def translate_features(self, offset):
         """
         Translate the features by adding an offset
         :param offset: the Vec3 translation offset
         """
-        # Translate the position of each object by an offset
-        for feature in self.get_features():
-            new_geom = []
-            for triangle in feature.get_geom_as_triangles():
-                new_position = []
-                for points in triangle:
-                    new_position.append(np.array(points + offset))
-                new_geom.append(new_position)
-            feature.set_triangles(new_geom)
-            feature.set_box()
+        self.transform_features(lambda vertices: vertices + offset)
 
     def change_crs(self, transformer, offset=np.array([0, 0, 0])):
         """
         Project the features into another CRS
         :param transformer: the transformer used to change the crs
         """
-        for feature in self.get_features():
-            new_geom = []
-            for triangle in feature.get_geom_as_triangles():
-                new_position = []
-                for point in triangle:
-                    new_point = transformer.transform((point + offset)[0], (point + offset)[1], (point + offset)[2])
-                    new_position.append(np.array(new_point))
-                new_geom.append(new_position)
-            feature.set_triangles(new_geom)
-            feature.set_box()
+        self.transform_features(lambda vertices: reproject_vertices(vertices, transformer, offset))
 
     def height_mult_features(self, height_mult):
         """
         Converts height to different units by specifing the multiplier
         :param height_mult: the factor to scale height values
         """
-        for feature in self.get_features():
-            new_geom = []
-            for triangle in feature.get_geom_as_triangles():
-                scaled_triangle = []
-                for vertex in triangle:
-                    scaled_vertex = np.array([vertex[0], vertex[1], vertex[2] * height_mult])
-                    scaled_triangle.append(scaled_vertex)
-                new_geom.append(scaled_triangle)
-            feature.set_triangles(new_geom)
-            feature.set_box()
+        self.transform_features(lambda vertices: vertices * [1, 1, height_mult])
 
     def scale_features(self, scale_factor, centroid):
         """
@@ -334,13 +493,7 @@ class FeatureList(object):
         :param scale_factor: the factor to scale the objects
         :param centroid: the centroid used as reference point
         """
-        for feature in self.get_features():
-            new_geom = []
-            for triangle in feature.get_geom_as_triangles():
-                scaled_triangle = [((vertex - centroid) * scale_factor) + centroid for vertex in triangle]
-                new_geom.append(scaled_triangle)
-            feature.set_triangles(new_geom)
-            feature.set_box()
+        self.transform_features(lambda vertices: ((vertices - centroid) * scale_factor) + centroid)
 
     def get_textures(self):
         """
@@ -363,6 +516,15 @@ class FeatureList(object):
             features_with_geom.extend(feature.get_geom(user_arguments, self, material_indexes))
         self.set_features(features_with_geom)
 
+    def store_geometries(self, feature_store):
+        """
+        Move the geometries of the features into a FeatureStore.
+        The features keep their bounding box and centroid, their geometry is loaded back by set_features_geom.
+        :param feature_store: a FeatureStore
+        """
+        for feature in self.get_features():
+            feature.store_geom(feature_store)
+
     def filter(self, filter_function):
         """
         Filter the features. Keep only those accepted by the filter function.
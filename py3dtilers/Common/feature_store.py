@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+
+
+class FeatureStore():
+    """
+    An on-disk store of the geometries of the features.
+    The triangles (and the data associated to their vertices) are appended to a binary file,
+    each feature keeps the position and the shape of its arrays in the file. The geometries are read back
+    through a memory-mapped view of the file, so only the geometries of the tile being created are in memory.
+    The store can be used as a context manager, its files are deleted when it is closed.
+    """
+
+    def __init__(self, directory=None):
+        """
+        :param directory: the directory where the temporary files are created. By default, the temporary directory of the system
+        """
+        self.directory = tempfile.mkdtemp(prefix='py3dtilers_features_', dir=directory)
+        self.path = os.path.join(self.directory, 'geometries.bin')
+        self.file = open(self.path, 'wb')
+        self.size = 0
+        self.memmap = None
+        # Delete the files even when the store isn't closed (e.g. after an error), at the latest when the interpreter exits
+        self.finalizer = weakref.finalize(self, FeatureStore.remove_directory, self.directory, os.getpid())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __deepcopy__(self, memo):
+        # The copies of the features share the same store
+        return self
+
+    def __getstate__(self):
+        # The store is sent to worker processes without its file handles, the workers open their own view of the file
+        state = self.__dict__.copy()
+        state['file'] = None
+        state['memmap'] = None
+        state['finalizer'] = None
+        return state
+
+    def add(self, arrays):
+        """
+        Append arrays to the store.
+        :param arrays: a list of float arrays (the triangles and the data associated to their vertices)
+        :return: the position of the arrays in the store, as a list of (offset, shape)
+        """
+        entries = list()
+        for array in arrays:
+            array = np.ascontiguousarray(array, dtype=np.float64)
+            self.file.write(array.data)
+            entries.append((self.size, array.shape))
+            self.size += array.nbytes
+        return entries
+
+    def flush(self):
+        """
+        Write the buffered arrays in the file, so they can be read by other processes.
+        """
+        if self.file is not None:
+            self.file.flush()
+
+    def get(self, entries):
+        """
+        Read arrays from the store.
+        :param entries: the position of the arrays, as returned when the arrays were added
+        :return: a list of float arrays (copies, which don't depend on the file)
+        """
+        if self.memmap is None or len(self.memmap) * 8 < self.size:
+            self.flush()
+            self.memmap = np.memmap(self.path, dtype=np.float64, mode='r') if self.size > 0 else np.empty(0)
+        arrays = list()
+        for offset, shape in entries:
+            start = offset // 8
+            arrays.append(np.array(self.memmap[start:start + int(np.prod(shape))]).reshape(shape))
+        return arrays
+
+    def close(self):
+        """
+        Close the store and delete its files. The files are only deleted by the process which created the store.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.memmap = None
+        if self.finalizer is not None:
+            self.finalizer()
+
+    @staticmethod
+    def remove_directory(directory, pid):
+        """
+        Delete the directory of a store.
+        :param directory: the path to the directory
+        :param pid: the id of the process which created the store. The forked worker processes don't delete the directory
+        """
+        if os.getpid() == pid:
+            shutil.rmtree(directory, ignore_errors=True)
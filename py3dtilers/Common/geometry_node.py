@@ -98,3 +98,15 @@ class GeometryNode():
         for child in self.child_nodes:
             n += child.get_number_of_children()
         return n
+
+    def set_tile_index(self, tile_index):
+        """
+        Set the index of the tile of this node and of its children (recursively).
+        The tiles are indexed depth first, like they are created.
+        :param tile_index: the index of the tile of this node
+        :return: the index of the tile following the tiles of this node
+        """
+        tile_index += 1
+        for child in self.child_nodes:
+            tile_index = child.set_tile_index(tile_index)
+        return tile_index
@@ -0,0 +1,351 @@
+import numpy as np
+from py3dtiles import GlTF
+from .normals import compute_vertex_normals
+
+
+class GlTFWriter():
+    """
+    A writer which write the triangles of all the features of a tile into a glTF.
+    The positions, normals, batch ids, UVs and vertex colors of the features are written into contiguous arrays
+    allocated once per tile, then the binary body of the glTF is filled in one pass.
+    The features are ordered by material: each material is a primitive of a single mesh,
+    whose vertices are a contiguous range of the arrays.
+    In indexed mode, the identical vertices of a primitive are welded and the triangles are written as indices.
+    In quantized mode, the positions and the normals are stored as integers (KHR_mesh_quantization).
+    The glTF can finally be compressed by a TileCompressor (meshopt or Draco).
+    """
+
+    # glTF constants
+    BYTE = 5120
+    SHORT = 5122
+    UNSIGNED_SHORT = 5123
+    UNSIGNED_INT = 5125
+    FLOAT = 5126
+    COMPONENT_TYPES = {
+        np.dtype(np.int8): BYTE,
+        np.dtype(np.int16): SHORT,
+        np.dtype(np.uint16): UNSIGNED_SHORT,
+        np.dtype(np.uint32): UNSIGNED_INT,
+        np.dtype(np.float32): FLOAT
+    }
+    ATTRIBUTE_TYPES = {
+        'POSITION': 'VEC3',
+        'NORMAL': 'VEC3',
+        'TEXCOORD_0': 'VEC2',
+        'COLOR_0': 'VEC3',
+        '_BATCHID': 'SCALAR'
+    }
+    NB_COMPONENTS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3}
+    ARRAY_BUFFER = 34962
+    ELEMENT_ARRAY_BUFFER = 34963
+    TRIANGLES = 4
+
+    def __init__(self, with_normals=True, indexed=False, crease_angle=None, quantized=False, compressor=None):
+        """
+        :param with_normals: True to write the normals of the vertices
+        :param indexed: True to weld the identical vertices and write the triangles as indices
+        :param crease_angle: the crease angle (in degrees) of the smooth normals, None for flat normals
+        :param quantized: True to store the positions and the normals as integers
+        :param compressor: an optional TileCompressor, applied on each glTF once encoded
+        """
+        self.with_normals = with_normals
+        self.indexed = indexed
+        self.crease_angle = crease_angle
+        self.quantized = quantized
+        self.compressor = compressor
+
+    @staticmethod
+    def get_material_dict(material, texture_index=None):
+        """
+        Create the glTF material of a GlTFMaterial.
+        :param material: a GlTFMaterial
+        :param texture_index: the index of the glTF texture of the material, None when the material isn't textured
+        :return: a dict
+        """
+        rgba = [float(component) for component in material.rgba]
+        pbr = {
+            'baseColorFactor': rgba,
+            'metallicFactor': float(getattr(material, 'metallicFactor', 1)),
+            'roughnessFactor': float(getattr(material, 'roughnessFactor', 1))
+        }
+        if texture_index is not None:
+            pbr['baseColorTexture'] = {'index': texture_index}
+        material_dict = {'pbrMetallicRoughness': pbr}
+        if rgba[3] < 1:
+            material_dict['alphaMode'] = 'BLEND'
+        return material_dict
+
+    def create_gltf(self, features, material_indexes, materials, transform, with_uvs=False):
+        """
+        Create a glTF from the features of a tile. The batch id of each feature is its index in the list.
+        :param features: a list of Feature, whose geometries are set
+        :param material_indexes: the index (in materials) of the material of each feature
+        :param materials: a list of GlTFMaterial
+        :param transform: the flattened matrix of the node of the glTF
+        :param with_uvs: True to write the UVs of the features (the first data associated to their vertices)
+
+        :return: a GlTF
+        """
+        nb_triangles = np.array([len(feature.get_geom_as_array()) for feature in features], dtype=np.int64)
+        material_indexes = np.asarray(material_indexes, dtype=np.int64).reshape(-1)
+        order = np.argsort(material_indexes, kind='stable')
+        nb_vertices = 3 * nb_triangles[order]
+        total = int(nb_vertices.sum())
+
+        # Attributes of all the vertices of the tile, the features being ordered by material
+        attributes = dict()
+        positions = np.empty((total, 3), dtype=np.float32)
+        if total > 0:
+            np.concatenate([features[i].get_geom_as_array().reshape(-1, 3) for i in order], out=positions, casting='same_kind')
+        attributes['POSITION'] = positions
+        batch_ids = np.repeat(order.astype(np.float32), nb_vertices)
+        if self.with_normals:
+            # The normals of the whole tile are computed at once, the features are smoothed separately
+            normals = compute_vertex_normals(positions.reshape(-1, 3, 3), self.crease_angle, batch_ids[::3])
+            attributes['NORMAL'] = normals.reshape(-1, 3).astype(np.float32)
+        if with_uvs:
+            uvs = np.empty((total, 2), dtype=np.float32)
+            if total > 0:
+                np.concatenate([features[i].get_data_as_array(0).reshape(-1, 2) for i in order], out=uvs, casting='same_kind')
+            attributes['TEXCOORD_0'] = uvs
+        if any(feature.has_vertex_colors for feature in features):
+            # The features without vertex colors keep the color of their material
+            colors = np.ones((total, 3), dtype=np.float32)
+            starts = np.cumsum(nb_vertices) - nb_vertices
+            for start, count, i in zip(starts, nb_vertices, order):
+                if features[i].has_vertex_colors:
+                    colors[start:start + count] = features[i].get_data_as_array(int(with_uvs)).reshape(-1, 3)
+            attributes['COLOR_0'] = colors
+        attributes['_BATCHID'] = batch_ids
+
+        ranges = GlTFWriter.get_primitive_ranges(material_indexes[order], nb_vertices)
+        if self.quantized:
+            attributes, dequantization = GlTFWriter.quantize(attributes)
+            transform = GlTFWriter.multiply_matrices(transform, dequantization)
+        indices = None
+        if self.indexed:
+            attributes, ranges, indices = GlTFWriter.weld_vertices(attributes, ranges)
+        gltf = self.__create_gltf(attributes, ranges, materials, transform, indices)
+        if self.compressor is not None:
+            gltf = self.compressor.compress(gltf)
+        return gltf
+
+    @staticmethod
+    def quantize(attributes):
+        """
+        Store the positions as SHORT and the normals as normalized BYTE (KHR_mesh_quantization).
+        The positions are centered on the center of the tile and divided by a uniform step, so the normals
+        don't depend on the dequantization. Each vertex is padded to 4 bytes, as required by glTF.
+        :param attributes: a dict (attribute name -> array of the attribute for all the vertices)
+
+        :return: the quantized attributes and the flattened dequantization matrix
+        """
+        attributes = dict(attributes)
+        positions = attributes['POSITION'].astype(np.float64)
+        center = np.zeros(3)
+        step = 1.
+        if len(positions) > 0:
+            mins, maxs = positions.min(axis=0), positions.max(axis=0)
+            center = (mins + maxs) / 2
+            step = float((maxs - mins).max()) / (2 * 32767) or 1.
+        quantized_positions = np.zeros((len(positions), 4), dtype=np.int16)
+        quantized_positions[:, :3] = np.clip(np.rint((positions - center) / step), -32767, 32767)
+        attributes['POSITION'] = quantized_positions
+        if 'NORMAL' in attributes:
+            quantized_normals = np.zeros((len(positions), 4), dtype=np.int8)
+            quantized_normals[:, :3] = np.clip(np.rint(attributes['NORMAL'] * 127), -127, 127)
+            attributes['NORMAL'] = quantized_normals
+
+        dequantization = [step, 0, 0, 0,
+                          0, step, 0, 0,
+                          0, 0, step, 0,
+                          center[0], center[1], center[2], 1]
+        return attributes, dequantization
+
+    @staticmethod
+    def multiply_matrices(first_matrix, second_matrix):
+        """
+        Multiply two flattened 4x4 matrices (stored column by column, like in glTF).
+        :param first_matrix: the matrix applied last
+        :param second_matrix: the matrix applied first
+        :return: the flattened product
+        """
+        first_matrix = np.asarray(first_matrix, dtype=np.float64).reshape(4, 4).T
+        second_matrix = np.asarray(second_matrix, dtype=np.float64).reshape(4, 4).T
+        return (first_matrix @ second_matrix).T.reshape(-1)
+
+    @staticmethod
+    def get_primitive_ranges(sorted_material_indexes, nb_vertices):
+        """
+        Find the range of vertices of each material.
+        :param sorted_material_indexes: the material index of each feature, in the order of the vertices
+        :param nb_vertices: the number of vertices of each feature, in the order of the vertices
+
+        :return: a list of (material index, start, end), without empty range
+        """
+        feature_starts = np.flatnonzero(np.diff(sorted_material_indexes, prepend=-1))
+        vertex_starts = np.cumsum(nb_vertices) - nb_vertices
+        vertex_ends = np.append(vertex_starts[feature_starts[1:]], int(np.sum(nb_vertices)))
+        return [(int(sorted_material_indexes[feature_start]), int(start), int(end))
+                for feature_start, start, end in zip(feature_starts, vertex_starts[feature_starts], vertex_ends) if end > start]
+
+    @staticmethod
+    def weld_vertices(attributes, ranges):
+        """
+        Merge the identical vertices (same position, normal, UV, color and batch id) of each primitive.
+        The vertices are compared as rows of bytes (the negative zeros being zeros), sorted with np.unique.
+        The welded vertices keep the order of their first occurrence, so the vertices of a triangle stay close in the buffers.
+        :param attributes: a dict (attribute name -> array of the attribute for all the vertices)
+        :param ranges: the (material index, start, end) of each primitive
+
+        :return: the attributes of the welded vertices, the ranges of the primitives in those attributes
+        and the indices of the vertices of the triangles of each primitive
+        """
+        # Adding 0 turns the negative zeros (e.g. in the normals) into zeros, which have different bytes
+        arrays = [array + 0 if array.dtype.kind == 'f' else array for array in attributes.values()]
+        vertices = np.column_stack([np.ascontiguousarray(array).reshape(len(array), -1).view(np.uint8) for array in arrays])
+        keys = np.ascontiguousarray(vertices).view(np.dtype((np.void, vertices.shape[1]))).reshape(-1)
+
+        kept_vertices = list()
+        welded_ranges = list()
+        indices = list()
+        welded_start = 0
+        for material_index, start, end in ranges:
+            _, first_occurrences, inverse = np.unique(keys[start:end], return_index=True, return_inverse=True)
+            order = np.argsort(first_occurrences)
+            ranks = np.empty_like(order)
+            ranks[order] = np.arange(len(order))
+            kept_vertices.append(start + first_occurrences[order])
+            indices.append(ranks[inverse.reshape(-1)])
+            welded_ranges.append((material_index, welded_start, welded_start + len(order)))
+            welded_start += len(order)
+
+        kept_vertices = np.concatenate(kept_vertices) if len(kept_vertices) > 0 else np.empty(0, dtype=np.int64)
+        return {name: array[kept_vertices] for name, array in attributes.items()}, welded_ranges, indices
+
+    def __create_gltf(self, attributes, ranges, materials, transform, indices=None):
+        """
+        Create the header and the binary body of the glTF.
+        :param attributes: a dict (attribute name -> array of the attribute for all the vertices)
+        :param ranges: the (material index, start, end) of the vertices of each primitive
+        :param materials: a list of GlTFMaterial
+        :param transform: the flattened matrix of the node of the glTF
+        :param indices: the indices of the vertices of the triangles of each primitive, None when the glTF isn't indexed
+
+        :return: a GlTF
+        """
+        # Each attribute is a buffer view, written one after the other in the body.
+        # The indices of all the primitives are the last buffer view (each primitive is padded to 4 bytes)
+        arrays = [array.reshape(-1) for array in attributes.values()]
+        if indices is not None:
+            indices = [primitive_indices.astype(np.uint16 if end - start <= 0xFFFF else np.uint32)
+                       for primitive_indices, (_, start, end) in zip(indices, ranges)]
+            indices_offsets = np.cumsum([0] + [(primitive_indices.nbytes + 3) // 4 * 4 for primitive_indices in indices])
+            index_array = np.zeros(indices_offsets[-1], dtype=np.uint8)
+            for primitive_indices, offset in zip(indices, indices_offsets):
+                index_array[offset:offset + primitive_indices.nbytes] = primitive_indices.view(np.uint8)
+            arrays.append(index_array)
+
+        buffer_views = list()
+        byte_offset = 0
+        for array in arrays:
+            buffer_views.append({
+                'buffer': 0,
+                'byteLength': int(array.nbytes),
+                'byteOffset': byte_offset,
+                'target': GlTFWriter.ARRAY_BUFFER
+            })
+            byte_offset += int(array.nbytes)
+        # The attributes padded to 4 bytes per vertex (the quantized attributes) have a stride
+        for (name, array), buffer_view in zip(attributes.items(), buffer_views):
+            nb_stored_components = array.reshape(len(array), -1).shape[1]
+            if nb_stored_components > GlTFWriter.NB_COMPONENTS[GlTFWriter.ATTRIBUTE_TYPES[name]]:
+                buffer_view['byteStride'] = nb_stored_components * array.itemsize
+        if indices is not None:
+            buffer_views[-1]['target'] = GlTFWriter.ELEMENT_ARRAY_BUFFER
+        body = np.empty(byte_offset, dtype=np.uint8)
+        for array, buffer_view in zip(arrays, buffer_views):
+            body[buffer_view['byteOffset']:buffer_view['byteOffset'] + buffer_view['byteLength']] = array.view(np.uint8)
+
+        # One primitive per material, each primitive has an accessor per attribute on its range of vertices
+        accessors = list()
+        primitives = list()
+        for primitive_index, (material_index, start, end) in enumerate(ranges):
+            primitive_attributes = dict()
+            for view_index, (name, array) in enumerate(attributes.items()):
+                values = array[start:end].reshape(end - start, -1)
+                accessor_type = GlTFWriter.ATTRIBUTE_TYPES[name]
+                accessor = {
+                    'bufferView': view_index,
+                    'byteOffset': int(start * values.shape[1] * values.itemsize),
+                    'componentType': GlTFWriter.COMPONENT_TYPES[values.dtype],
+                    'count': int(end - start),
+                    'type': accessor_type
+                }
+                if values.dtype == np.int8:
+                    # The quantized normals are normalized integers
+                    accessor['normalized'] = True
+                else:
+                    values = values[:, :GlTFWriter.NB_COMPONENTS[accessor_type]]
+                    accessor['max'] = values.max(axis=0).tolist()
+                    accessor['min'] = values.min(axis=0).tolist()
+                primitive_attributes[name] = len(accessors)
+                accessors.append(accessor)
+            primitive = {
+                'attributes': primitive_attributes,
+                'material': material_index,
+                'mode': GlTFWriter.TRIANGLES
+            }
+            if indices is not None:
+                primitive['indices'] = len(accessors)
+                accessors.append({
+                    'bufferView': len(buffer_views) - 1,
+                    'byteOffset': int(indices_offsets[primitive_index]),
+                    'componentType': GlTFWriter.UNSIGNED_SHORT if indices[primitive_index].dtype == np.uint16 else GlTFWriter.UNSIGNED_INT,
+                    'count': len(indices[primitive_index]),
+                    'type': 'SCALAR'
+                })
+            primitives.append(primitive)
+
+        header = {
+            'asset': {
+                'generator': 'py3dtiles',
+                'version': '2.0'
+            },
+            'scene': 0,
+            'scenes': [{'nodes': [0]}],
+            'nodes': [{
+                'matrix': [float(e) for e in transform],
+                'mesh': 0
+            }],
+            'meshes': [{'primitives': primitives}],
+            'materials': list(),
+            'accessors': accessors,
+            'bufferViews': buffer_views,
+            'buffers': [{'byteLength': byte_offset}]
+        }
+        if self.quantized:
+            header['extensionsUsed'] = ['KHR_mesh_quantization']
+            header['extensionsRequired'] = ['KHR_mesh_quantization']
+
+        images = list()
+        for material in materials:
+            texture_index = None
+            if material.textureUri is not None:
+                texture_index = len(images)
+                images.append({'uri': material.textureUri})
+            header['materials'].append(GlTFWriter.get_material_dict(material, texture_index))
+        if len(images) > 0:
+            header['textures'] = [{'sampler': 0, 'source': i} for i in range(len(images))]
+            header['images'] = images
+            header['samplers'] = [{
+                'magFilter': 9729,
+                'minFilter': 9987,
+                'wrapS': 10497,
+                'wrapT': 10497
+            }]
+
+        gltf = GlTF()
+        gltf.header = header
+        gltf.body = body
+        return gltf
@@ -1,9 +1,10 @@
 import os
 from os import listdir
 import json
-from shapely.geometry import Point, Polygon
+import numpy as np
+from shapely.geometry import Polygon
 from ..Common import FeatureList
-from ..Common import kd_tree
+from ..Common import kd_tree, find_containing_polygons
 from typing import List
 
 
@@ -62,7 +63,7 @@ class Groups():
     # Used to put in a same group the features which are in a same 1000 m^3 cube.
     DEFAULT_CUBE_SIZE = 1000
 
-    def __init__(self, feature_list: FeatureList, polygons_path=None, kd_tree_max=500, as_lods=False):
+    def __init__(self, feature_list: FeatureList, polygons_path=None, kd_tree_max=500, as_lods=False, max_tile_size=None):
         """
         Distribute the features contained in feature_list into different Group
         The way to distribute the features depends on the parameters
@@ -70,6 +71,7 @@ class Groups():
         :param polygons_path: the path to a folder containing polygons as .geojson files.
         When this param is not None, it means we want to group features by polygons
         :param kd_tree_max: the maximum number of features in each list created by the kd_tree
+        :param max_tile_size: the maximum estimated size (in bytes) of each list created by the kd_tree
         """
         if ((type(feature_list) is list)):
             self.group_array_of_feature_list(feature_list)
@@ -80,7 +82,7 @@ class Groups():
             elif as_lods:
                 self.group_feature_list(feature_list)
             else:
-                self.group_objects_with_kdtree(feature_list, kd_tree_max)
+                self.group_objects_with_kdtree(feature_list, kd_tree_max, max_tile_size)
             self.set_materials(self.materials)
 
     def get_groups_as_list(self):
@@ -112,15 +114,17 @@ class Groups():
         """
         self.groups = [Group(FeatureList([feature])) for feature in feature_list]
 
-    def group_objects_with_kdtree(self, feature_list: FeatureList, kd_tree_max=500):
+    def group_objects_with_kdtree(self, feature_list: FeatureList, kd_tree_max=500, max_tile_size=None):
         """
         Create groups of features. The features are distributed into FeatureList of (by default) max 500 features.
         The distribution depends on the centroid of each feature.
         :param feature_list: a FeatureList
         :param kd_tree_max: the maximum number of features in each FeatureList
+        :param max_tile_size: when defined, the FeatureList are also balanced by the estimated size of the features
+        and their size is limited to this value (in bytes)
         """
         groups = list()
-        objects = kd_tree(feature_list, kd_tree_max)
+        objects = kd_tree(feature_list, kd_tree_max, max_size=max_tile_size)
         for feature_list in objects:
             group = Group(feature_list)
             groups.append(group)
@@ -169,19 +173,15 @@ class Groups():
         features_dict = {}
         features_without_poly = list()
 
-        # For each feature, find the polygon containing it
-        for i, feature in enumerate(feature_list):
-            p = Point(feature.get_centroid())
-            in_polygon = False
-            for index, polygon in enumerate(polygons):
-                if p.within(polygon):
-                    if index not in features_dict:
-                        features_dict[index] = []
-                    features_dict[index].append(i)
-                    in_polygon = True
-                    break
-            if not in_polygon:
+        # For each feature, find the polygon containing it (all the features are queried at once in a spatial index)
+        centroids = np.array([feature.get_centroid() for feature in feature_list], dtype=np.float64)
+        for i, index in enumerate(find_containing_polygons(centroids, polygons).tolist()):
+            if index < 0:
                 features_without_poly.append(i)
+            else:
+                if index not in features_dict:
+                    features_dict[index] = []
+                features_dict[index].append(i)
 
         # Create a list of Group
         groups = list()
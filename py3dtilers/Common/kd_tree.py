@@ -1,13 +1,65 @@
+import numpy as np
 from .feature import FeatureList
 
 
-def kd_tree(feature_list, maxNumObjects, depth=0):
+def kd_tree_indices(centroids, maxNumObjects, depth=0, weights=None, max_weight=None):
+    """
+    Distribute points into groups with a kd-tree.
+    Each node is split at the median of its points along the X or Y axis (alternatively),
+    found with np.argpartition instead of a full sort.
+    When the points are weighted, a node is also split while its weight is above the max weight,
+    and it is split at its weighted median so the two children have about the same weight.
+    :param centroids: a (n, 2) (or (n, 3)) array of points, only X and Y are used
+    :param maxNumObjects: the max number of points in each group
+    :param depth: the depth of the root node, which gives the axis of the first split
+    :param weights: an optional array containing the weight of each point (e.g. the size of the features)
+    :param max_weight: the max weight of each group (only used with weights)
+
+    :return: a list of arrays containing the indices of the points of each group
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    weighted = weights is not None and max_weight is not None
+    if weighted:
+        weights = np.asarray(weights, dtype=np.float64)
+    groups = list()
+    # The nodes are processed depth first, left before right, so the groups are in the same order as a recursion
+    stack = [(np.arange(len(centroids)), depth)]
+    while len(stack) > 0:
+        indices, depth = stack.pop()
+        # The module argument of 2 hard-wires the fact that this kd_tree is in fact a 2D_tree.
+        axis = depth % 2
+        median = len(indices) // 2
+        too_heavy = weighted and len(indices) > 1 and weights[indices].sum() > max_weight
+        if too_heavy:
+            indices = indices[np.argsort(centroids[indices, axis], kind='stable')]
+            cumulated_weights = np.cumsum(weights[indices])
+            median = int(np.searchsorted(cumulated_weights, cumulated_weights[-1] / 2))
+            median = min(max(median, 1), len(indices) - 1)
+            if len(indices) - median > maxNumObjects or median > maxNumObjects:
+                # The number of points is also limited, the heaviest child would otherwise keep too many points
+                median = len(indices) // 2
+        if too_heavy or (len(indices) > 1 and len(indices) - median > maxNumObjects):
+            if median > 0 and not too_heavy:
+                indices = indices[np.argpartition(centroids[indices, axis], median)]
+            stack.append((indices[median:], depth + 1))
+            stack.append((indices[:median], depth + 1))
+        else:
+            # Leaves are sorted along the axis (stable sort), like the features of a sorted list
+            indices = indices[np.argsort(centroids[indices, axis], kind='stable')]
+            if median > 0:
+                groups.append(indices[:median])
+            groups.append(indices[median:])
+    return groups
+
+
+def kd_tree(feature_list, maxNumObjects, depth=0, max_size=None):
     """
     Distribute the features into FeatureList.
     The objects are distributed by their centroid.
     :param objects: the features to distribute
     :param maxNumObjects: the max number of objects in each new group
     :param depth: the depth of the recursion
+    :param max_size: when defined, the max estimated size (in bytes) of each new group (see Feature.get_size_estimate)
 
     :return: a list of FeatureList
     """
@@ -18,25 +70,31 @@ def kd_tree(feature_list, maxNumObjects, depth=0):
 
     derived = feature_list.__class__
 
-    # The module argument of 2 (in the next line) hard-wires the fact that
-    # this kd_tree is in fact a 2D_tree.
-    axis = depth % 2
-
-    # Within the sorting criteria point[1] refers to the centroid of the
-    # bounding boxes of the city objects. And thus, depending on the value of
-    # axis, we alternatively sort on the X or Y coordinate of those centroids:
+    # The features are partitioned through an array of their centroids,
+    # the FeatureList are only created for the leaves of the tree
+    features = feature_list.get_features()
+    centroids = np.array([feature.get_centroid()[:2] for feature in features], dtype=np.float64).reshape(-1, 2)
+    sizes = None
+    if max_size is not None:
+        sizes = get_size_estimates(features)
+        if sizes is None:
+            print("The size of the features can't be estimated, the tiles are only limited by their number of features.")
 
-    feature_list.set_features(sorted(feature_list, key=lambda obj: obj.get_centroid()[axis]))
-    median = len(feature_list) // 2
-    lObjects = feature_list[:median]
-    rObjects = feature_list[median:]
     pre_tiles = derived()
-    if len(lObjects) > maxNumObjects or len(rObjects) > maxNumObjects:
-        pre_tiles.extend(kd_tree(lObjects, maxNumObjects, depth + 1))
-        pre_tiles.extend(kd_tree(rObjects, maxNumObjects, depth + 1))
-    else:
-        if len(lObjects) > 0:
-            pre_tiles.append(lObjects)
-        if len(rObjects) > 0:
-            pre_tiles.append(rObjects)
+    for indices in kd_tree_indices(centroids, maxNumObjects, depth, sizes, max_size):
+        pre_tiles.append(derived([features[i] for i in indices]))
     return pre_tiles
+
+
+def get_size_estimates(features):
+    """
+    Return the estimated size of each feature. The features without estimation get the average size.
+    :param features: a list of Feature
+    :return: an array of sizes, or None when no size can be estimated
+    """
+    sizes = np.array([feature.get_size_estimate() for feature in features], dtype=np.float64)
+    unknown = np.isnan(sizes)
+    if unknown.all():
+        return None
+    sizes[unknown] = sizes[~unknown].mean()
+    return sizes
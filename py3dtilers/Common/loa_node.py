@@ -14,3 +14,8 @@ class LoaNode(GeometryNode):
     def __init__(self, features_node: GeometryNode, geometric_error=None, polygons=list()):
         feature_list = LoaFeatureList(polygons=polygons, features_node=features_node)
         super().__init__(feature_list, geometric_error=geometric_error)
+
+    def set_tile_index(self, tile_index):
+        # The identifiers of the LOAs contain the index of their tile, to be unique in the tileset
+        self.feature_list.tile_index = tile_index
+        return super().set_tile_index(tile_index)
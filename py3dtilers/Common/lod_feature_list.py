@@ -1,5 +1,6 @@
-from shapely.geometry import Point, Polygon
-from ..Common import FeatureList, ExtrudedPolygon
+import numpy as np
+from shapely.geometry import Polygon
+from ..Common import FeatureList, ExtrudedPolygon, find_containing_polygons
 from typing import TYPE_CHECKING, List
 
 if TYPE_CHECKING:
@@ -30,26 +31,35 @@ class Lod1FeatureList(LodFeatureList):
 
 class LoaFeatureList(LodFeatureList):
 
-    loa_index = 0
-
     def __init__(self, features=None, polygons=list(), features_node: 'GeometryNode' = None):
         super().__init__(features, features_node=features_node)
         self.polygons = polygons
+        # The index of the tile of the LOAs, set by the LoaNode
+        self.tile_index = 0
 
     def set_features_geom(self, user_arguments=None):
         """
         Set the geometry of the features.
         Keep only the features with geometry.
         """
-        features = self.features_node.feature_list.get_features().copy()
-
-        for polygon in self.polygons:
-            feature_list = FeatureList(self.find_features_in_polygon(features, Polygon(polygon)))
-            if len(feature_list) > 0:
-                [features.remove(feature) for feature in feature_list]
-                self.append(self.create_loa(feature_list, polygon))
-
-        for feature in features:
+        features = self.features_node.feature_list.get_features()
+
+        # Each feature belongs to the first polygon containing its centroid
+        centroids = np.array([feature.get_centroid() for feature in features], dtype=np.float64)
+        polygon_indices = find_containing_polygons(centroids, [Polygon(polygon) for polygon in self.polygons])
+        features_in_polygons = [list() for _ in self.polygons]
+        features_without_polygon = list()
+        for feature, index in zip(features, polygon_indices.tolist()):
+            if index < 0:
+                features_without_polygon.append(feature)
+            else:
+                features_in_polygons[index].append(feature)
+
+        for polygon, features_in_polygon in zip(self.polygons, features_in_polygons):
+            if len(features_in_polygon) > 0:
+                self.append(self.create_loa(FeatureList(features_in_polygon), polygon))
+
+        for feature in features_without_polygon:
             self.append(self.create_loa(FeatureList([feature])))
 
         self.features_node = None
@@ -61,24 +71,21 @@ class LoaFeatureList(LodFeatureList):
         :param polygon: a Shapely Polygon
         :return: a list of Feature
         """
-        features_in_polygon = list()
-        for feature in features:
-            p = Point(feature.get_centroid())
-            if p.within(polygon):
-                features_in_polygon.append(feature)
-        return features_in_polygon
+        centroids = np.array([feature.get_centroid() for feature in features], dtype=np.float64)
+        polygon_indices = find_containing_polygons(centroids, [polygon])
+        return [feature for feature, index in zip(features, polygon_indices) if index == 0]
 
     def create_loa(self, feature_list: 'FeatureList', polygon: 'Polygon' = None):
         """
         Create a LOA (3D extrusion of a polygon). The LOA is a 3D geometry containing a group of features.
         :param feature_list: the features contained in the LOA
         :param polygon: a polygon as list of 3D points
-        :param int index: an index used for the LOA identifier
 
         :return: a 3D extrusion of the polygon
         """
-        index = LoaFeatureList.loa_index
-        LoaFeatureList.loa_index += 1
+        # The identifier only depends on the index of the tile and on the position of the LOA in the tile,
+        # so it is unique in the tileset and doesn't change when the tiles are created in different processes
+        index = str(self.tile_index) + "_" + str(len(self))
 
-        extruded_polygon = ExtrudedPolygon("loa_" + str(index), feature_list, polygon=polygon)
+        extruded_polygon = ExtrudedPolygon("loa_" + index, feature_list, polygon=polygon)
         return extruded_polygon
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+def compute_face_normals(triangles):
+    """
+    Compute the normal of each triangle at once.
+    The normal of a degenerated triangle is [0, 0, 1].
+    :param triangles: a (n_triangles, 3, 3) array
+
+    :return: a (n_triangles, 3) array of unit vectors
+    """
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    norms = np.linalg.norm(normals, axis=1)
+    degenerated = norms == 0
+    normals[degenerated] = [0, 0, 1]
+    norms[degenerated] = 1
+    return normals / norms[:, np.newaxis]
+
+
+def compute_corner_angles(triangles):
+    """
+    Compute the angle of each corner of the triangles.
+    :param triangles: a (n_triangles, 3, 3) array
+
+    :return: a (n_triangles, 3) array of angles, in radians
+    """
+    next_edges = np.roll(triangles, -1, axis=1) - triangles
+    previous_edges = np.roll(triangles, 1, axis=1) - triangles
+    cross_norms = np.linalg.norm(np.cross(next_edges, previous_edges), axis=2)
+    dots = np.einsum('ijk,ijk->ij', next_edges, previous_edges)
+    return np.arctan2(cross_norms, dots)
+
+
+def sum_by_index(indices, vectors, length):
+    """
+    Sum the vectors having the same index.
+    :param indices: the index of each vector
+    :param vectors: a (n, 3) array
+    :param length: the number of indices
+
+    :return: a (length, 3) array
+    """
+    return np.column_stack([np.bincount(indices, weights=vectors[:, axis], minlength=length) for axis in range(3)])
+
+
+def compute_vertex_normals(triangles, crease_angle=None, groups=None):
+    """
+    Compute the normal of each vertex of the triangles at once.
+    Without crease angle, the normal of a vertex is the normal of its triangle (flat shading).
+    With a crease angle, the normal of a vertex is the average of the normals of the triangles sharing its position,
+    weighted by the angle of each triangle at this position. Only the triangles whose normal is within the
+    crease angle of the normal of the vertex's triangle are averaged, so the sharp edges (e.g. between a wall and a roof) stay sharp.
+    :param triangles: a (n_triangles, 3, 3) array
+    :param crease_angle: the crease angle in degrees, None for flat normals
+    :param groups: an optional array containing the group of each triangle (e.g. its feature), the triangles
+    of different groups are never averaged
+
+    :return: a (n_triangles, 3, 3) array of unit vectors
+    """
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    face_normals = compute_face_normals(triangles)
+    flat_normals = np.repeat(face_normals[:, np.newaxis], 3, axis=1)
+    if crease_angle is None or len(triangles) == 0:
+        return flat_normals
+
+    # Identify the corners sharing the same position (and the same group) as rows of bytes,
+    # adding 0 turns the negative zeros into zeros, which have different bytes
+    corners = triangles.reshape(-1, 3) + 0
+    if groups is not None:
+        corner_groups = np.repeat(np.asarray(groups, dtype=np.float64).reshape(-1), 3)
+        corners = np.column_stack((corners, corner_groups))
+    corners = np.ascontiguousarray(corners)
+    keys = corners.view(np.dtype((np.void, corners.itemsize * corners.shape[1]))).reshape(-1)
+    _, vertex_ids = np.unique(keys, return_inverse=True)
+    vertex_ids = vertex_ids.reshape(-1)
+
+    weighted_normals = (face_normals[:, np.newaxis] * compute_corner_angles(triangles)[:, :, np.newaxis]).reshape(-1, 3)
+    corner_normals = flat_normals.reshape(-1, 3)
+
+    if crease_angle >= 180:
+        # Every triangle sharing the vertex is averaged
+        normals = sum_by_index(vertex_ids, weighted_normals, vertex_ids.max() + 1)[vertex_ids]
+    else:
+        # Pair each corner with all the corners of the same vertex, and keep the pairs within the crease angle
+        order = np.argsort(vertex_ids, kind='stable')
+        counts = np.bincount(vertex_ids)
+        first_corners = np.cumsum(counts) - counts
+        sizes = counts[vertex_ids[order]]
+        corners_in_pairs = np.repeat(order, sizes)
+        pair_offsets = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        partners = order[np.repeat(first_corners[vertex_ids[order]], sizes) + pair_offsets]
+        within_crease = np.einsum('ij,ij->i', corner_normals[corners_in_pairs], corner_normals[partners]) >= np.cos(np.radians(crease_angle))
+        normals = sum_by_index(corners_in_pairs[within_crease], weighted_normals[partners[within_crease]], len(corner_normals))
+
+    norms = np.linalg.norm(normals, axis=1)
+    # The normals cancelling each other keep the normal of their triangle
+    invalid = norms < 1e-12
+    normals[invalid] = corner_normals[invalid]
+    norms[invalid] = 1
+    return (normals / norms[:, np.newaxis]).reshape(-1, 3, 3)
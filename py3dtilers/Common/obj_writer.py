@@ -1,5 +1,6 @@
 from pathlib import Path
 import numpy as np
+from .normals import compute_face_normals, compute_vertex_normals
 
 
 class ObjWriter():
@@ -7,7 +8,11 @@ class ObjWriter():
     A writer which write triangles from Feature instances into an OBJ file
     """
 
-    def __init__(self):
+    def __init__(self, crease_angle=None):
+        """
+        :param crease_angle: the crease angle (in degrees) of the smooth normals, None for flat normals
+        """
+        self.crease_angle = crease_angle
         self.vertices = list()
         self.normals = list()
         self.triangles = list()
@@ -61,25 +66,23 @@ class ObjWriter():
         :param triangle: a triangle
         :return: the normal vector of the triangle.
         """
-        U = triangle[1] - triangle[0]
-        V = triangle[2] - triangle[0]
-        N = np.cross(U, V)
-        norm = np.linalg.norm(N)
-        return np.array([0, 0, 1]) if norm == 0 else N / norm
+        return compute_face_normals([triangle])[0]
 
-    def add_triangle(self, triangle, color, offset=np.array([0, 0, 0])):
+    def add_triangle(self, triangle, color, offset=np.array([0, 0, 0]), normals=None):
         """
         Add a triangle to the OBJ.
         An offset can be added to the triangle's position.
         :param triangle: the triangle
         :param color: the color of the triangle
         :param offset: a 3D point as numpy array
+        :param normals: the normals of the 3 vertices, by default the normal of the triangle
         """
         vertex_indexes = list()
         normal_indexes = list()
 
-        normal = self.compute_triangle_normal(triangle)
-        for vertex in triangle:
+        if normals is None:
+            normals = [self.compute_triangle_normal(triangle)] * 3
+        for vertex, normal in zip(triangle, normals):
             vertex_indexes.append(self.get_vertex_index(vertex + offset, color))
             normal_indexes.append(self.get_normal_index(normal))
 
@@ -93,8 +96,11 @@ class ObjWriter():
         :param offset: a 3D point as numpy array
         """
         for geometry in feature_list:
-            for triangle in geometry.get_geom_as_triangles():
-                self.add_triangle(triangle, feature_list.materials[geometry.material_index].rgba, offset)
+            triangles = geometry.get_geom_as_array()
+            # The normals of all the triangles of the feature are computed at once
+            normals = compute_vertex_normals(triangles, self.crease_angle)
+            for triangle, triangle_normals in zip(triangles, normals):
+                self.add_triangle(triangle, feature_list.materials[geometry.material_index].rgba, offset, triangle_normals)
 
     def write_obj(self, file_name):
         """
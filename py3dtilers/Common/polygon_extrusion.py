@@ -1,5 +1,6 @@
 import numpy as np
 from ..Common import Feature
+from .extrusion import extrude_rings
 from alphashape import alphashape
 from earclip import triangulate
 from shapely.geometry import Polygon
@@ -29,26 +30,12 @@ class ExtrudedPolygon(Feature):
         Set the geometry of the feature.
         :return: a boolean
         """
-        geom_triangles = list()
-        for feature in self.features:
-            geom_triangles.extend(feature.get_geom_as_triangles())
-
-        points = list()
-        minZ = np.Inf
-        average_maxZ = 0
+        positions = np.concatenate([feature.get_geom_as_array() for feature in self.features])
 
         # Compute the footprint of the geometry
-        for triangle in geom_triangles:
-            maxZ = np.NINF
-            for point in triangle:
-                if len(point) >= 3:
-                    points.append([point[0], point[1]])
-                    if point[2] < minZ:
-                        minZ = point[2]
-                    if point[2] > maxZ:
-                        maxZ = point[2]
-            average_maxZ += maxZ
-        average_maxZ /= len(geom_triangles)
+        points = positions[:, :, :2].reshape(-1, 2)
+        minZ = positions[:, :, 2].min()
+        average_maxZ = positions[:, :, 2].max(axis=1).mean()
         if self.polygon is not None:
             points = self.polygon
         else:
@@ -70,31 +57,12 @@ class ExtrudedPolygon(Feature):
         Extrude the 2D footprint to create a triangulated 3D mesh.
         """
         coordinates = self.points
-        length = len(coordinates)
-        vertices = [None] * (2 * length)
-        minZ = self.min_height
-        maxZ = self.max_height
-
-        for i, coord in enumerate(coordinates):
-            vertices[i] = np.array([coord[0], coord[1], minZ])
-            vertices[i + length] = np.array([coord[0], coord[1], maxZ])
-
-        # Contains the triangles vertices. Used to create 3D tiles
-        triangles = list()
-
-        # Triangulate the feature footprint
-        poly_triangles = triangulate(coordinates)
-
-        # Create upper face triangles
-        for tri in poly_triangles:
-            upper_tri = [np.array([coord[0], coord[1], maxZ]) for coord in tri]
-            triangles.append(upper_tri)
+        footprint = np.array([[coord[0], coord[1], self.min_height] for coord in coordinates], dtype=np.float64)
 
-        # Create side triangles
-        for i in range(0, length):
-            triangles.append([vertices[i], vertices[length + i], vertices[length + ((i + 1) % length)]])
-            triangles.append([vertices[i], vertices[length + ((i + 1) % length)], vertices[((i + 1) % length)]])
+        # Triangulate the feature footprint, then find the index of each point of the triangles
+        point_indices = {(coord[0], coord[1]): i for i, coord in enumerate(footprint)}
+        poly_triangles = [[point_indices[(coord[0], coord[1])] for coord in tri] for tri in triangulate(coordinates)]
 
         self.feature_list = None
-        self.geom.triangles.append(triangles)
+        self.geom.triangles = [extrude_rings([footprint], poly_triangles, self.max_height - self.min_height)]
         self.set_box()
@@ -0,0 +1,29 @@
+import numpy as np
+from shapely import STRtree, points as create_points
+
+
+def find_containing_polygons(centroids, polygons):
+    """
+    Find the polygon containing each point, with a single query of a spatial index (STRtree) built on the polygons.
+    A point on the boundary of a polygon isn't in the polygon (like with Point.within).
+    When several polygons contain a point, the first one (in the list of polygons) is kept.
+    :param centroids: a (n, 2) (or (n, 3)) array of points, only X and Y are used
+    :param polygons: a list of Shapely polygons
+
+    :return: an array containing the index of the polygon containing each point, or -1 when no polygon contains the point
+    """
+    polygon_indices = np.full(len(centroids), -1, dtype=np.int64)
+    if len(centroids) == 0 or len(polygons) == 0:
+        return polygon_indices
+    centroids = np.asarray(centroids, dtype=np.float64)
+
+    tree = STRtree(polygons)
+    point_indices, matches = tree.query(create_points(centroids[:, :2]), predicate='within')
+
+    # Keep the match with the lowest polygon index for each point
+    order = np.lexsort((matches, point_indices))
+    point_indices, matches = point_indices[order], matches[order]
+    first = np.ones(len(point_indices), dtype=bool)
+    first[1:] = point_indices[1:] != point_indices[:-1]
+    polygon_indices[point_indices[first]] = matches[first]
+    return polygon_indices
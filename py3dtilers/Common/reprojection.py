@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+import numpy as np
+from pyproj import Transformer
+
+
+@lru_cache(maxsize=None)
+def get_transformer(crs_in, crs_out, always_xy=False):
+    """
+    Return a Transformer from crs_in to crs_out.
+    The transformers are cached for the whole process, since creating them is costly.
+    :param crs_in: the input CRS (e.g. 'EPSG:3946')
+    :param crs_out: the output CRS
+    :param always_xy: if True, the transformer uses the traditional GIS order (longitude, latitude)
+    :return: a pyproj Transformer
+    """
+    return Transformer.from_crs(crs_in, crs_out, always_xy=always_xy)
+
+
+def reproject_vertices(vertices, transformer, offset=np.array([0, 0, 0])):
+    """
+    Reproject vertices with a single call of the transformer.
+    :param vertices: a (n_vertices, 3) array
+    :param transformer: a pyproj Transformer
+    :param offset: an offset added to the vertices before reprojecting them
+    :return: a (n_vertices, 3) array
+    """
+    vertices = np.asarray(vertices, dtype=np.float64) + offset
+    return np.column_stack(transformer.transform(vertices[:, 0], vertices[:, 1], vertices[:, 2]))
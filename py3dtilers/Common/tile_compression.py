@@ -0,0 +1,301 @@
+import importlib
+import importlib.util
+import numpy as np
+
+
+class TileCompressor():
+    """
+    The base class of the compression stages applied on the glTF of the tiles, once encoded by the GlTFWriter.
+    A compressor replaces the geometry of the glTF by compressed buffers and declares the glTF extension
+    needed to decode them. The compression libraries are optional dependencies, imported when the tiles are compressed.
+    """
+
+    # The name of the glTF extension and of the Python module used by the compressor
+    extension_name = None
+    module_name = None
+
+    COMPONENT_DTYPES = {
+        5120: np.int8,
+        5121: np.uint8,
+        5122: np.int16,
+        5123: np.uint16,
+        5125: np.uint32,
+        5126: np.float32
+    }
+    NB_COMPONENTS = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4}
+
+    @classmethod
+    def is_available(cls):
+        """
+        Check if the Python module of the compressor is installed.
+        :return: a boolean
+        """
+        return importlib.util.find_spec(cls.module_name) is not None
+
+    @classmethod
+    def get_module(cls):
+        """
+        Import the Python module of the compressor.
+        :return: a module
+        """
+        return importlib.import_module(cls.module_name)
+
+    def compress(self, gltf):
+        """
+        Compress the geometry of a glTF.
+        :param gltf: a GlTF, created by a GlTFWriter
+        :return: the compressed GlTF
+        """
+        raise NotImplementedError
+
+    def add_extension(self, header):
+        """
+        Declare the extension of the compressor in the header of a glTF. The extension is required since there is no uncompressed data.
+        :param header: the header of a glTF
+        """
+        for key in ['extensionsUsed', 'extensionsRequired']:
+            header.setdefault(key, list())
+            if self.extension_name not in header[key]:
+                header[key].append(self.extension_name)
+
+    @staticmethod
+    def get_accessor_data(header, body, accessor_index):
+        """
+        Read the values of an accessor.
+        :param header: the header of a glTF
+        :param body: the binary body of the glTF
+        :param accessor_index: the index of the accessor
+
+        :return: a (count, n_components) array
+        """
+        accessor = header['accessors'][accessor_index]
+        buffer_view = header['bufferViews'][accessor['bufferView']]
+        dtype = np.dtype(TileCompressor.COMPONENT_DTYPES[accessor['componentType']])
+        nb_components = TileCompressor.NB_COMPONENTS[accessor['type']]
+        stride = buffer_view.get('byteStride', nb_components * dtype.itemsize)
+        start = buffer_view['byteOffset'] + accessor.get('byteOffset', 0)
+        rows = np.frombuffer(body[start:start + accessor['count'] * stride].tobytes(), dtype=np.uint8).reshape(accessor['count'], stride)
+        return np.ascontiguousarray(rows[:, :nb_components * dtype.itemsize]).view(dtype)
+
+    @staticmethod
+    def concatenate_buffers(buffers):
+        """
+        Concatenate binary buffers, each buffer being aligned on 4 bytes.
+        :param buffers: a list of bytes
+        :return: the concatenated buffers as a uint8 array, and the offset of each buffer
+        """
+        offsets = list()
+        chunks = list()
+        byte_offset = 0
+        for buffer in buffers:
+            offsets.append(byte_offset)
+            padding = (4 - len(buffer) % 4) % 4
+            chunks.append(np.frombuffer(bytes(buffer) + b'\0' * padding, dtype=np.uint8))
+            byte_offset += len(buffer) + padding
+        body = np.concatenate(chunks) if len(chunks) > 0 else np.empty(0, dtype=np.uint8)
+        return body, offsets
+
+
+class MeshoptCompressor(TileCompressor):
+    """
+    Compress the buffer views of the glTF with the meshoptimizer codecs (EXT_meshopt_compression).
+    Each buffer view is encoded separately: the vertex attributes with the ATTRIBUTES mode,
+    the indices with the TRIANGLES mode. The buffer views then point to a fallback buffer without data.
+    The positions and normals are best compressed when they are quantized (see GlTFWriter).
+    """
+
+    extension_name = 'EXT_meshopt_compression'
+    module_name = 'meshoptimizer'
+
+    def compress(self, gltf):
+        meshoptimizer = self.get_module()
+        if hasattr(meshoptimizer, 'encode_vertex_version'):
+            # EXT_meshopt_compression only supports the version 0 of the vertex codec
+            meshoptimizer.encode_vertex_version(0)
+        header, body = gltf.header, gltf.body
+        primitives = [primitive for mesh in header['meshes'] for primitive in mesh['primitives']]
+
+        # The indices are encoded as 32 bits indices, the index accessors are rewritten accordingly
+        index_views = dict()
+        for primitive in primitives:
+            if 'indices' in primitive:
+                accessor_index = primitive['indices']
+                view_index = header['accessors'][accessor_index]['bufferView']
+                index_views.setdefault(view_index, list()).append(accessor_index)
+
+        encoded_views = list()
+        fallback_length = 0
+        for view_index, buffer_view in enumerate(header['bufferViews']):
+            if view_index in index_views:
+                accessors = sorted(index_views[view_index], key=lambda i: header['accessors'][i].get('byteOffset', 0))
+                indices = [TileCompressor.get_accessor_data(header, body, i).reshape(-1).astype(np.uint32) for i in accessors]
+                offsets = np.cumsum([0] + [4 * len(accessor_indices) for accessor_indices in indices])
+                for accessor_index, offset in zip(accessors, offsets):
+                    header['accessors'][accessor_index]['byteOffset'] = int(offset)
+                    header['accessors'][accessor_index]['componentType'] = 5125
+                indices = np.concatenate(indices)
+                vertex_count = int(indices.max()) + 1 if len(indices) > 0 else 0
+                encoded_views.append(meshoptimizer.encode_index_buffer(indices, len(indices), vertex_count))
+                extension = {'byteStride': 4, 'count': len(indices), 'mode': 'TRIANGLES'}
+                buffer_view['byteLength'] = int(offsets[-1])
+            else:
+                stride = buffer_view.get('byteStride', self.get_element_size(header, view_index))
+                count = buffer_view['byteLength'] // stride
+                data = body[buffer_view['byteOffset']:buffer_view['byteOffset'] + buffer_view['byteLength']].reshape(count, stride)
+                encoded_views.append(meshoptimizer.encode_vertex_buffer(data, count, stride))
+                extension = {'byteStride': stride, 'count': count, 'mode': 'ATTRIBUTES'}
+                buffer_view['byteStride'] = stride
+            buffer_view['extensions'] = {self.extension_name: extension}
+            buffer_view['buffer'] = 1
+            buffer_view['byteOffset'] = fallback_length
+            fallback_length += (buffer_view['byteLength'] + 3) // 4 * 4
+
+        compressed_body, offsets = TileCompressor.concatenate_buffers(encoded_views)
+        for buffer_view, offset, encoded_view in zip(header['bufferViews'], offsets, encoded_views):
+            buffer_view['extensions'][self.extension_name].update({'buffer': 0, 'byteOffset': offset, 'byteLength': len(encoded_view)})
+        header['buffers'] = [
+            {'byteLength': len(compressed_body)},
+            {'byteLength': fallback_length, 'extensions': {self.extension_name: {'fallback': True}}}
+        ]
+        self.add_extension(header)
+        gltf.body = compressed_body
+        return gltf
+
+    @staticmethod
+    def get_element_size(header, view_index):
+        """
+        Find the size of an element of a buffer view without stride, from the accessors using this buffer view.
+        :param header: the header of a glTF
+        :param view_index: the index of the buffer view
+        :return: the size in bytes
+        """
+        for accessor in header['accessors']:
+            if accessor.get('bufferView') == view_index:
+                dtype = np.dtype(TileCompressor.COMPONENT_DTYPES[accessor['componentType']])
+                return TileCompressor.NB_COMPONENTS[accessor['type']] * dtype.itemsize
+        return 4
+
+
+class DracoCompressor(TileCompressor):
+    """
+    Compress each primitive of the glTF with Draco (KHR_draco_mesh_compression), through the DracoPy bindings.
+    Draco quantizes the positions, normals and UVs itself, the other attributes (vertex colors, batch ids) are encoded losslessly.
+    The encoded primitives are decoded once, to find the ids of the Draco attributes and the number of vertices after compression.
+    """
+
+    extension_name = 'KHR_draco_mesh_compression'
+    module_name = 'DracoPy'
+
+    # Draco attribute types
+    POSITION = 0
+    NORMAL = 1
+    TEX_COORD = 3
+    # The ids of the attributes encoded as generic attributes, DracoPy (2.x) uses them as the unique ids of the Draco attributes
+    GENERIC_IDS = {'COLOR_0': 0, '_BATCHID': 1}
+
+    def __init__(self, quantization_bits=14, compression_level=7):
+        """
+        :param quantization_bits: the number of bits of the quantized positions
+        :param compression_level: the compression level of Draco, from 0 to 10
+        """
+        self.quantization_bits = quantization_bits
+        self.compression_level = compression_level
+
+    def compress(self, gltf):
+        DracoPy = self.get_module()
+        header, body = gltf.header, gltf.body
+
+        encoded_primitives = list()
+        for mesh in header['meshes']:
+            for primitive in mesh['primitives']:
+                # DracoPy expects double precision positions, normals and UVs
+                attributes = {name: TileCompressor.get_accessor_data(header, body, index).astype(np.float64) for name, index in primitive['attributes'].items()}
+                nb_vertices = len(attributes['POSITION'])
+                if 'indices' in primitive:
+                    faces = TileCompressor.get_accessor_data(header, body, primitive['indices']).reshape(-1, 3)
+                else:
+                    faces = np.arange(nb_vertices).reshape(-1, 3)
+                encoded_primitive = DracoPy.encode(
+                    attributes['POSITION'], faces.astype(np.uint32),
+                    quantization_bits=self.quantization_bits,
+                    compression_level=self.compression_level,
+                    normals=attributes.get('NORMAL'),
+                    tex_coord=attributes.get('TEXCOORD_0'),
+                    tex_coord_quantization_bits=12 if 'TEXCOORD_0' in attributes else None,
+                    normal_quantization_bits=10 if 'NORMAL' in attributes else None,
+                    generic_attributes={DracoCompressor.GENERIC_IDS[name]: values.astype(np.float32)
+                                        for name, values in attributes.items() if name in DracoCompressor.GENERIC_IDS} or None)
+                self.update_primitive(header, primitive, DracoPy.decode(encoded_primitive), len(encoded_primitives))
+                encoded_primitives.append(encoded_primitive)
+
+        # The Draco buffers replace all the buffer views of the glTF
+        compressed_body, offsets = TileCompressor.concatenate_buffers(encoded_primitives)
+        header['bufferViews'] = [{'buffer': 0, 'byteOffset': offset, 'byteLength': len(encoded_primitive)}
+                                 for offset, encoded_primitive in zip(offsets, encoded_primitives)]
+        header['buffers'] = [{'byteLength': len(compressed_body)}]
+        self.add_extension(header)
+        gltf.body = compressed_body
+        return gltf
+
+    def update_primitive(self, header, primitive, decoded_mesh, view_index):
+        """
+        Point the accessors of a primitive to its Draco buffer.
+        :param header: the header of a glTF
+        :param primitive: the primitive
+        :param decoded_mesh: the DracoMesh decoded from the Draco buffer
+        :param view_index: the index of the buffer view containing the Draco buffer
+        """
+        draco_ids = dict()
+        for draco_attribute in decoded_mesh.attributes:
+            if draco_attribute['attribute_type'] == DracoCompressor.POSITION:
+                draco_ids['POSITION'] = draco_attribute['unique_id']
+            elif draco_attribute['attribute_type'] == DracoCompressor.NORMAL:
+                draco_ids['NORMAL'] = draco_attribute['unique_id']
+            elif draco_attribute['attribute_type'] == DracoCompressor.TEX_COORD:
+                draco_ids['TEXCOORD_0'] = draco_attribute['unique_id']
+        for name, generic_id in DracoCompressor.GENERIC_IDS.items():
+            draco_ids[name] = generic_id
+
+        nb_vertices = len(decoded_mesh.points)
+        for name, accessor_index in primitive['attributes'].items():
+            accessor = header['accessors'][accessor_index]
+            accessor.pop('bufferView', None)
+            accessor.pop('byteOffset', None)
+            accessor['count'] = nb_vertices
+            if name == 'POSITION':
+                # The positions are quantized by Draco
+                accessor['min'] = np.min(decoded_mesh.points, axis=0).tolist()
+                accessor['max'] = np.max(decoded_mesh.points, axis=0).tolist()
+            else:
+                accessor.pop('min', None)
+                accessor.pop('max', None)
+
+        if 'indices' not in primitive:
+            primitive['indices'] = len(header['accessors'])
+            header['accessors'].append(dict())
+        index_accessor = header['accessors'][primitive['indices']]
+        index_accessor.clear()
+        index_accessor.update({
+            'componentType': 5125,
+            'count': int(np.size(decoded_mesh.faces)),
+            'type': 'SCALAR'
+        })
+        primitive['extensions'] = {
+            self.extension_name: {
+                'bufferView': view_index,
+                'attributes': {name: int(draco_ids[name]) for name in primitive['attributes']}
+            }
+        }
+
+
+def get_tile_compressor(name):
+    """
+    Create the compressor of the tiles.
+    :param name: 'meshopt', 'draco' or None
+    :return: a TileCompressor, or None
+    """
+    if name == 'meshopt':
+        return MeshoptCompressor()
+    if name == 'draco':
+        return DracoCompressor()
+    return None
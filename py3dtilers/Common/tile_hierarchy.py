@@ -0,0 +1,103 @@
+import numpy as np
+from py3dtiles import BoundingVolumeBox, Tile
+
+
+class TileHierarchy():
+    """
+    Organize the root tiles of a tileset into a quadtree (or an octree) of tiles without content.
+    Without hierarchy, all the root tiles are children of the root of the tileset, so a client must test
+    every one of them for visibility. In the hierarchy, each tile without content groups the tiles of a cell,
+    its bounding volume contains the volumes of its children and its geometric error is the size of its cell.
+    """
+
+    # Stop the subdivision when the tiles are (almost) at the same position
+    MAX_DEPTH = 32
+
+    def __init__(self, dimensions=2, max_children=8):
+        """
+        :param dimensions: 2 to subdivide the cells along X and Y (quadtree), 3 to also subdivide along Z (octree)
+        :param max_children: the maximum number of children of a tile in the hierarchy (at least 2),
+        a cell containing more tiles is subdivided
+        """
+        self.dimensions = dimensions
+        self.max_children = max(2, max_children)
+
+    def create_hierarchy(self, tiles, extents, geometric_errors):
+        """
+        Create the quadtree (or octree) of tiles.
+        :param tiles: the root tiles, as Tile instances
+        :param extents: the (mins, maxs) of each tile, in the frame of the tileset
+        :param geometric_errors: the geometric error of each tile
+
+        :return: the tiles to add to the root of the tileset, and the highest geometric error of those tiles
+        """
+        if len(tiles) == 0:
+            return list(), 0
+        mins = np.array([extent[0] for extent in extents], dtype=np.float64).reshape(-1, 3)
+        maxs = np.array([extent[1] for extent in extents], dtype=np.float64).reshape(-1, 3)
+        self.items = [(tile, tile_mins, tile_maxs, error) for tile, tile_mins, tile_maxs, error in zip(tiles, mins, maxs, geometric_errors)]
+        self.centers = ((mins + maxs) / 2)[:, :self.dimensions]
+
+        # The root cell is the square (or the cube) containing the centers of the tiles
+        cell_min = self.centers.min(axis=0)
+        cell_size = max((self.centers.max(axis=0) - cell_min).max(), 1e-9)
+        items = self.subdivide(np.arange(len(tiles)), cell_min, cell_size, 0)
+        return [item[0] for item in items], max(item[3] for item in items)
+
+    def subdivide(self, indices, cell_min, cell_size, depth):
+        """
+        Group the tiles of a cell into the sub-cells of this cell.
+        :param indices: the indices of the tiles whose center is in the cell
+        :param cell_min: the minimal corner of the cell
+        :param cell_size: the size of the cell
+        :param depth: the depth of the cell
+
+        :return: the items (tile, mins, maxs, geometric error) representing the cell
+        """
+        if len(indices) <= self.max_children or depth >= TileHierarchy.MAX_DEPTH:
+            return [self.items[i] for i in indices]
+
+        half_size = cell_size / 2
+        # The index of the sub-cell of each tile, along each axis (0 or 1), combined into a single code
+        positions = np.clip(((self.centers[indices] - cell_min) // half_size).astype(np.int64), 0, 1)
+        codes = positions @ (1 << np.arange(self.dimensions))
+
+        items = list()
+        order = np.argsort(codes, kind='stable')
+        codes, positions = codes[order], positions[order]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        for start, cell_indices in zip(starts, np.split(indices[order], starts[1:])):
+            sub_cell_min = cell_min + positions[start] * half_size
+            sub_items = self.subdivide(cell_indices, sub_cell_min, half_size, depth + 1)
+            if len(sub_items) == 1:
+                items.append(sub_items[0])
+            else:
+                items.append(self.create_tile(sub_items, half_size))
+        return items
+
+    def create_tile(self, items, cell_size):
+        """
+        Create a tile without content, parent of the tiles of a cell.
+        :param items: the (tile, mins, maxs, geometric error) of the children
+        :param cell_size: the size of the cell
+
+        :return: the item (tile, mins, maxs, geometric error) of the new tile
+        """
+        mins = np.min([item[1] for item in items], axis=0)
+        maxs = np.max([item[2] for item in items], axis=0)
+        # The geometric error is the diagonal of the cell, and is never lower than the error of the children
+        geometric_error = float(max(cell_size * np.sqrt(self.dimensions), max(item[3] for item in items)))
+
+        tile = Tile()
+        tile.set_geometric_error(geometric_error)
+        tile.set_refine_mode('ADD')
+        tile.set_transform([1, 0, 0, 0,
+                            0, 1, 0, 0,
+                            0, 0, 1, 0,
+                            0, 0, 0, 1])
+        bounding_box = BoundingVolumeBox()
+        bounding_box.set_from_mins_maxs(np.append(mins, maxs))
+        tile.set_bounding_volume(bounding_box)
+        for item in items:
+            tile.add_child(item[0])
+        return tile, mins, maxs, geometric_error
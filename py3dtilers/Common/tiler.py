@@ -3,7 +3,7 @@ from pathlib import Path
 import sys
 import os
 
-from ..Common import LodTree, FromGeometryTreeToTileset, Groups
+from ..Common import LodTree, FromGeometryTreeToTileset, Groups, FeatureStore, DracoCompressor, get_tile_compressor
 from ..Color import ColorConfig
 from ..Texture import Texture
 from typing import TYPE_CHECKING
@@ -21,6 +21,7 @@ class Tiler():
         text = '''A small utility that build a 3DTiles tileset out of data'''
         self.supported_extensions = []
         self.default_input_path = None
+        self.feature_store = None
         self.parser = argparse.ArgumentParser(description=text)
 
         self.parser.add_argument('--obj',
@@ -79,6 +80,29 @@ class Tiler():
                                  action='store_true',
                                  help='If specified, no normals will be written to glTf, useful for Photogrammetry meshes')
 
+        self.parser.add_argument('--smooth_normals',
+                                 nargs='?',
+                                 const=30.,
+                                 type=float,
+                                 help='If specified, the normals of the triangles sharing a vertex are averaged when the angle between them\
+                                     is below the crease angle. The flag can be followed by the crease angle in degrees (30 by default).')
+
+        self.parser.add_argument('--indexed',
+                                 dest='indexed',
+                                 action='store_true',
+                                 help='If specified, the identical vertices of the tiles are merged and the triangles are written as indices.')
+
+        self.parser.add_argument('--quantize',
+                                 dest='quantize',
+                                 action='store_true',
+                                 help='If specified, the positions and the normals of the tiles are stored as integers (KHR_mesh_quantization).')
+
+        self.parser.add_argument('--compression',
+                                 nargs='?',
+                                 choices=['meshopt', 'draco'],
+                                 help='Compress the geometry of the tiles with meshoptimizer (EXT_meshopt_compression)\
+                                     or Draco (KHR_draco_mesh_compression). Requires the meshoptimizer or DracoPy package.')
+
         self.parser.add_argument('--quality',
                                  nargs='?',
                                  type=int,
@@ -125,6 +149,12 @@ class Tiler():
                                  help='Set the maximum number of features in each tile when the features are distributed by a kd-tree.\
                                      The value must be an integer.')
 
+        self.parser.add_argument('--max_tile_size',
+                                 nargs='?',
+                                 type=float,
+                                 help='Set the maximum estimated size (in MB) of each tile when the features are distributed by a kd-tree.\
+                                     The tiles are balanced by the number of triangles and the texture area of the features.')
+
         self.parser.add_argument('--texture_lods',
                                  '--tl',
                                  nargs='?',
@@ -150,6 +180,27 @@ class Tiler():
                                  action='store_true',
                                  help='When used, the inputs are used as LODs.')
 
+        self.parser.add_argument('--jobs',
+                                 '-j',
+                                 nargs='?',
+                                 type=int,
+                                 default=1,
+                                 help='Set the number of processes used to create the tiles.\
+                                     The tileset is the same whatever the number of processes.')
+
+        self.parser.add_argument('--tile_hierarchy',
+                                 nargs='?',
+                                 choices=['quadtree', 'octree'],
+                                 help='When defined, the root tiles are organized into a quadtree (or an octree) of tiles without content,\
+                                     instead of being all children of the root of the tileset.')
+
+        self.parser.add_argument('--feature_store',
+                                 nargs='?',
+                                 const='',
+                                 type=str,
+                                 help='When defined, the geometries of the features are stored on disk and loaded tile by tile.\
+                                     The flag can be followed by the directory where the temporary files are created.')
+
     def parse_command_line(self):
         self.args, _ = self.parser.parse_known_args()
 
@@ -177,6 +228,16 @@ class Tiler():
             self.args.geometric_error[i] = int(val) if val is not None and val.isnumeric() else None
         [self.args.geometric_error.append(None) for _ in range(len(self.args.geometric_error), 3)]
 
+        compressor = get_tile_compressor(getattr(self.args, 'compression', None))
+        if compressor is not None:
+            if not compressor.is_available():
+                print("The package", compressor.module_name, "is required to compress the tiles with", self.args.compression)
+                print("Exiting")
+                sys.exit(1)
+            if isinstance(compressor, DracoCompressor) and self.args.quantize:
+                print("Draco quantizes the geometry of the tiles, --quantize is ignored.")
+                self.args.quantize = False
+
         if self.args.quality is not None:
             Texture.set_texture_quality(self.args.quality)
         if self.args.compress_level is not None:
@@ -228,6 +289,16 @@ class Tiler():
         kd_tree_max = ktm_arg if ktm_arg is not None and ktm_arg > 0 else self.DEFAULT_KD_TREE_MAX
         return kd_tree_max
 
+    def get_max_tile_size(self):
+        """
+        The max_tile_size is the maximum estimated size of each tile when the features are distributed by a kd-tree.
+        :return: a size in bytes, or None when the tiles are only limited by their number of features
+        """
+        max_tile_size = getattr(self.args, 'max_tile_size', None)
+        if max_tile_size is None or max_tile_size <= 0:
+            return None
+        return max_tile_size * 1e6
+
     def create_tileset_from_feature_list(self, feature_list: 'FeatureList', extension_name=None):
         """
         Create the 3DTiles tileset from the features.
@@ -247,7 +318,7 @@ class Tiler():
                 print("No feature left, exiting")
                 sys.exit(1)
             print("Distribution of the", len(feature_list), "feature(s)...")
-        groups = Groups(feature_list, self.args.loa, self.get_kd_tree_max(), self.args.as_lods).get_groups_as_list()
+        groups = Groups(feature_list, self.args.loa, self.get_kd_tree_max(), self.args.as_lods, self.get_max_tile_size()).get_groups_as_list()
         feature_list.delete_features_ref()
         return self.create_tileset_from_groups(groups, extension_name)
 
@@ -258,17 +329,65 @@ class Tiler():
         :param extension_name: an optional extension to add to the tileset
         :return: a TileSet
         """
-        create_loa = self.args.loa is not None
-        geometric_errors = self.args.geometric_error if hasattr(self.args, 'geometric_error') else [None, None, None]
-        with_normals = False if self.args.no_normals else True
+        try:
+            feature_store = self.get_feature_store()
+            if feature_store is not None:
+                for group in groups:
+                    group.feature_list.store_geometries(feature_store)
+                feature_store.flush()
+
+            create_loa = self.args.loa is not None
+            geometric_errors = self.args.geometric_error if hasattr(self.args, 'geometric_error') else [None, None, None]
+            with_normals = False if self.args.no_normals else True
+
+            if self.args.as_lods:
+                tree = LodTree.vertical_hierarchy(groups, geometric_errors)
+            else:
+                tree = LodTree(groups, self.args.lod1, create_loa, self.args.with_texture, geometric_errors, self.args.texture_lods)
 
-        if self.args.as_lods:
-            tree = LodTree.vertical_hierarchy(groups, geometric_errors)
-        else:
-            tree = LodTree(groups, self.args.lod1, create_loa, self.args.with_texture, geometric_errors, self.args.texture_lods)
+            self.create_output_directory()
+            return FromGeometryTreeToTileset.convert_to_tileset(tree, self.args, extension_name, self.get_output_dir(), with_normals=with_normals,
+                                                                worker_initializer=self.get_worker_initializer(),
+                                                                geometry_workers=self.get_geometry_workers())
+        finally:
+            self.close_feature_store()
 
-        self.create_output_directory()
-        return FromGeometryTreeToTileset.convert_to_tileset(tree, self.args, extension_name, self.get_output_dir(), with_normals=with_normals)
+    def get_feature_store(self):
+        """
+        Return the FeatureStore where the geometries of the features are kept on disk until their tile is created.
+        The store is created when the user has used the --feature_store flag.
+        :return: a FeatureStore or None
+        """
+        directory = getattr(self.args, 'feature_store', None)
+        if directory is None:
+            return None
+        if self.feature_store is None:
+            self.feature_store = FeatureStore(directory if directory != '' else None)
+        return self.feature_store
+
+    def close_feature_store(self):
+        """
+        Close the FeatureStore, if any, and delete its files.
+        """
+        if self.feature_store is not None:
+            self.feature_store.close()
+            self.feature_store = None
+
+    def get_worker_initializer(self):
+        """
+        Return the function (and its arguments) called once in each process when the tiles are created by several processes.
+        The tilers override this method when a worker needs its own resources (e.g. a database connection).
+        :return: a (function, arguments) tuple or None
+        """
+        return None
+
+    def get_geometry_workers(self):
+        """
+        Return the threads used to fetch the geometries of several tiles concurrently (e.g. from a database).
+        By default, the geometries are fetched by the thread creating the tiles.
+        :return: a (number of threads, function, arguments) tuple, the function returning a context manager entered around each fetch, or None
+        """
+        return None
 
     def create_output_directory(self):
         """
@@ -1,14 +1,16 @@
+import multiprocessing
 import numpy as np
-from pyproj import Transformer
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from sortedcollections import OrderedSet
-from py3dtiles import B3dm, BatchTable, BoundingVolumeBox, GlTF, GlTFMaterial
+from py3dtiles import B3dm, BatchTable, BoundingVolumeBox, GlTFMaterial
 from py3dtiles import Tile, TileSet
 from ..Texture import Atlas
-from ..Common import ObjWriter
+from ..Common import ObjWriter, FeatureList, GlTFWriter, TileHierarchy, get_tile_compressor, get_transformer, reproject_vertices
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from ..Common import GeometryNode, GeometryTree, FeatureList
+    from ..Common import GeometryNode, GeometryTree
 
 
 class FromGeometryTreeToTileset():
@@ -20,91 +22,254 @@ class FromGeometryTreeToTileset():
     nb_nodes = 0
 
     @staticmethod
-    def convert_to_tileset(geometry_tree: 'GeometryTree', user_arguments=None, extension_name=None, output_dir=None, with_normals=True):
+    def convert_to_tileset(geometry_tree: 'GeometryTree', user_arguments=None, extension_name=None, output_dir=None, with_normals=True, worker_initializer=None, geometry_workers=None):
         """
         Recursively creates a tileset from the nodes of a GeometryTree
         :param geometry_tree: an instance of GeometryTree to transform into 3DTiles.
         :param user_arguments: the Namespace containing the arguments of the command line.
         :param extension_name: the name of an extension to add to the tileset.
         :param output_dir: the directory where the TileSet is writen.
+        :param worker_initializer: an optional (function, arguments) tuple called once in each
+        worker process when the root nodes are processed in parallel (e.g. to open a database connection).
+        :param geometry_workers: an optional (number of threads, function, arguments) tuple. When defined (and when the
+        tiles are created by a single process), the geometries of the next root nodes are fetched by those threads
+        while the current root node is converted into tiles. The function returns a context manager entered around each fetch.
 
         :return: a TileSet
         """
         print('Creating tileset from features...')
         tileset = TileSet()
-        FromGeometryTreeToTileset.tile_index = 0
         FromGeometryTreeToTileset.nb_nodes = geometry_tree.get_number_of_nodes()
-        obj_writer = ObjWriter()
+        obj_writer = ObjWriter(crease_angle=getattr(user_arguments, 'smooth_normals', None))
         tree_centroid = geometry_tree.get_centroid()
-        while len(geometry_tree.root_nodes) > 0:
-            root_node = geometry_tree.root_nodes[0]
-            root_node.set_node_features_geometry(user_arguments)
-            offset = FromGeometryTreeToTileset.__transform_node(root_node, user_arguments, tree_centroid, obj_writer=obj_writer)
-            tileset.add_tile(FromGeometryTreeToTileset.__create_tile(root_node, offset, extension_name, output_dir, with_normals))
-            geometry_tree.root_nodes.remove(root_node)
-
-        if user_arguments.obj is not None:
+        with_obj = user_arguments.obj is not None
+
+        def get_tasks():
+            # The tiles are indexed depth first, root node after root node. The index of the first tile
+            # of each root node is computed beforehand, so the indices don't depend on the processing order
+            tile_index = 0
+            while len(geometry_tree.root_nodes) > 0:
+                root_node = geometry_tree.root_nodes.pop(0)
+                next_tile_index = root_node.set_tile_index(tile_index)
+                yield (root_node, tile_index, user_arguments, tree_centroid, extension_name, output_dir, with_normals, with_obj, True)
+                tile_index = next_tile_index
+
+        hierarchy = FromGeometryTreeToTileset.get_tile_hierarchy(user_arguments)
+        jobs = FromGeometryTreeToTileset.get_number_of_jobs(user_arguments)
+        if jobs > 1:
+            initializer, initargs = worker_initializer if worker_initializer is not None else (None, ())
+            with multiprocessing.get_context('fork').Pool(jobs, initializer, initargs) as pool:
+                FromGeometryTreeToTileset.__add_root_tiles(tileset, pool.imap(FromGeometryTreeToTileset.convert_root_node, get_tasks()), obj_writer, hierarchy)
+        else:
+            tasks = get_tasks()
+            if geometry_workers is not None:
+                tasks = FromGeometryTreeToTileset.prefetch_geometries(tasks, geometry_workers)
+            FromGeometryTreeToTileset.__add_root_tiles(tileset, map(FromGeometryTreeToTileset.convert_root_node, tasks), obj_writer, hierarchy)
+
+        if with_obj:
             obj_writer.write_obj(user_arguments.obj)
         tileset.get_root_tile().set_bounding_volume(BoundingVolumeBox())
-        print("\r" + str(FromGeometryTreeToTileset.tile_index), "/", str(FromGeometryTreeToTileset.nb_nodes), "tiles created", flush=True)
+        print("\r" + str(FromGeometryTreeToTileset.nb_nodes), "/", str(FromGeometryTreeToTileset.nb_nodes), "tiles created", flush=True)
         return tileset
 
     @staticmethod
-    def __transform_node(node: 'GeometryNode', user_args, tree_centroid=np.array([0, 0, 0]), obj_writer=None):
+    def get_number_of_jobs(user_arguments):
+        """
+        Return the number of processes used to create the tiles.
+        Parallel processing relies on forked processes, so it falls back to a single process when fork is unavailable.
+        :param user_arguments: the Namespace containing the arguments of the command line.
+        :return: int
+        """
+        jobs = getattr(user_arguments, 'jobs', None)
+        if jobs is None or jobs <= 1:
+            return 1
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            print("Parallel tiling is not supported on this platform, the tiles will be created by a single process.")
+            return 1
+        return jobs
+
+    @staticmethod
+    def get_tile_hierarchy(user_arguments):
+        """
+        Return the TileHierarchy used to organize the root tiles, depending on the --tile_hierarchy argument.
+        :param user_arguments: the Namespace containing the arguments of the command line.
+        :return: a TileHierarchy, or None when the root tiles are directly added to the root of the tileset
+        """
+        hierarchy = getattr(user_arguments, 'tile_hierarchy', None)
+        if hierarchy == 'quadtree':
+            return TileHierarchy(dimensions=2)
+        if hierarchy == 'octree':
+            return TileHierarchy(dimensions=3)
+        return None
+
+    @staticmethod
+    def get_gltf_writer(user_arguments, with_normals=True):
+        """
+        Return the GlTFWriter used to create the glTF of the tiles, depending on the --indexed, --smooth_normals, --quantize and --compression arguments.
+        The writer (and its compressor) is created in the process creating the tiles.
+        :param user_arguments: the Namespace containing the arguments of the command line.
+        :param with_normals: True to write the normals of the vertices
+        :return: a GlTFWriter
+        """
+        return GlTFWriter(with_normals,
+                          indexed=getattr(user_arguments, 'indexed', False),
+                          crease_angle=getattr(user_arguments, 'smooth_normals', None),
+                          quantized=getattr(user_arguments, 'quantize', False),
+                          compressor=get_tile_compressor(getattr(user_arguments, 'compression', None)))
+
+    @staticmethod
+    def prefetch_geometries(tasks, geometry_workers):
+        """
+        Fetch the geometries of the root nodes with a pool of threads, a few root nodes ahead of their conversion into tiles.
+        At most one root node per thread is fetched in advance, to bound the memory used by the geometries.
+        :param tasks: an iterator over the tasks of convert_root_node
+        :param geometry_workers: a (number of threads, function, arguments) tuple, the function returning a context manager
+        entered by a thread around each fetch (e.g. to take a connection from a pool and give it back)
+
+        :return: an iterator over the tasks, whose geometries are already fetched
+        """
+        nb_threads, fetch_context, context_args = geometry_workers
+
+        def fetch_geometry(root_node, user_arguments):
+            with fetch_context(*context_args):
+                root_node.set_node_features_geometry(user_arguments)
+
+        pending_tasks = deque()
+        with ThreadPoolExecutor(nb_threads) as executor:
+            for task in tasks:
+                root_node, user_arguments = task[0], task[2]
+                pending_tasks.append((executor.submit(fetch_geometry, root_node, user_arguments), task))
+                if len(pending_tasks) > nb_threads:
+                    future, pending_task = pending_tasks.popleft()
+                    future.result()
+                    yield pending_task[:-1] + (False,)
+            while len(pending_tasks) > 0:
+                future, pending_task = pending_tasks.popleft()
+                future.result()
+                yield pending_task[:-1] + (False,)
+
+    @staticmethod
+    def __add_root_tiles(tileset, results, obj_writer, hierarchy=None):
+        """
+        Add the tiles created from the root nodes to the tileset, in the order of the root nodes.
+        :param tileset: the TileSet
+        :param results: an iterable of values returned by convert_root_node
+        :param obj_writer: the writer used to create the OBJ model.
+        :param hierarchy: an optional TileHierarchy organizing the root tiles into a quadtree or an octree
+        """
+        nb_tiles = 0
+        tiles, extents, geometric_errors = list(), list(), list()
+        for tile, nb_root_tiles, obj_geometries, extent, geometric_error in results:
+            if hierarchy is None:
+                tileset.add_tile(tile)
+            else:
+                tiles.append(tile)
+                extents.append(extent)
+                geometric_errors.append(geometric_error)
+            for feature_list, offset in obj_geometries:
+                obj_writer.add_geometries(feature_list, offset=offset)
+            nb_tiles += nb_root_tiles
+            print("\r" + str(nb_tiles), "/", str(FromGeometryTreeToTileset.nb_nodes), "tiles created", end='', flush=True)
+
+        if hierarchy is not None:
+            top_tiles, geometric_error = hierarchy.create_hierarchy(tiles, extents, geometric_errors)
+            for tile in top_tiles:
+                tileset.add_tile(tile)
+            # The root of the tileset must not have a lower geometric error than its children
+            if len(top_tiles) > 0:
+                tileset.get_root_tile().set_geometric_error(geometric_error)
+
+    @staticmethod
+    def convert_root_node(task):
+        """
+        Create the tiles of a root node and of its children: fetch the geometry, transform it and write the tiles.
+        This method is called either in the main process or in a worker process.
+        :param task: a tuple (root_node, tile_index, user_arguments, tree_centroid, extension_name, output_dir, with_normals, with_obj, fetch_geometry)
+        where tile_index is the index of the first tile of the root node and fetch_geometry is False when the geometry is already set.
+
+        :return: the tile, the number of tiles created, the (FeatureList, offset) to add to the OBJ model,
+        the (mins, maxs) of the tile in the frame of the tileset and the geometric error of the tile
+        """
+        root_node, tile_index, user_arguments, tree_centroid, extension_name, output_dir, with_normals, with_obj, fetch_geometry = task
+        nb_root_tiles = 1 + root_node.get_number_of_children()
+        FromGeometryTreeToTileset.tile_index = tile_index
+
+        if fetch_geometry:
+            root_node.set_node_features_geometry(user_arguments)
+        offset, distance = FromGeometryTreeToTileset.__transform_node(root_node, user_arguments, tree_centroid)
+        # Since the tiles are centered on [0, 0, 0], we use an offset to place the geometries in the OBJ model
+        obj_geometries = [(leaf.feature_list, distance) for leaf in root_node.get_leaves()] if with_obj else []
+        # The extent covers the whole subtree, since a coarse root node (e.g. LOD1) can be smaller than its detailed children
+        vertices = np.concatenate([feature_list.get_vertex_array()[0] for feature_list in root_node.get_features()])
+        if len(vertices) > 0:
+            extent = (vertices.min(axis=0) + offset, vertices.max(axis=0) + offset)
+        else:
+            extent = (np.array(offset, dtype=np.float64), np.array(offset, dtype=np.float64))
+        geometric_error = root_node.geometric_error
+        gltf_writer = FromGeometryTreeToTileset.get_gltf_writer(user_arguments, with_normals)
+        tile = FromGeometryTreeToTileset.__create_tile(root_node, offset, extension_name, output_dir, gltf_writer)
+        return tile, nb_root_tiles, obj_geometries, extent, geometric_error
+
+    @staticmethod
+    def __transform_node(node: 'GeometryNode', user_args, tree_centroid=np.array([0, 0, 0])):
         """
         Apply transformations on the features contained in a node.
         Those transformations are based on the arguments of the user.
-        The features can also be writen in an OBJ file.
         :param node: the GeometryNode to transform.
         :param user_args: the Namespace containing the arguments of the command line.
-        :param obj_writer: the writer used to create the OBJ model.
+
+        :return: the position of the tile and the distance between the node and the centroid of the tree
         """
+        # The transformations are applied in this order: height_mult -> scale -> crs -> translation.
+        # They are fused into one function so the vertices of each FeatureList are transformed in one pass.
+        transforms = list()
         if hasattr(user_args, 'height_mult') and user_args.height_mult:
-            for feature_list in node.get_features():
-                feature_list.height_mult_features(user_args.height_mult)
+            height_factor = np.array([1, 1, user_args.height_mult])
+            transforms.append(lambda vertices: vertices * height_factor)
             tree_centroid = np.array([tree_centroid[0], tree_centroid[1], tree_centroid[2] * user_args.height_mult])
 
         if hasattr(user_args, 'scale') and user_args.scale:
-            for feature_list in node.get_features():
-                feature_list.scale_features(user_args.scale, tree_centroid)
+            transforms.append(lambda vertices, scale_centroid=tree_centroid: ((vertices - scale_centroid) * user_args.scale) + scale_centroid)
 
         offset = np.array([0, 0, 0]) if user_args.offset[0] == 'centroid' else np.array(user_args.offset)
-        transform_offset = node.feature_list.get_centroid() + offset
 
-        if not user_args.crs_in == user_args.crs_out:
-            transformer = Transformer.from_crs(user_args.crs_in, user_args.crs_out)
-            tree_centroid = np.array(transformer.transform((tree_centroid + offset)[0], (tree_centroid + offset)[1], (tree_centroid + offset)[2]))
-            for feature_list in node.get_features():
-                feature_list.change_crs(transformer, offset)
-            transform_offset = node.feature_list.get_centroid()
+        change_crs = not user_args.crs_in == user_args.crs_out
+        if change_crs:
+            transformer = get_transformer(user_args.crs_in, user_args.crs_out)
+            tree_centroid = reproject_vertices([tree_centroid], transformer, offset)[0]
+            transforms.append(lambda vertices: reproject_vertices(vertices, transformer, offset))
+
+        def transform(vertices):
+            for vertex_transform in transforms:
+                vertices = vertex_transform(vertices)
+            return vertices
 
-        distance = node.feature_list.get_centroid() - tree_centroid
+        # All the vertices of the node are transformed at once (a single reprojection call),
+        # then each FeatureList is centered on its own centroid. node.feature_list is the first one
+        centroids = FeatureList.transform_feature_lists(node.get_features(), transform, center=True)
+        node_centroid = centroids[0]
+        transform_offset = node_centroid if change_crs else node_centroid + offset
 
-        for feature_list in node.get_features():
-            feature_list.translate_features(-feature_list.get_centroid())
+        distance = node_centroid - tree_centroid
 
-        if user_args.obj is not None:
-            for leaf in node.get_leaves():
-                # Since the tiles are centered on [0, 0, 0], we use an offset to place the geometries in the OBJ model
-                obj_writer.add_geometries(leaf.feature_list, offset=distance)
-        return distance if user_args.offset[0] == 'centroid' else transform_offset
+        return distance if user_args.offset[0] == 'centroid' else transform_offset, distance
 
     @staticmethod
-    def __create_tile(node: 'GeometryNode', transform_offset, extension_name=None, output_dir=None, with_normals=True):
+    def __create_tile(node: 'GeometryNode', transform_offset, extension_name=None, output_dir=None, gltf_writer=None):
         """
         Create a tile from a node. Recursively create tiles from the children of the node.
         :param node: the GeometryNode.
         :param transform_offset: the X,Y,Z position of the tile, relative to its parent's position.
         :param extension_name: the name of the extension to create.
         :param output_dir: the directory where the tiles will be created.
+        :param gltf_writer: the GlTFWriter creating the glTF of the tiles.
         """
-        print("\r" + str(FromGeometryTreeToTileset.tile_index), "/", str(FromGeometryTreeToTileset.nb_nodes), "tiles created", end='', flush=True)
         feature_list = node.feature_list
 
         tile = Tile()
         tile.set_geometric_error(node.geometric_error)
 
-        content_b3dm = FromGeometryTreeToTileset.__create_tile_content(feature_list, extension_name, node.has_texture(), node.downsample_factor, with_normals)
+        content_b3dm = FromGeometryTreeToTileset.__create_tile_content(feature_list, extension_name, node.has_texture(), node.downsample_factor, gltf_writer, FromGeometryTreeToTileset.tile_index)
         tile.set_content(content_b3dm)
         tile.set_content_uri('tiles/' + f'{FromGeometryTreeToTileset.tile_index}.b3dm')
         tile.write_content(output_dir)
@@ -131,40 +296,35 @@ class FromGeometryTreeToTileset():
 
         FromGeometryTreeToTileset.tile_index += 1
         for child_node in node.child_nodes:
-            tile.add_child(FromGeometryTreeToTileset.__create_tile(child_node, [0., 0., 0.], extension_name, output_dir, with_normals))
+            child_tile = FromGeometryTreeToTileset.__create_tile(child_node, [0., 0., 0.], extension_name, output_dir, gltf_writer)
+            tile.add_child(child_tile)
+            # The children are in the frame of their parent, whose box must enclose their boxes
+            bounding_box.add(child_tile.get_bounding_volume())
 
         return tile
 
     @staticmethod
-    def __create_tile_content(feature_list: 'FeatureList', extension_name=None, with_texture=False, downsample_factor=1, with_normals=True):
+    def __create_tile_content(feature_list: 'FeatureList', extension_name=None, with_texture=False, downsample_factor=1, gltf_writer=None, tile_index=None):
         """
         :param pre_tile: an array containing features of a single tile
+        :param gltf_writer: the GlTFWriter creating the glTF of the tile
+        :param tile_index: the index of the tile, used to name the texture atlas
 
         :return: a B3dm tile.
         """
         # create B3DM content
-        arrays = []
         materials = []
+        material_indexes = []
         seen_mat_indexes = dict()
         if with_texture:
-            tile_atlas = Atlas(feature_list, downsample_factor)
+            tile_atlas = Atlas(feature_list, downsample_factor, tile_index)
             materials = [GlTFMaterial(textureUri='./' + tile_atlas.id)]
         for feature in feature_list:
             mat_index = feature.material_index
             if mat_index not in seen_mat_indexes and not with_texture:
                 seen_mat_indexes[mat_index] = len(materials)
                 materials.append(feature_list.get_material(mat_index))
-            content = {
-                'position': feature.geom.getPositionArray(),
-                'normal': feature.geom.getNormalArray(),
-                'bbox': [[float(i) for i in j] for j in feature.geom.getBbox()],
-                'matIndex': seen_mat_indexes[mat_index] if not with_texture else 0
-            }
-            if with_texture:
-                content['uv'] = feature.geom.getDataArray(0)
-            if feature.has_vertex_colors:
-                content['vertex_color'] = feature.geom.getDataArray(int(with_texture))
-            arrays.append(content)
+            material_indexes.append(seen_mat_indexes[mat_index] if not with_texture else 0)
 
         # GlTF uses a y-up coordinate system whereas the geographical data (stored
         # in the 3DCityDB database) uses a z-up coordinate system convention. In
@@ -180,7 +340,10 @@ class FromGeometryTreeToTileset():
                               0, 1, 0, 0,
                               0, 0, 0, 1])
 
-        gltf = GlTF.from_binary_arrays(arrays, transform, materials=materials, withNormals=with_normals)
+        # The attributes of all the features are written at once in the binary body of the glTF
+        if gltf_writer is None:
+            gltf_writer = GlTFWriter()
+        gltf = gltf_writer.create_gltf(feature_list.get_features(), material_indexes, materials, transform, with_uvs=with_texture)
 
         # Create a batch table and add the ID of each feature to it
         ids = [feature.get_id() for feature in feature_list]
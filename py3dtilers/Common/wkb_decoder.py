@@ -0,0 +1,164 @@
+import struct
+import numpy as np
+from py3dtiles import TriangleSoup
+
+# WKB geometry types with Z coordinates: MultiPolygonZ and PolyhedralSurfaceZ
+WKB_TYPES_WITH_Z = (1006, 1015)
+
+
+def parse_wkb_multipolygon(wkb):
+    """
+    Parse a WKB MultiPolygon (or PolyhedralSurface) into coordinate arrays.
+    Only the headers of the polygons are read in Python, the coordinates are read with NumPy.
+    The closing point of each ring is dropped.
+    :param wkb: the Well-Known Binary of a multipolygon
+    :return: a (n_points, n_dimensions) float array with the points of all the rings, and a list
+    containing the ring sizes of each polygon. None if the WKB can't be parsed by this function.
+    """
+    wkb = bytes(wkb)
+    byte_order = '<' if wkb[0] else '>'
+    geometry_type, nb_polygons = struct.unpack_from(byte_order + 'II', wkb, 1)
+    nb_dimensions = 3 if geometry_type in WKB_TYPES_WITH_Z else 2
+    point_size = 8 * nb_dimensions
+
+    # Collect the offset and the number of points of each ring
+    ring_offsets = list()
+    ring_sizes = list()
+    polygons = list()
+    offset = 9
+    for _ in range(nb_polygons):
+        if wkb[offset] != wkb[0]:
+            return None
+        nb_rings = struct.unpack_from(byte_order + 'I', wkb, offset + 5)[0]
+        offset += 9
+        polygon = list()
+        for _ in range(nb_rings):
+            nb_points = struct.unpack_from(byte_order + 'I', wkb, offset)[0]
+            ring_offsets.append(offset + 4)
+            ring_sizes.append(nb_points - 1)
+            polygon.append(nb_points - 1)
+            offset += 4 + nb_points * point_size
+        polygons.append(polygon)
+
+    # Read all the points at once: compute the offset of each point, then gather their bytes
+    ring_sizes = np.array(ring_sizes, dtype=np.int64)
+    if np.any(ring_sizes < 0):
+        return None
+    ring_offsets = np.array(ring_offsets, dtype=np.int64)
+    first_points = np.cumsum(ring_sizes) - ring_sizes
+    point_indices = np.arange(ring_sizes.sum()) - np.repeat(first_points, ring_sizes)
+    point_offsets = np.repeat(ring_offsets, ring_sizes) + point_indices * point_size
+    buffer = np.frombuffer(wkb, dtype=np.uint8)
+    point_bytes = buffer[point_offsets[:, np.newaxis] + np.arange(point_size)]
+    points = point_bytes.view(np.dtype(np.float64).newbyteorder(byte_order)).reshape(-1, nb_dimensions)
+    return points.astype(np.float64), polygons
+
+
+def single_polygon_wkb(wkb, polygon_index):
+    """
+    Create the WKB of a multipolygon containing only one of the polygons of another multipolygon.
+    :param wkb: the Well-Known Binary of a multipolygon
+    :param polygon_index: the index of the polygon to keep
+    :return: the WKB of the new multipolygon
+    """
+    wkb = bytes(wkb)
+    byte_order = '<' if wkb[0] else '>'
+    geometry_type = struct.unpack_from(byte_order + 'I', wkb, 1)[0]
+    point_size = 24 if geometry_type in WKB_TYPES_WITH_Z else 16
+    offset = 9
+    for i in range(polygon_index + 1):
+        start = offset
+        nb_rings = struct.unpack_from(byte_order + 'I', wkb, offset + 5)[0]
+        offset += 9
+        for _ in range(nb_rings):
+            nb_points = struct.unpack_from(byte_order + 'I', wkb, offset)[0]
+            offset += 4 + nb_points * point_size
+    return wkb[0:5] + struct.pack(byte_order + 'I', 1) + wkb[start:offset]
+
+
+def get_fast_triangles(points, polygons):
+    """
+    Find the triangles of the polygons which are triangles or convex quads.
+    The triangles keep the orientation of the polygons, degenerated triangles are dropped.
+    :param points: the (n_points, 3) points of the rings
+    :param polygons: the ring sizes of each polygon
+    :return: a (n_triangles, 3) array of point indices, the index of the polygon of each triangle
+    and a boolean array telling which polygons must be triangulated another way
+    """
+    nb_polygons = len(polygons)
+    single_ring = np.array([len(polygon) == 1 for polygon in polygons], dtype=bool)
+    polygon_sizes = np.array([sum(polygon) for polygon in polygons], dtype=np.int64)
+    first_points = np.cumsum(polygon_sizes) - polygon_sizes
+
+    is_triangle = single_ring & (polygon_sizes == 3)
+    is_quad = single_ring & (polygon_sizes == 4)
+
+    # A quad can be split along its diagonal (0, 2) when it is convex
+    quads = np.flatnonzero(is_quad)
+    quad_points = points[first_points[quads][:, np.newaxis] + np.arange(4)]
+    edges = np.roll(quad_points, -1, axis=1) - quad_points
+    corners = np.cross(np.roll(edges, 1, axis=1), edges)
+    normals = np.cross(quad_points[:, 1] - quad_points[:, 0], quad_points[:, 2] - quad_points[:, 0])
+    convex = np.all(np.einsum('ijk,ik->ij', corners, normals) > 0, axis=1)
+    is_quad[quads[~convex]] = False
+
+    triangles = [first_points[is_triangle][:, np.newaxis] + np.arange(3)]
+    triangle_polygons = [np.flatnonzero(is_triangle)]
+    for fan in ([0, 1, 2], [0, 2, 3]):
+        triangles.append(first_points[is_quad][:, np.newaxis] + fan)
+        triangle_polygons.append(np.flatnonzero(is_quad))
+    triangles = np.concatenate(triangles)
+    triangle_polygons = np.concatenate(triangle_polygons)
+
+    # Keep the triangles in the order of the polygons (and the two triangles of a quad in order)
+    order = np.argsort(triangle_polygons, kind='stable')
+    triangles = triangles[order]
+    triangle_polygons = triangle_polygons[order]
+
+    # Degenerated triangles (aligned or duplicated points) are dropped, like the triangulator does
+    vertices = points[triangles]
+    cross_products = np.cross(vertices[:, 1] - vertices[:, 0], vertices[:, 2] - vertices[:, 0])
+    valid = np.any(cross_products != 0, axis=1)
+
+    fallback = np.ones(nb_polygons, dtype=bool)
+    fallback[is_triangle | is_quad] = False
+    return triangles[valid], triangle_polygons[valid], fallback
+
+
+def triangle_soup_from_wkb_multipolygon(wkb, associated_data=[]):
+    """
+    Create a TriangleSoup from a WKB multipolygon, covering the same surfaces as TriangleSoup.from_wkb_multipolygon.
+    The polygons which are triangles or convex quads (most of the 3DCityDB surfaces) are triangulated
+    with NumPy. The other polygons (with holes or more vertices) are triangulated by py3dtiles.
+    Unlike py3dtiles, the coordinates are kept as float64 and the quads are always split along their diagonal (0, 2),
+    so a non-planar quad always gives two triangles (see the README).
+    :param wkb: the Well-Known Binary of a multipolygon
+    :param associated_data: a list of WKB multipolygons containing data attached to the vertices (e.g. UVs)
+    :return: a TriangleSoup whose triangles are contiguous arrays
+    """
+    parsed = [parse_wkb_multipolygon(wkb)] + [parse_wkb_multipolygon(data) for data in associated_data]
+    if any(result is None for result in parsed) or parsed[0][0].shape[1] != 3 \
+            or any(result[1] != parsed[0][1] for result in parsed[1:]):
+        return TriangleSoup.from_wkb_multipolygon(wkb, associated_data)
+
+    points, polygons = parsed[0]
+    triangles, triangle_polygons, fallback = get_fast_triangles(points, polygons)
+    arrays = [[data_points[triangles]] for data_points, _ in parsed]
+    array_polygons = [triangle_polygons]
+
+    # Triangulate the other polygons one by one with py3dtiles
+    for polygon_index in np.flatnonzero(fallback):
+        polygon_soup = TriangleSoup.from_wkb_multipolygon(
+            single_polygon_wkb(wkb, polygon_index),
+            [single_polygon_wkb(data, polygon_index) for data in associated_data])
+        if len(polygon_soup.triangles[0]) == 0:
+            continue
+        for array, polygon_triangles in zip(arrays, polygon_soup.triangles):
+            array.append(np.array(polygon_triangles, dtype=np.float64).reshape(len(polygon_soup.triangles[0]), 3, -1))
+        array_polygons.append(np.full(len(polygon_soup.triangles[0]), polygon_index))
+
+    # Keep the triangles in the order of the polygons
+    order = np.argsort(np.concatenate(array_polygons), kind='stable')
+    triangle_soup = TriangleSoup()
+    triangle_soup.triangles = [np.ascontiguousarray(np.concatenate(array)[order]) for array in arrays]
+    return triangle_soup
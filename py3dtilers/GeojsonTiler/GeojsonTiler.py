@@ -1,10 +1,10 @@
 import os
-import json
 
-from .geojson import Geojson, Geojsons
-from .geojson_line import GeojsonLine
-from .geojson_polygon import GeojsonPolygon
-from ..Common import Tiler
+from .attribute_statistics import AttributeStatistics
+from .geojson import Geojsons
+from .geojson_reader import read_geojson_features
+from .geojson_source import GeojsonSource
+from ..Common import Tiler, FromGeometryTreeToTileset
 
 
 class GeojsonTiler(Tiler):
@@ -14,7 +14,7 @@ class GeojsonTiler(Tiler):
 
     def __init__(self):
         super().__init__()
-        self.supported_extensions = ['.geojson', '.GEOJSON', 'json', '.JSON']
+        self.supported_extensions = ['.geojson', '.GEOJSON', '.json', '.JSON', '.geojsonl', '.geojsonseq', '.ndjson']
 
         self.parser.add_argument('--height',
                                  nargs='?',
@@ -65,6 +65,18 @@ class GeojsonTiler(Tiler):
                                  type=str,
                                  help='When defined, add colors to the features depending on the selected attribute.')
 
+        self.parser.add_argument('--two_pass',
+                                 dest='two_pass',
+                                 action='store_true',
+                                 help='When defined, the features are distributed in tiles with their bounding boxes only,\
+                                    then read again from the GeoJSON file(s) tile by tile to create their 3D geometry.')
+
+        self.parser.add_argument('--color_pre_pass',
+                                 dest='color_pre_pass',
+                                 action='store_true',
+                                 help='When defined, the statistics of the color attribute are computed by reading the properties\
+                                    of all the features of the GeoJSON file(s) before the features are parsed.')
+
     def parse_command_line(self):
         super().parse_command_line()
 
@@ -91,54 +103,69 @@ class GeojsonTiler(Tiler):
 
         :return: a Geojson instance
         """
-        return {
-            'Polygon': GeojsonPolygon(id, feature_properties, feature_geometry),
-            'MultiPolygon': GeojsonPolygon(id, feature_properties, feature_geometry, is_multi_geom=True),
-            'LineString': GeojsonLine(id, feature_properties, feature_geometry),
-            'MultiLineString': GeojsonLine(id, feature_properties, feature_geometry, is_multi_geom=True)
-        }[feature_geometry['type']]
-
-    def retrieve_geojsons(self):
+        return GeojsonSource.create_feature(id, feature_geometry, feature_properties)
+
+    def retrieve_geojsons(self, source=None):
         """
         Retrieve the GeoJson features from GeoJson file(s).
-        Return a list of Geojson instances containing properties and a geometry.
+        The files are read incrementally and the features are yielded one by one,
+        so the whole documents are never loaded in memory.
+        The files can contain a FeatureCollection or a sequence of features (newline-delimited GeoJSON).
+        :param source: a GeojsonSource. When defined, each feature keeps its position in the file(s),
+        so its geometry can be created again from the source
 
-        :return: a list of Geojson instances.
+        :return: a generator of Geojson instances containing properties and a geometry.
         """
-        features = []
-
         # Reads and parse every features from the file(s)
-        for geojson_file in self.files:
+        for file_index, geojson_file in enumerate(self.files):
             print("Reading " + str(geojson_file))
-            with open(geojson_file) as f:
-                gjContent = json.load(f)
 
             k = 0
-            for feature in gjContent['features']:
+            for item in read_geojson_features(geojson_file, with_spans=source is not None):
+                feature, span = item if source is not None else (item, None)
                 if "ID" in feature['properties']:
                     feature_id = feature['properties']['ID']
                 else:
                     feature_id = 'feature_' + str(k)
                     k += 1
-                features.append(self.get_geojson_instance(feature_id, feature['geometry'], feature['properties']))
+                geojson = self.get_geojson_instance(feature_id, feature['geometry'], feature['properties'])
+                if source is not None:
+                    geojson.set_geom_source(source, (file_index, span[0], span[1]))
+                yield geojson
+
+    def retrieve_attribute_statistics(self, color_attribute=('NONE', 'numeric')):
+        """
+        Compute the statistics of the color attribute with a streaming pass over the GeoJson file(s).
+        Only the properties are read: the geometries aren't parsed.
+        :param color_attribute: a tuple (name of the attribute, 'numeric' or 'semantic')
 
-        return features
+        :return: an AttributeStatistics instance
+        """
+        statistics = AttributeStatistics(color_attribute)
+        for geojson_file in self.files:
+            statistics.add_features(read_geojson_features(geojson_file))
+        return statistics
 
-    def add_colors(self, feature_list, color_attribute=('NONE', 'numeric')):
+    def add_colors(self, feature_list, color_attribute=('NONE', 'numeric'), statistics=None):
         """
         Assigne a single-colored material to each feature.
         The color depends on the value of the selected property of the feature.
         If the property is numeric, we determine a RGB with min and max values of this property.
         Else, we create a color per value of the property.
         :param feature_list: An instance of FeatureList containing features
+        :param color_attribute: a tuple (name of the attribute, 'numeric' or 'semantic')
+        :param statistics: the AttributeStatistics of the color attribute. Computed from the features when None
         """
+        if statistics is None:
+            statistics = AttributeStatistics(color_attribute)
+            statistics.add_features(feature_list)
+
         colors = []
-        att_length = len(Geojson.attribute_values)
         config_path = os.path.join(os.path.dirname(__file__), "../Color/default_config.json")
         color_config = self.get_color_config(config_path)
         if color_attribute[1] == 'numeric':
-            max = Geojson.attribute_max
-            min = Geojson.attribute_min
+            max = statistics.max
+            min = statistics.min
 
             n = color_config.nb_colors
             for i in range(0, n, 1):
@@ -147,7 +174,7 @@ class GeojsonTiler(Tiler):
                 factor = (feature.feature_properties[color_attribute[0]] - min) / (max - min)
                 factor = round(factor * (len(colors) - 1)) + 1
                 feature.material_index = factor
-        elif att_length > 1:
+        elif statistics.get_nb_distinct_values() > 1:
             attribute_dict = dict()
             for feature in feature_list.get_features():
                 value = feature.feature_properties[color_attribute[0]]
@@ -160,20 +187,41 @@ class GeojsonTiler(Tiler):
     def from_geojson_directory(self, properties, is_roof=False, color_attribute=('NONE', 'numeric'), keep_properties=False):
         """
         Create a tileset from GeoJson files or a directories of GeoJson files
+        The statistics of the color attribute are collected while the features are read,
+        or computed beforehand by a streaming pre-pass when the 'color_pre_pass' argument is defined.
         :param properties: the names of the properties to read in the GeoJson file(s)
 
         :return: a tileset.
         """
-        features = self.retrieve_geojsons()
-        objects = Geojsons.parse_geojsons(features, properties, is_roof, color_attribute)
-
-        if not color_attribute[0] == 'NONE':
-            self.add_colors(objects, color_attribute)
-
-        if keep_properties:
-            [feature.set_batchtable_data(feature.feature_properties) for feature in objects]
-
-        return self.create_tileset_from_feature_list(objects)
+        if getattr(self.args, 'color_pre_pass', False) and not color_attribute[0] == 'NONE':
+            statistics = self.retrieve_attribute_statistics(color_attribute)
+            collected_statistics = None
+        else:
+            statistics = collected_statistics = AttributeStatistics(color_attribute)
+
+        source = None
+        try:
+            if getattr(self.args, 'two_pass', False):
+                # The features are triangulated tile by tile, when their tile is created
+                source = GeojsonSource(self.files, properties, is_roof)
+                objects = Geojsons.locate_geojsons(self.retrieve_geojsons(source), properties, is_roof, collected_statistics)
+            else:
+                jobs = FromGeometryTreeToTileset.get_number_of_jobs(self.args)
+                objects = Geojsons.parse_geojsons(self.retrieve_geojsons(), properties, is_roof, collected_statistics, jobs, self.get_feature_store())
+
+            if not color_attribute[0] == 'NONE':
+                self.add_colors(objects, color_attribute, statistics)
+
+            if keep_properties:
+                [feature.set_batchtable_data(feature.feature_properties) for feature in objects]
+
+            tileset = self.create_tileset_from_feature_list(objects)
+        finally:
+            # The features may have been stored (or their source opened) before the tileset creation failed or exited
+            self.close_feature_store()
+            if source is not None:
+                source.close()
+        return tileset
 
 
 def main():
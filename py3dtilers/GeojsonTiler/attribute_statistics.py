@@ -0,0 +1,65 @@
+import math
+
+
+class AttributeStatistics():
+    """
+    The statistics of an attribute of the GeoJSON features, used to color the features.
+    For a numeric attribute, the statistics are the min and the max values.
+    For a semantic attribute, the statistics are the distinct values and their number of occurrences,
+    in the order of their first occurrence.
+    """
+
+    def __init__(self, color_attribute=('NONE', 'numeric')):
+        """
+        :param color_attribute: a tuple (name of the attribute, 'numeric' or 'semantic')
+        """
+        self.attribute_name = color_attribute[0]
+        self.is_numeric = color_attribute[1] == 'numeric'
+
+        self.min = math.inf
+        self.max = -math.inf
+        # Distinct values of a semantic attribute, with their number of occurrences
+        self.value_counts = dict()
+        self.nb_values = 0
+
+    def add(self, feature_properties):
+        """
+        Update the statistics with the value of the attribute in the properties of a feature.
+        :param feature_properties: the JSON properties of a feature
+        """
+        if self.attribute_name not in feature_properties:
+            return
+        value = feature_properties[self.attribute_name]
+        self.nb_values += 1
+        if self.is_numeric:
+            if value > self.max:
+                self.max = value
+            if value < self.min:
+                self.min = value
+        else:
+            self.value_counts[value] = self.value_counts.get(value, 0) + 1
+
+    def add_features(self, features):
+        """
+        Update the statistics with the properties of several features.
+        :param features: an iterable of GeoJSON features (as dict) or of Geojson instances
+        """
+        for feature in features:
+            if isinstance(feature, dict):
+                self.add(feature['properties'])
+            else:
+                self.add(feature.feature_properties)
+
+    def get_values(self):
+        """
+        Return the distinct values of a semantic attribute.
+        :return: a list of values
+        """
+        return list(self.value_counts.keys())
+
+    def get_nb_distinct_values(self):
+        """
+        Return the number of distinct values of a semantic attribute.
+        :return: an int
+        """
+        return len(self.value_counts)
@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
+import itertools
+import multiprocessing
 import re
+from collections import deque
 
 import numpy as np
 import triangle as tr
 from shapely.geometry import Polygon
 
-from ..Common import Feature, FeatureList
+from ..Common import Feature, FeatureList, extrude_rings
 
 
 # The GeoJson file contains the ground surface of urban elements, mainly buildings.
@@ -29,11 +32,6 @@ class Geojson(Feature):
     # Default Z will be used if no Z is found in the feature coordinates
     default_z = 0
 
-    # Those values are used to set the color of the features
-    attribute_values = list()  # Contains all the values of a semantic attribute
-    attribute_min = np.Inf  # Contains the min value of a numeric attribute
-    attribute_max = np.NINF  # Contains the max value of a numeric attribute
-
     def __init__(self, id=None, feature_properties=None, feature_geometry=None):
         super().__init__(id)
 
@@ -51,16 +49,13 @@ class Geojson(Feature):
         Custom triangulation method used when we triangulate buffered lines.
         :param coordinates: an array of 3D points ([x, y, Z])
 
-        :return: a list of triangles
+        :return: a (n_triangles, 3) array of indices of the coordinates
         """
-        triangles = list()
         length = len(coordinates)
+        current = np.arange(max(0, (length // 2) - 1))
+        opposite = length - 1 - current
 
-        for i in range(0, (length // 2) - 1):
-            triangles.append([coordinates[i], coordinates[length - 1 - i], coordinates[i + 1]])
-            triangles.append([coordinates[i + 1], coordinates[length - 1 - i], coordinates[length - 2 - i]])
-
-        return triangles
+        return np.stack([current, opposite, current + 1, current + 1, opposite, opposite - 1], axis=1).reshape(-1, 3)
 
     def set_z(self, coordinates, z):
         """
@@ -86,7 +81,7 @@ class Geojson(Feature):
             elif z != 'NONE':
                 coord[2] = z_value
 
-    def parse_geojson(self, target_properties, is_roof=False, color_attribute=('NONE', 'numeric')):
+    def parse_geojson(self, target_properties, is_roof=False):
         """
         Parse a feature to extract the height and the coordinates of the feature.
         :param target_properties: the names of the properties to read
@@ -114,17 +109,6 @@ class Geojson(Feature):
                 print("No propertie called " + height_name + " in feature " + str(Geojson.n_feature) + ". Set height to default value (" + str(Geojson.default_height) + ").")
                 self.height = Geojson.default_height
 
-        if color_attribute[0] in self.feature_properties:
-            attribute = self.feature_properties[color_attribute[0]]
-            if color_attribute[1] == 'numeric':
-                if attribute > Geojson.attribute_max:
-                    Geojson.attribute_max = attribute
-                if attribute < Geojson.attribute_min:
-                    Geojson.attribute_min = attribute
-            else:
-                if attribute not in Geojson.attribute_values:
-                    Geojson.attribute_values.append(attribute)
-
     def update_seg(self, holes, seg):
         """
         Update the segments of the feature.
@@ -165,20 +149,6 @@ class Geojson(Feature):
             if not any(tuple(coord) in seen for coord in ring)
         ]
 
-    def create_wall_vertices(self, ring):
-        """
-        Create the vertices of the side triangles of the feature.
-        :param ring: the coordinates of the feature
-        """
-
-        height = self.height
-        ring_length = len(ring)
-        vertices = [None] * (2 * ring_length)
-        for j, coord in enumerate(ring):
-            vertices[j] = np.array([coord[0], coord[1], coord[2]])
-            vertices[j + ring_length] = np.array([coord[0], coord[1], coord[2] + height])
-        return vertices
-
     def prepare_geometry(self):
         """
         Prepares the geometric data for triangulation.
@@ -232,7 +202,8 @@ class Geojson(Feature):
             A (dict): Geometric data containing vertices, segments, and optionally holes.
 
         Returns:
-            dict or object: Result of the triangulation process. The type of the return value depends on the triangulation method used.
+            dict or array: Result of the triangulation process. The triangulation of the 'triangle' library (a dict with
+                the vertices and the indices of the triangles), or the indices of the custom triangulation.
         """
 
         if self.custom_triangulation:
@@ -243,98 +214,6 @@ class Geojson(Feature):
             except Exception as e:
                 print("Error in triangulation: ", e, " on ", self.id)
 
-    def create_upper_triangles(self, poly_triangles, triangles):
-        """
-        Creates upper triangles for the 3D geometry.
-
-        This method takes the result of the triangulation process and generates upper triangles by adjusting the z-coordinate based on the height.
-
-        Parameters:
-            poly_triangles (list or dict): The result of the triangulation process.
-            triangles (list): A list to which the generated upper triangles will be appended.
-        """
-
-        for tri in poly_triangles:
-            upper_tri = [np.array([coord[0], coord[1], coord[2] + self.height]) for coord in tri]
-            triangles.append(upper_tri)
-
-    def add_side_triangles(self, wall_vertices, index, length, triangles):
-        """
-        Adds side triangles for a given segment of a ring.
-
-        This method calculates and appends two side triangles for a segment, based on the provided vertices.
-
-        Parameters:
-            wall_vertices (list): List of vertices for the wall.
-            index (int): Current index in the vertices list.
-            length (int): The total number of segments in the ring.
-            triangles (list): List to which the calculated triangles will be appended.
-        """
-
-        triangles.append([wall_vertices[index], wall_vertices[length + index], wall_vertices[length + ((index + 1) % length)],])
-        triangles.append([wall_vertices[index], wall_vertices[length + ((index + 1) % length)], wall_vertices[((index + 1) % length)],])
-
-    def create_side_triangles(self, triangles):
-        """
-        Generates side triangles for both the exterior and interior rings of the geometry.
-
-        This method handles the creation of side triangles for the entire structure, including both the exterior ring and any interior rings (courtyards).
-
-        Parameters:
-            triangles (list): A list to which the generated side triangles will be appended.
-        """
-
-        exterior_ring = self.exterior_ring
-        interior_rings = self.interior_rings
-
-        building_wall_vertices = self.create_wall_vertices(exterior_ring)
-
-        self.process_ring_for_side_triangles(building_wall_vertices, triangles)
-
-        for ctyard_wall_verts in interior_rings:
-            ctyard_wall_vertices = self.create_wall_vertices(ctyard_wall_verts)
-            self.process_ring_for_side_triangles(ctyard_wall_vertices, triangles)
-
-    def process_ring_for_side_triangles(self, ring_vertices, triangles):
-        """
-        Processes a single ring to create side triangles.
-
-        Given a set of vertices for a ring, this method iterates through them to create side triangles.
-
-        Parameters:
-            ring_vertices (list): List of vertices for the ring.
-            triangles (list): List to which the created side triangles will be appended.
-        """
-
-        ring_length = len(ring_vertices) // 2
-        for i in range(ring_length):
-            self.add_side_triangles(ring_vertices, i, ring_length, triangles)
-
-    def create_triangles_with_elevation(self, poly_triangles, elevation):
-        """
-        Creates a list of triangles with added elevation.
-
-        This method processes the triangulation result to add elevation to each vertex, forming 3D triangles.
-
-        Parameters:
-            poly_triangles (dict): Result of triangulation, containing vertices and triangle indices.
-            elevation (float): The elevation to be added to each vertex.
-
-        Returns:
-            list: List of 3D triangles with added elevation.
-        """
-
-        triangles_with_ele = []
-
-        for triangle_indices in poly_triangles["triangles"]:
-            triangle = []
-            for idx in triangle_indices:
-                vertex_with_z = list(poly_triangles["vertices"][idx]) + [elevation]
-                triangle.append(vertex_with_z)
-            triangles_with_ele.append(tuple(triangle))
-
-        return triangles_with_ele
-
     def remove_duplicate_points_within_exterior_ring(self):
         """
         Prevents segmentation faults in the 'triangle' library by removing
@@ -396,26 +275,44 @@ class Geojson(Feature):
         """
         Creates the 3D extrusion of the feature.
         """
-        triangles = list()
-
         A = self.prepare_geometry()
 
         if len(A["vertices"]) < 3:
             return
 
         poly_triangles = self.perform_triangulation(A)
+        if poly_triangles is None:
+            return
 
+        rings = [np.array(ring, dtype=np.float64)[:, :3] for ring in [self.exterior_ring] + self.interior_rings]
         if self.custom_triangulation:
-            self.create_upper_triangles(poly_triangles, triangles)
+            # The buffered line is triangulated with the 3D points of its ring, no interior ring
+            triangles = extrude_rings(rings, poly_triangles, self.height)
         else:
             elevation = self.exterior_ring[0][2]
-            triangles_with_ele = self.create_triangles_with_elevation(poly_triangles, elevation)
-            self.create_upper_triangles(triangles_with_ele, triangles)
+            roof_vertices = np.column_stack((poly_triangles["vertices"], np.full(len(poly_triangles["vertices"]), elevation)))
+            roof_triangles = poly_triangles.get("triangles", np.empty((0, 3), dtype=np.int64))
+            triangles = extrude_rings(rings, roof_triangles, self.height, roof_vertices=roof_vertices)
 
-        self.create_side_triangles(triangles)
-        self.geom.triangles.append(triangles)
+        self.geom.triangles = [triangles]
         self.set_box()
 
+    def set_box_from_rings(self):
+        """
+        Set the bounding box of the 3D extrusion of the feature from its rings, without triangulating the feature.
+        The triangulation doesn't add points, so the box is the same as the box of the extrusion.
+
+        :return: False if the feature has too few points to be triangulated
+        """
+        if len(self.exterior_ring) == 0 or len(self.exterior_ring) + sum(len(ring) for ring in self.interior_rings) < 3:
+            return False
+        points = np.concatenate([np.array(ring, dtype=np.float64)[:, :3] for ring in [self.exterior_ring] + self.interior_rings if len(ring) > 0])
+        # The walls are extruded from the rings, the roof is extruded at the elevation of the first point
+        heights = np.append(np.concatenate((points[:, 2], points[:, 2] + self.height)), self.exterior_ring[0][2] + self.height)
+        self.set_box_from_mins_maxs([points[:, 0].min(), points[:, 1].min(), heights.min()],
+                                    [points[:, 0].max(), points[:, 1].max(), heights.max()])
+        return True
+
     def get_geojson_id(self):
         return super().get_id()
 
@@ -423,36 +320,197 @@ class Geojson(Feature):
         return super().set_id(id)
 
 
+def parse_geojson_chunk(task):
+    """
+    Parse and triangulate a chunk of features in a worker process.
+    The triangles are sent back as a single array instead of lists of per-vertex arrays.
+    :param task: a tuple (features, index of the first feature, properties, is_roof)
+
+    :return: the indices of the kept features in the chunk, the number of triangles of each kept feature
+    and the stacked triangles
+    """
+    features, first_feature, properties, is_roof = task
+    # The feature counter (used for debug) of the worker starts at the first feature of the chunk
+    Geojson.n_feature = first_feature
+
+    kept = list()
+    counts = list()
+    triangles = list()
+    for i, feature in enumerate(features):
+        if not Geojsons.parse_feature(feature, properties, is_roof):
+            continue
+        kept.append(i)
+        if feature.box is None:
+            counts.append(-1)
+        else:
+            counts.append(len(feature.get_geom_as_array()))
+            triangles.append(feature.get_geom_as_array())
+    triangles = np.concatenate(triangles) if len(triangles) > 0 else np.empty((0, 3, 3), dtype=np.float64)
+    return kept, counts, triangles
+
+
 class Geojsons(FeatureList):
     """
     A decorated list of Geojson instances.
     """
 
+    # The number of features sent at once to a worker process
+    chunk_size = 1000
+
     def __init__(self, objects=None):
         super().__init__(objects)
 
     @staticmethod
-    def parse_geojsons(features, properties, is_roof=False, color_attribute=('NONE', 'numeric')):
+    def set_chunk_size(chunk_size):
+        """
+        Set the number of features sent at once to a worker process.
+        :param chunk_size: a number greater than 0
+        """
+        Geojsons.chunk_size = max(1, chunk_size)
+
+    @staticmethod
+    def prepare_feature(feature, properties, is_roof=False):
+        """
+        Parse a feature and clean its rings, without creating its 3D geometry.
+        :param feature: a Geojson instance
+        :param properties: the properties used when parsing the features
+        :param is_roof: substract the height from the features coordinates
+
+        :return: False if the feature must be skipped
+        """
+        if not feature.parse_geojson(properties, is_roof):
+            return False
+
+        feature.remove_int_ring_with_duplicate_points_from_exterior_ring()
+        feature.remove_duplicate_points_within_exterior_ring()
+        feature.remove_duplicate_points_within_interior_rings()
+        return True
+
+    @staticmethod
+    def locate_geojsons(features, properties, is_roof=False, statistics=None):
+        """
+        First pass of the two-pass tiling: compute the bounding box of the features without creating their 3D geometry.
+        The rings and the JSON geometry are released, the geometry is created again from the source of the feature
+        when its tile is created (the features must have a geometry source, see Feature.set_geom_source).
+        :param features: the features to parse from the GeoJSON (a list or a generator)
+        :param properties: the properties used when parsing the features
+        :param is_roof: substract the height from the features coordinates
+        :param statistics: an AttributeStatistics instance updated with the properties of the kept features
+
+        :return: a list of Geojson instances with a bounding box and without geometry.
+        """
+        feature_list = list()
+
+        for feature in features:
+            if Geojsons.prepare_feature(feature, properties, is_roof) and feature.set_box_from_rings():
+                # Each point creates about 3 triangles: 2 for the walls, 1 for the roof
+                nb_points = len(feature.exterior_ring) + sum(len(ring) for ring in feature.interior_rings)
+                feature.size_estimate = Feature.get_size_of_triangles(3 * nb_points)
+                feature.feature_geometry = None
+                feature.exterior_ring = None
+                feature.interior_rings = None
+                feature_list.append(feature)
+                if statistics is not None:
+                    statistics.add(feature.feature_properties)
+
+        return Geojsons(feature_list)
+
+    @staticmethod
+    def parse_feature(feature, properties, is_roof=False):
+        """
+        Parse a feature and create its 3D geometry.
+        :param feature: a Geojson instance
+        :param properties: the properties used when parsing the features
+        :param is_roof: substract the height from the features coordinates
+
+        :return: False if the feature must be skipped
+        """
+        if not Geojsons.prepare_feature(feature, properties, is_roof):
+            return False
+
+        # Create geometry as expected from GLTF from an geojson file
+        feature.parse_geom()
+        # The JSON geometry isn't needed anymore once the feature is triangulated
+        feature.feature_geometry = None
+        return True
+
+    @staticmethod
+    def parse_geojsons(features, properties, is_roof=False, statistics=None, jobs=1, feature_store=None):
         """
         Create 3D features from the GeoJson features.
-        :param features: the features to parse from the GeoJSON
+        :param features: the features to parse from the GeoJSON (a list or a generator)
         :param properties: the properties used when parsing the features
         :param is_roof: substract the height from the features coordinates
+        :param statistics: an AttributeStatistics instance updated with the properties of the parsed features
+        :param jobs: the number of processes triangulating the features
+        :param feature_store: a FeatureStore where the triangles are moved as soon as a feature is parsed
 
         :return: a list of triangulated Geojson instances.
         """
+        if jobs > 1:
+            return Geojsons.parse_geojsons_in_parallel(features, properties, is_roof, statistics, jobs, feature_store)
+
         feature_list = list()
 
         for feature in features:
-            if not feature.parse_geojson(properties, is_roof, color_attribute):
-                continue
+            if Geojsons.parse_feature(feature, properties, is_roof):
+                if feature_store is not None:
+                    feature.store_geom(feature_store)
+                feature_list.append(feature)
+                if statistics is not None:
+                    statistics.add(feature.feature_properties)
 
-            feature.remove_int_ring_with_duplicate_points_from_exterior_ring()
-            feature.remove_duplicate_points_within_exterior_ring()
-            feature.remove_duplicate_points_within_interior_rings()
+        return Geojsons(feature_list)
 
-            # Create geometry as expected from GLTF from an geojson file
-            feature.parse_geom()
-            feature_list.append(feature)
+    @staticmethod
+    def parse_geojsons_in_parallel(features, properties, is_roof, statistics, jobs, feature_store=None):
+        """
+        Create 3D features from the GeoJson features with several processes.
+        The features are sent to the workers by chunks, and only a few chunks are pending at once
+        so the features are still read incrementally.
+        :param features: the features to parse from the GeoJSON (a list or a generator)
+        :param properties: the properties used when parsing the features
+        :param is_roof: substract the height from the features coordinates
+        :param statistics: an AttributeStatistics instance updated with the properties of the parsed features
+        :param jobs: the number of processes triangulating the features
+        :param feature_store: a FeatureStore where the triangles are moved as soon as a feature is parsed
 
-        return Geojsons(features)
+        :return: a list of triangulated Geojson instances, in the same order as the serial parsing.
+        """
+        feature_list = list()
+        features = iter(features)
+        first_feature = Geojson.n_feature
+
+        def merge_chunk(chunk, result):
+            kept, counts, triangles = result
+            offset = 0
+            for i, count in zip(kept, counts):
+                feature = chunk[i]
+                feature.feature_geometry = None
+                if count >= 0:
+                    feature.geom.triangles.append(triangles[offset:offset + count])
+                    feature.set_box()
+                    offset += count
+                    if feature_store is not None:
+                        feature.store_geom(feature_store)
+                feature_list.append(feature)
+                if statistics is not None:
+                    statistics.add(feature.feature_properties)
+
+        with multiprocessing.get_context('fork').Pool(jobs) as pool:
+            pending = deque()
+            while True:
+                chunk = list(itertools.islice(features, Geojsons.chunk_size))
+                if len(chunk) > 0:
+                    task = (chunk, first_feature, properties, is_roof)
+                    pending.append((chunk, pool.apply_async(parse_geojson_chunk, (task,))))
+                    first_feature += len(chunk)
+                # Keep the workers busy while bounding the number of features in memory
+                while len(pending) > 0 and (len(chunk) == 0 or len(pending) >= 2 * jobs):
+                    pending_chunk, result = pending.popleft()
+                    merge_chunk(pending_chunk, result.get())
+                if len(chunk) == 0:
+                    break
+        Geojson.n_feature = first_feature
+
+        return Geojsons(feature_list)
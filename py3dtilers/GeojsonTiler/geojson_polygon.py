@@ -13,8 +13,8 @@ class GeojsonPolygon(Geojson):
 
         self.is_multi_geom = is_multi_geom
 
-    def parse_geojson(self, properties, is_roof=False, color_attribute=('NONE', 'numeric')):
-        super().parse_geojson(properties, is_roof, color_attribute)
+    def parse_geojson(self, properties, is_roof=False):
+        super().parse_geojson(properties, is_roof)
 
         if self.is_multi_geom:
             exterior_ring = self.get_clockwise_polygon(
@@ -0,0 +1,176 @@
+import json
+import os
+
+# Number of characters read at once from the GeoJSON files
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Characters which can separate JSON values: whitespaces, and the record separator of GeoJSON text sequences
+SEPARATORS = ' \t\n\r\x1e'
+
+
+class GeojsonReader():
+    """
+    Read the features of a GeoJSON file incrementally, without loading the whole document in memory.
+    The file can contain a FeatureCollection, a single Feature or a sequence of Features
+    (newline-delimited GeoJSON or GeoJSON text sequence).
+    """
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.end_of_file = False
+        # The position (in bytes) in the file of a character of the buffer, used to locate the features in the file
+        self.with_spans = False
+        self.byte_anchor = 0
+        self.byte_offset = 0
+        # The position (in bytes) of the start and of the end of the last value read
+        self.value_span = (0, 0)
+
+    def get_byte_offset(self, position):
+        """
+        Return the position in the file (in bytes, UTF-8 encoded) of a character of the buffer.
+        The positions must be requested in increasing order, so each character is encoded only once.
+        :param position: the index of the character in the buffer
+        :return: an int
+        """
+        self.byte_offset += len(self.buffer[self.byte_anchor:position].encode('utf-8'))
+        self.byte_anchor = position
+        return self.byte_offset
+
+    def read_chunk(self):
+        """
+        Drop the consumed part of the buffer and append the next characters of the file.
+        The size of the read grows with the buffer, so a value bigger than a chunk is read in linear time.
+        :return: False when the end of the file is reached
+        """
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer)))
+        if self.with_spans:
+            self.get_byte_offset(self.position)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        self.byte_anchor = 0
+        self.end_of_file = len(chunk) == 0
+        return not self.end_of_file
+
+    def next_character(self):
+        """
+        Skip the separators and return the next character, without consuming it.
+        :return: a character, or None at the end of the file
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in SEPARATORS:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_chunk():
+                return None
+
+    def expect(self, characters):
+        """
+        Consume the next character, which must be one of the expected characters.
+        :param characters: the expected characters
+        :return: the consumed character
+        """
+        character = self.next_character()
+        if character is None or character not in characters:
+            raise ValueError(f"Invalid GeoJSON: expected one of '{characters}', found '{character}'")
+        self.position += 1
+        return character
+
+    def read_value(self):
+        """
+        Decode the next JSON value of the file.
+        A value ending exactly at the end of the buffer could be truncated (e.g. a number), so more characters are read.
+        :return: the decoded value
+        """
+        self.next_character()
+        while True:
+            try:
+                value, end = GeojsonReader.decoder.raw_decode(self.buffer, self.position)
+                if end < len(self.buffer) or self.end_of_file:
+                    if self.with_spans:
+                        self.value_span = (self.get_byte_offset(self.position), self.get_byte_offset(end))
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.end_of_file:
+                    raise
+            self.read_chunk()
+
+    def iterate_array(self):
+        """
+        Iterate over the values of the next JSON array.
+        :return: a generator of decoded values
+        """
+        self.expect('[')
+        if self.next_character() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.read_value()
+            if self.expect(',]') == ']':
+                return
+
+    def iterate_features(self, with_spans=False):
+        """
+        Iterate over the features of the file.
+        The members of the top-level objects are read one by one: the 'features' array of a FeatureCollection
+        is streamed, while the other objects are features of a sequence.
+        :param with_spans: when True, also yield the position (start and end, in bytes) of each feature in the file
+        :return: a generator of GeoJSON features (as dict), or of (feature, (start, end)) tuples
+        """
+        self.with_spans = with_spans
+        while self.next_character() is not None:
+            start = self.get_byte_offset(self.position) if with_spans else None
+            self.expect('{')
+            members = dict()
+            is_collection = False
+            if self.next_character() == '}':
+                self.position += 1
+            else:
+                while True:
+                    key = self.read_value()
+                    self.expect(':')
+                    if key == 'features' and self.next_character() == '[':
+                        is_collection = True
+                        for feature in self.iterate_array():
+                            yield (feature, self.value_span) if with_spans else feature
+                    else:
+                        members[key] = self.read_value()
+                    if self.expect(',}') == '}':
+                        break
+            if not is_collection and members.get('type') == 'Feature':
+                yield (members, (start, self.get_byte_offset(self.position))) if with_spans else members
+
+
+def read_geojson_features(geojson_file, chunk_size=DEFAULT_CHUNK_SIZE, with_spans=False):
+    """
+    Read the features of a GeoJSON file one by one.
+    :param geojson_file: the path to a GeoJSON or a newline-delimited GeoJSON file
+    :param chunk_size: the number of characters read at once
+    :param with_spans: when True, also yield the position (start and end, in bytes) of each feature in the file
+
+    :return: a generator of GeoJSON features (as dict), or of (feature, (start, end)) tuples
+    """
+    # The new lines aren't translated, so the positions of the characters can be converted into positions in the file
+    with open(geojson_file, encoding='utf-8', newline='') as f:
+        yield from GeojsonReader(f, chunk_size).iterate_features(with_spans)
+
+
+def read_geojson_feature(geojson_file, span):
+    """
+    Read a single feature of a GeoJSON file, from its position in the file.
+    :param geojson_file: the path to the GeoJSON file, or a file opened in binary mode
+    :param span: the position (start and end, in bytes) of the feature, as yielded by read_geojson_features
+
+    :return: a GeoJSON feature (as dict)
+    """
+    if isinstance(geojson_file, (str, bytes, os.PathLike)):
+        with open(geojson_file, 'rb') as f:
+            return read_geojson_feature(f, span)
+    geojson_file.seek(span[0])
+    return json.loads(geojson_file.read(span[1] - span[0]))
@@ -0,0 +1,71 @@
+from .geojson import Geojsons
+from .geojson_line import GeojsonLine
+from .geojson_polygon import GeojsonPolygon
+from .geojson_reader import read_geojson_feature
+
+
+class GeojsonSource():
+    """
+    The GeoJSON files read by the GeojsonTiler, used as the geometry source of the features in a two-pass tiling.
+    Each feature keeps the position of its JSON object in a file, and its 3D geometry is created again
+    from the file when its tile is created.
+    """
+
+    def __init__(self, files, properties, is_roof=False):
+        """
+        :param files: the paths to the GeoJSON files
+        :param properties: the properties used when parsing the features
+        :param is_roof: substract the height from the features coordinates
+        """
+        self.files = [str(file) for file in files]
+        self.properties = properties
+        self.is_roof = is_roof
+        self.opened_files = dict()
+
+    def __getstate__(self):
+        # The source is sent to worker processes without its file handles, the workers open their own handles
+        state = self.__dict__.copy()
+        state['opened_files'] = dict()
+        return state
+
+    @staticmethod
+    def create_feature(id, feature_geometry, feature_properties):
+        """
+        Create a Geojson instance with the geometry and the properties of a feature.
+        :param id: the identifier of the Geojson instance
+        :param feature_geometry: the JSON geometry of the feature
+        :param feature_properties: the JSON properties of the feature
+
+        :return: a Geojson instance
+        """
+        return {
+            'Polygon': GeojsonPolygon(id, feature_properties, feature_geometry),
+            'MultiPolygon': GeojsonPolygon(id, feature_properties, feature_geometry, is_multi_geom=True),
+            'LineString': GeojsonLine(id, feature_properties, feature_geometry),
+            'MultiLineString': GeojsonLine(id, feature_properties, feature_geometry, is_multi_geom=True)
+        }[feature_geometry['type']]
+
+    def get(self, entries):
+        """
+        Read a feature from its file and create its 3D geometry.
+        :param entries: the index of the file and the position (start and end, in bytes) of the feature in the file
+
+        :return: the triangles of the feature, as a list of arrays (empty if the feature can't be triangulated)
+        """
+        file_index, start, end = entries
+        if file_index not in self.opened_files:
+            self.opened_files[file_index] = open(self.files[file_index], 'rb')
+        feature = read_geojson_feature(self.opened_files[file_index], (start, end))
+
+        geojson = GeojsonSource.create_feature(None, feature['geometry'], feature['properties'])
+        if not Geojsons.parse_feature(geojson, self.properties, self.is_roof) or geojson.box is None:
+            return list()
+        return geojson.geom.triangles
+
+    def close(self):
+        """
+        Close the files opened to read the features.
+        """
+        for file in self.opened_files.values():
+            file.close()
+        self.opened_files = dict()
@@ -1,5 +1,4 @@
 import numpy as np
-from shapely.geometry import LineString
 
 
 class LineBuffer():
@@ -11,38 +10,65 @@ class LineBuffer():
     def __init__(self, buffer_size=1):
         self.offset = buffer_size / 2
 
-    def line_intersect(self, l1_start, l1_end, l2_start, l2_end):
+    def get_mitered_offsets(self, points, line_sizes):
         """
-        https://stackoverflow.com/questions/64463369/intersection-of-two-infinite-lines-specified-by-points
-        Find the intersection between 2 lines, each line is defined by 2 points
+        Compute the left and right mitered offsets of the points of several lines at once.
+        The offset of an inner point is the intersection of the parallel offsets of its two segments.
+        When the two segments are collinear, the point is offset along their common normal.
+        When the line turns back on itself, the point is offset along the normal of the previous segment.
+        :param points: a (n_points, 2) array containing the points of all the lines
+        :param line_sizes: the number of points of each line (at least 2)
+
+        :return: the (n_points, 2) left and right offsets
         """
-        p1_start = np.asarray(l1_start)
-        p1_end = np.asarray(l1_end)
-        p2_start = np.asarray(l2_start)
-        p2_end = np.asarray(l2_end)
+        line_sizes = np.asarray(line_sizes, dtype=np.int64)
+        line_ends = np.cumsum(line_sizes)
+        line_starts = line_ends - line_sizes
+
+        # Left normals of the segments (the segments between two lines are computed but never used)
+        directions = points[1:] - points[:-1]
+        directions /= np.linalg.norm(directions, axis=1)[:, np.newaxis]
+        segment_normals = np.column_stack((-directions[:, 1], directions[:, 0]))
+
+        # Normals of the segments before and after each point, the ends of a line only have one segment
+        normals_in = np.empty_like(points)
+        normals_out = np.empty_like(points)
+        normals_in[1:] = segment_normals
+        normals_out[:-1] = segment_normals
+        normals_in[line_starts] = normals_out[line_starts]
+        normals_out[line_ends - 1] = normals_in[line_ends - 1]
 
-        p = p1_start
-        r = (p1_end - p1_start)
-        q = p2_start
-        s = (p2_end - p2_start)
+        miters = normals_in + normals_out
+        miter_norms = np.linalg.norm(miters, axis=1)
+        turns_back = miter_norms < 1e-12
+        miters[turns_back] = normals_in[turns_back]
+        miter_norms[turns_back] = 1
+        miters /= miter_norms[:, np.newaxis]
+        # The miter is longer than the offset when the segments aren't aligned
+        miters *= (self.offset / np.einsum('ij,ij->i', miters, normals_in))[:, np.newaxis]
 
-        t = np.cross(q - p, s) / (np.cross(r, s))
-        i = p + t * r
-        return i.tolist()
+        return points + miters, points - miters
 
-    def get_parallel_offset(self, start_point, end_point, offset=3):
+    def buffer_line_strings(self, lines):
         """
-        Return the parallel offsets (left and right) of a line
-        :param start_point: the starting point of the line
-        :param end_point: the ending point of the line
-        :param offset: the distance between the line and its parallel offsets
+        Buffer several line strings at once.
+        :param lines: a list of line strings, each line string is a list of 3D points ([x, y, z])
 
-        :return: left and right parallel offsets a list of points
+        :return: a list of buffered polygons, as (2 * n_points, 3) arrays
         """
-        line = LineString([start_point, end_point])
-        po_left = list(line.parallel_offset(offset, 'left', join_style=2, resolution=1).coords)
-        po_right = list(line.parallel_offset(offset, 'right', join_style=2, resolution=1).coords)
-        return po_left, po_right
+        if len(lines) == 0:
+            return list()
+        line_sizes = [len(line) for line in lines]
+        points = np.concatenate([np.asarray(line, dtype=np.float64)[:, :3] for line in lines])
+        left, right = self.get_mitered_offsets(points[:, :2], line_sizes)
+        left = np.column_stack((left, points[:, 2]))
+        right = np.column_stack((right, points[:, 2]))
+
+        # Each polygon goes along the left side, then comes back along the right side
+        polygons = list()
+        for line_left, line_right in zip(np.split(left, np.cumsum(line_sizes)[:-1]), np.split(right, np.cumsum(line_sizes)[:-1])):
+            polygons.append(np.concatenate((line_left, line_right[::-1])))
+        return polygons
 
     def buffer_line_string(self, coordinates):
         """
@@ -51,24 +77,4 @@ class LineBuffer():
 
         :return: a buffered polygon
         """
-        polygon = [None] * (len(coordinates) * 2)
-        width_offset = self.offset
-
-        po_1_left, po_1_right = self.get_parallel_offset(coordinates[0], coordinates[1], offset=width_offset)
-        polygon[0] = [po_1_left[0][0], po_1_left[0][1], coordinates[0][2]]
-        polygon[(len(coordinates) * 2) - 1] = [po_1_right[0][0], po_1_right[0][1], coordinates[0][2]]
-
-        po_2_left, po_2_right = self.get_parallel_offset(coordinates[len(coordinates) - 2], coordinates[len(coordinates) - 1], offset=width_offset)
-        polygon[len(coordinates) - 1] = [po_2_left[1][0], po_2_left[1][1], coordinates[len(coordinates) - 1][2]]
-        polygon[len(coordinates)] = [po_2_right[1][0], po_2_right[1][1], coordinates[len(coordinates) - 1][2]]
-
-        for i in range(0, len(coordinates) - 2):
-            po_1_left, po_1_right = self.get_parallel_offset(coordinates[i], coordinates[i + 1], offset=width_offset)
-            po_2_left, po_2_right = self.get_parallel_offset(coordinates[i + 1], coordinates[i + 2], offset=width_offset)
-
-            intersection_left = self.line_intersect(po_1_left[0], po_1_left[1], po_2_left[0], po_2_left[1])
-            intersection_right = self.line_intersect(po_1_right[0], po_1_right[1], po_2_right[0], po_2_right[1])
-            polygon[i + 1] = [intersection_left[0], intersection_left[1], coordinates[i + 1][2]]
-            polygon[len(polygon) - 2 - i] = [intersection_right[0], intersection_right[1], coordinates[i + 1][2]]
-
-        return [coord for coord in polygon if not np.isnan(np.sum(coord))]
+        return self.buffer_line_strings([coordinates])[0].tolist()
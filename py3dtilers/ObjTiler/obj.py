@@ -23,6 +23,19 @@ class Obj(Feature):
     The Python representation of an OBJ mesh.
     """
 
+    # For each supported vertex format: the number of floats per vertex and
+    # the offsets of the position, the UV and the color in those floats
+    VERTEX_FORMATS = {
+        'V3F': (3, 0, None, None),
+        'T2F_V3F': (5, 2, 0, None),
+        'N3F_V3F': (6, 3, None, None),
+        'C3F_V3F': (6, 3, None, 0),
+        'T2F_N3F_V3F': (8, 5, 0, None),
+        'T2F_C3F_V3F': (8, 5, 0, 2),
+        'C3F_N3F_V3F': (9, 6, None, 0),
+        'T2F_C3F_N3F_V3F': (11, 8, 0, 2)
+    }
+
     def __init__(self, id=None):
         super().__init__(id)
 
@@ -41,90 +54,34 @@ class Obj(Feature):
         # GLTF expect the geometry to only be triangles that contains
         # the vertices position, i.e something in the form :
         # [
-        #   [np.array([0., 0., 0,]),
-        #    np.array([0.5, 0.5, 0.5]),
-        #    np.array([1.0 ,1.0 ,1.0])]
-        #   [np.array([0.5, 0.5, 0,5]),
-        #    np.array([1., 1., 1.]),
-        #    np.array([-1.0 ,-1.0 ,-1.0])]
+        #   [[0., 0., 0,],
+        #    [0.5, 0.5, 0.5],
+        #    [1.0 ,1.0 ,1.0]]
+        #   [[0.5, 0.5, 0,5],
+        #    [1., 1., 1.],
+        #    [-1.0 ,-1.0 ,-1.0]]
         # ]
-        triangles = list()
-        uvs = list()
-        colors = list()
-
-        vertices = material.vertices
-        length = len(vertices)
+        # The interleaved vertices of the material are reshaped into one row per vertex,
+        # then each attribute is sliced out of the rows as a (n_triangles, 3, n) array.
         vertex_format = material.vertex_format
-        # Contains only vertex positions
-        if vertex_format == 'V3F':
-            for i in range(0, length, 9):
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i, i + 9, 3)]
-                triangles.append(triangle)
-        # Contains texture and vertex positions
-        elif vertex_format == 'T2F_V3F':
-            for i in range(0, length, 15):
-                uv = [np.array([vertices[n], 1 - vertices[n + 1]]) for n in range(i, i + 15, 5)]
-                uvs.append(uv)
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 2, i + 17, 5)]
-                triangles.append(triangle)
-        # Contains normals and vertex positions
-        elif vertex_format == 'N3F_V3F':
-            for i in range(0, length, 18):
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 3, i + 21, 6)]
-                triangles.append(triangle)
-        # Contains vertex colors and positions
-        elif vertex_format == 'C3F_V3F':
-            for i in range(0, length, 18):
-                color = [np.array(vertices[n:n + 3]) for n in range(i, i + 18, 6)]
-                colors.append(color)
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 3, i + 21, 6)]
-                triangles.append(triangle)
-        # Contains texture/vertex positions and normals
-        elif vertex_format == 'T2F_N3F_V3F':
-            for i in range(0, length, 24):
-                uv = [np.array([vertices[n], 1 - vertices[n + 1]]) for n in range(i, i + 24, 8)]
-                uvs.append(uv)
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 5, i + 29, 8)]
-                triangles.append(triangle)
-        # Contains texture/vertex positions and colors
-        elif vertex_format == 'T2F_C3F_V3F':
-            for i in range(0, length, 24):
-                uv = [np.array([vertices[n], 1 - vertices[n + 1]]) for n in range(i, i + 24, 8)]
-                uvs.append(uv)
-                color = [np.array(vertices[n:n + 3]) for n in range(i + 2, i + 26, 8)]
-                colors.append(color)
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 5, i + 29, 8)]
-                triangles.append(triangle)
-        # Contains colors, vertex positions and normals
-        elif vertex_format == 'C3F_N3F_V3F':
-            for i in range(0, length, 27):
-                color = [np.array(vertices[n:n + 3]) for n in range(i, i + 27, 9)]
-                colors.append(color)
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 6, i + 33, 9)]
-                triangles.append(triangle)
-        # Contains texture/vertex positions, colors and normals
-        elif vertex_format == 'T2F_C3F_N3F_V3F':
-            for i in range(0, length, 33):
-                uv = [np.array([vertices[n], 1 - vertices[n + 1]]) for n in range(i, i + 33, 11)]
-                uvs.append(uv)
-                color = [np.array(vertices[n:n + 3]) for n in range(i + 2, i + 35, 11)]
-                colors.append(color)
-                triangle = [np.array(vertices[n:n + 3]) for n in range(i + 8, i + 41, 11)]
-                triangles.append(triangle)
-        else:
+        if vertex_format not in Obj.VERTEX_FORMATS:
             print("Unsuported format", vertex_format)
             return False
+        stride, position_offset, uv_offset, color_offset = Obj.VERTEX_FORMATS[vertex_format]
+        vertices = np.asarray(material.vertices, dtype=np.float64).reshape(-1, stride)
 
-        self.geom.triangles.append(triangles)
-        if len(uvs) > 0 and with_texture:
+        self.geom.triangles.append(vertices[:, position_offset:position_offset + 3].reshape(-1, 3, 3))
+        if uv_offset is not None and with_texture:
+            uvs = vertices[:, uv_offset:uv_offset + 2].reshape(-1, 3, 2)
+            uvs[:, :, 1] = 1 - uvs[:, :, 1]
             self.geom.triangles.append(uvs)
             if material.texture is not None:
                 path = str(material.texture._path).replace('\\', '/')
                 texture = Texture(path)
-                self.set_texture(texture.get_cropped_texture_image(self.geom.triangles[1]))
-        if len(colors) > 0:
+                self.set_texture(texture.get_cropped_texture_image(self.get_data_as_array(0)))
+        if color_offset is not None:
             self.has_vertex_colors = True
-            self.geom.triangles.append(colors)
+            self.geom.triangles.append(vertices[:, color_offset:color_offset + 3].reshape(-1, 3, 3))
         self.set_box()
 
         return True
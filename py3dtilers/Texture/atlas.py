@@ -12,7 +12,7 @@ class Atlas():
     An Atlas contains the texture images of a tile.
     """
 
-    def __init__(self, feature_list, downsample_factor=1):
+    def __init__(self, feature_list, downsample_factor=1, tile_number=None):
         features_with_id_key = dict()
         textures_with_id_key = dict()
 
@@ -25,7 +25,7 @@ class Atlas():
         textures_sorted = sorted(textures_with_id_key.items(),
                                  key=lambda t: self.computeArea(t[1].size), reverse=True)
 
-        atlasTree = self.computeAtlasTree(textures_sorted)
+        atlasTree = self.computeAtlasTree(textures_sorted, tile_number)
 
         self.tile_number = atlasTree.get_tile_number()
 
@@ -49,10 +49,11 @@ class Atlas():
             i *= 2
         return i
 
-    def computeAtlasTree(self, textures_sorted):
+    def computeAtlasTree(self, textures_sorted, tile_number=None):
         """
         :param textures_sorted:  A dictionnary, with building_id as key,
                             and pillow image as value.
+        :param tile_number: the number of the tile, used to name the atlas image
         :rtype node: the root node of the atlas tree
         """
         surfaceAtlas = 0
@@ -84,5 +85,5 @@ class Atlas():
                     )
                     it += 1
                     break
-        node_root.set_tile_number()
+        node_root.set_tile_number(tile_number)
         return node_root
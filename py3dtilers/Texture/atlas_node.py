@@ -1,4 +1,3 @@
-import numpy as np
 from pathlib import Path
 from PIL import Image
 from ..Texture import Rectangle, Texture
@@ -21,7 +20,14 @@ class Node(object):
     def isLeaf(self):
         return (self.child[0] is None and self.child[1] is None)
 
-    def set_tile_number(self):
+    def set_tile_number(self, tile_number=None):
+        """
+        Set the number of the tile. When no number is given, use a global counter.
+        :param tile_number: the number of the tile
+        """
+        if tile_number is not None:
+            self.node_number = tile_number
+            return
         self.node_number = Node.tile_number
         Node.tile_number += 1
 
@@ -171,8 +177,4 @@ class Node(object):
         offsetWidth = (self.rect.get_left() / newWidth)
         offsetHeight = (self.rect.get_top() / newHeight)
 
-        for i in range(0, len(uvs)):
-            for y in range(0, 3):
-                new_u = (uvs[i][y][0] * ratioWidth) + offsetWidth
-                new_v = (uvs[i][y][1] * ratioHeight) + offsetHeight
-                uvs[i][y] = np.array([new_u, new_v])
+        Texture.transform_uvs(uvs, lambda uv_array: uv_array * [ratioWidth, ratioHeight] + [offsetWidth, offsetHeight])
@@ -24,7 +24,7 @@ class Texture():
         """
         Return a part of the original image.
         The original is cropped to keep only the area defined by the UVs.
-        :param uvs: the uvs
+        :param uvs: the uvs, as a list of triangles or a (n_triangles, 3, 2) array
         :return: a Pillow Image
         """
         image = self.cropImage(self.image, uvs)
@@ -37,23 +37,10 @@ class Texture():
         :param uvs: the uvs defining the area.
         :return: a Pillow Image
         """
-        minX = 2
-        maxX = -1
-
-        minY = 2
-        maxY = -1
-
         texture_size = image.size
-        for uv_triangle in uvs:
-            for uv in uv_triangle:
-                if uv[0] < minX:
-                    minX = uv[0]
-                if uv[0] > maxX:
-                    maxX = uv[0]
-                if uv[1] < minY:
-                    minY = uv[1]
-                if uv[1] > maxY:
-                    maxY = uv[1]
+        uv_array = np.asarray(uvs, dtype=np.float64).reshape(-1, 2)
+        minX, minY = uv_array.min(axis=0)
+        maxX, maxY = uv_array.max(axis=0)
 
         cropped_image = image.crop((minX * texture_size[0], minY * texture_size[1], maxX * texture_size[0], maxY * texture_size[1]))
 
@@ -77,11 +64,23 @@ class Texture():
         else:
             ratioY = 1
 
-        for i in range(0, len(uvs)):
-            for y in range(0, 3):
-                new_u = (uvs[i][y][0] - offsetX) * ratioX
-                new_v = (uvs[i][y][1] - offsetY) * ratioY
-                uvs[i][y] = np.array([new_u, new_v])
+        Texture.transform_uvs(uvs, lambda uv_array: (uv_array - [offsetX, offsetY]) * [ratioX, ratioY])
+
+    @staticmethod
+    def transform_uvs(uvs, transform):
+        """
+        Transform the UVs in place, all at once.
+        :param uvs: the uvs, as a list of triangles or a (n_triangles, 3, 2) array
+        :param transform: a function taking and returning a (n_triangles, 3, 2) array
+        """
+        uv_array = np.asarray(uvs, dtype=np.float64)
+        if uv_array is uvs:
+            uvs[...] = transform(uv_array)
+        else:
+            # The new UVs are written back into the triangles of the caller
+            for uv_triangle, new_uv_triangle in zip(uvs, transform(uv_array)):
+                for i in range(0, 3):
+                    uv_triangle[i] = new_uv_triangle[i]
 
     @staticmethod
     def set_texture_folder(folder):
@@ -24,7 +24,7 @@ class TileToFeature(Feature):
         if materials[mat_index].is_textured():
             path = os.path.join(tileset_path, "tiles", materials[mat_index].textureUri)
             texture = Texture(path)
-            self.set_texture(texture.get_cropped_texture_image(self.geom.triangles[1]))
+            self.set_texture(texture.get_cropped_texture_image(self.get_data_as_array(0)))
 
     def set_batchtable_data(self, bt_attributes):
         """
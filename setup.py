@@ -14,7 +14,7 @@ requirements = (
     'pywavefront',
     'pyyaml',
     'scipy==1.9.3',
-    'shapely',
+    'shapely>=2.0',
     'alphashape',
     'py3dtiles @ git+https://github.com/VCityTeam/py3dtiles@Tiler',
     'earclip @ git+https://github.com/lionfish0/earclip',
@@ -84,7 +84,9 @@ setup(
     test_suite="tests",
     extras_require={
         'dev': dev_requirements,
-        'prod': prod_requirements
+        'prod': prod_requirements,
+        'meshopt': ['meshoptimizer'],
+        'draco': ['DracoPy']
     },
     entry_points={
         'console_scripts': ['citygml-tiler=py3dtilers.CityTiler:main',
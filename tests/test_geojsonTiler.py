@@ -1,8 +1,15 @@
+import json
+import os
+import tempfile
 import unittest
+import numpy as np
 from argparse import Namespace
 from pathlib import Path
 
 from py3dtilers.GeojsonTiler.GeojsonTiler import GeojsonTiler
+from py3dtilers.GeojsonTiler.attribute_statistics import AttributeStatistics
+from py3dtilers.GeojsonTiler.geojson import Geojsons
+from py3dtilers.GeojsonTiler.lineBuffer import LineBuffer
 
 
 def get_default_namespace():
@@ -12,6 +19,36 @@ def get_default_namespace():
                      texture_lods=0, keep_ids=[], exclude_ids=[], no_normals=False, as_lods=False)
 
 
+def read_outputs(output_dir, obj_path):
+    """
+    Read the tileset.json, the tiles and the OBJ model (without its comments) created by a Tiler.
+    """
+    tiles = dict()
+    for tile_name in os.listdir(Path(output_dir, 'tiles')):
+        with open(Path(output_dir, 'tiles', tile_name), 'rb') as tile_file:
+            tiles[tile_name] = tile_file.read()
+    with open(Path(output_dir, 'tileset.json')) as tileset_file, open(obj_path) as obj_file:
+        obj = [line for line in obj_file if not line.startswith('#')]
+        return tileset_file.read(), tiles, obj
+
+
+def tile_geojson(output_name, files=[Path('tests/geojson_tiler_test_data/buildings/feature_1/oneBlock.geojson')],
+                 properties=['height', 'HAUTEUR', 'prec', 'PREC_ALTI', 'z', 'NONE'], is_roof=True, color_attribute=('NONE', 'numeric'), **args):
+    """
+    Tile the same GeoJson file(s) with different arguments and return the outputs.
+    """
+    geojson_tiler = GeojsonTiler()
+    geojson_tiler.files = files
+    geojson_tiler.args = get_default_namespace()
+    for name, value in args.items():
+        setattr(geojson_tiler.args, name, value)
+    geojson_tiler.args.output_dir = Path("tests/geojson_tiler_test_data/generated_tilesets/" + output_name)
+    geojson_tiler.args.obj = Path('tests/geojson_tiler_test_data/generated_objs/block_' + output_name + '.obj')
+    tileset = geojson_tiler.from_geojson_directory(properties, is_roof=is_roof, color_attribute=color_attribute)
+    tileset.write_as_json(geojson_tiler.args.output_dir)
+    return read_outputs(geojson_tiler.args.output_dir, geojson_tiler.args.obj)
+
+
 class Test_Tile(unittest.TestCase):
 
     def test_basic_case(self):
@@ -77,14 +114,42 @@ class Test_Tile(unittest.TestCase):
     def test_add_color(self):
         properties = ['height', 'HAUTEUR', 'prec', 'NONE', 'z', 'NONE']
 
+        no_color = tile_geojson('no_color', properties=properties)
+        for color_attribute in [('HAUTEUR', 'numeric'), ('ID', 'semantic')]:
+            add_color = tile_geojson('add_color', properties=properties, color_attribute=color_attribute)
+            self.assertNotEqual(add_color[1], no_color[1])
+            # The statistics computed by the pre-pass are the same as the statistics collected while parsing
+            pre_pass = tile_geojson('add_color_pre_pass', properties=properties, color_attribute=color_attribute, color_pre_pass=True)
+            self.assertEqual(pre_pass, add_color)
+            two_pass = tile_geojson('add_color_two_pass', properties=properties, color_attribute=color_attribute, two_pass=True)
+            self.assertEqual(two_pass, add_color)
+
+    def test_attribute_statistics(self):
+        numeric = AttributeStatistics(('HAUTEUR', 'numeric'))
+        for properties in [{'HAUTEUR': 12}, {'NATURE': 'Eglise'}, {'HAUTEUR': -3.5}, {'HAUTEUR': 40}, {}]:
+            numeric.add(properties)
+        self.assertEqual((numeric.min, numeric.max, numeric.nb_values), (-3.5, 40, 3))
+
+        semantic = AttributeStatistics(('NATURE', 'semantic'))
+        semantic.add_features([{'properties': {'NATURE': 'Tour'}},
+                               {'properties': {'HAUTEUR': 10}},
+                               {'properties': {'NATURE': 'Chapelle'}},
+                               {'properties': {'NATURE': 'Tour'}},
+                               {'properties': {'NATURE': 'Arc'}}])
+        self.assertEqual(list(semantic.value_counts.items()), [('Tour', 2), ('Chapelle', 1), ('Arc', 1)])
+        self.assertEqual(semantic.get_values(), ['Tour', 'Chapelle', 'Arc'])
+        self.assertEqual((semantic.get_nb_distinct_values(), semantic.nb_values), (3, 4))
+
+        missing = AttributeStatistics(('UNKNOWN', 'numeric'))
+        missing.add({'HAUTEUR': 12})
+        self.assertEqual((missing.min, missing.max, missing.nb_values, missing.get_values()), (float('inf'), -float('inf'), 0, []))
+
         geojson_tiler = GeojsonTiler()
         geojson_tiler.files = [Path('tests/geojson_tiler_test_data/buildings/feature_1/oneBlock.geojson')]
-        geojson_tiler.args = get_default_namespace()
-        geojson_tiler.args.output_dir = Path("tests/geojson_tiler_test_data/generated_tilesets/add_color")
-        geojson_tiler.args.obj = Path('tests/geojson_tiler_test_data/generated_objs/block_color.obj')
-        tileset = geojson_tiler.from_geojson_directory(properties, is_roof=True, color_attribute=('HAUTEUR', 'numeric'))
-        if tileset is not None:
-            tileset.write_as_json(geojson_tiler.args.output_dir)
+        statistics = geojson_tiler.retrieve_attribute_statistics(('HAUTEUR', 'numeric'))
+        with open(geojson_tiler.files[0]) as geojson_file:
+            heights = [feature['properties']['HAUTEUR'] for feature in json.load(geojson_file)['features']]
+        self.assertEqual((statistics.min, statistics.max, statistics.nb_values), (min(heights), max(heights), len(heights)))
 
     def test_create_loa(self):
         properties = ['height', 'HAUTEUR', 'prec', 'PREC_ALTI', 'z', 'NONE']
@@ -159,6 +224,87 @@ class Test_Tile(unittest.TestCase):
         if tileset is not None:
             tileset.write_as_json(geojson_tiler.args.output_dir)
 
+    def test_geojson_sequence(self):
+        # The GeoJSON sequence contains the same features as the GeoJSON file, one per line
+        in_memory = tile_geojson('in_memory')
+        geojson_sequence = tile_geojson('geojson_sequence', files=[Path('tests/geojson_tiler_test_data/buildings/feature_1/oneBlock.geojsonl')])
+        self.assertEqual(geojson_sequence, in_memory)
+
+    def test_feature_store(self):
+        in_memory = tile_geojson('in_memory')
+        feature_store = tile_geojson('feature_store', feature_store='')
+        self.assertEqual(feature_store, in_memory)
+
+    def test_feature_store_removed_on_exit(self):
+        properties = ['height', 'HAUTEUR', 'prec', 'PREC_ALTI', 'z', 'NONE']
+        directory = tempfile.mkdtemp()
+
+        geojson_tiler = GeojsonTiler()
+        geojson_tiler.files = [Path('tests/geojson_tiler_test_data/buildings/feature_1/oneBlock.geojson')]
+        geojson_tiler.args = get_default_namespace()
+        geojson_tiler.args.feature_store = directory
+        geojson_tiler.args.keep_ids = ['unknown_id']
+        geojson_tiler.args.output_dir = Path("tests/geojson_tiler_test_data/generated_tilesets/feature_store_removed_on_exit")
+        with self.assertRaises(SystemExit):
+            geojson_tiler.from_geojson_directory(properties, is_roof=True)
+        self.assertEqual(os.listdir(directory), [])
+        os.rmdir(directory)
+
+    def test_two_pass(self):
+        in_memory = tile_geojson('in_memory')
+        two_pass = tile_geojson('two_pass', two_pass=True)
+        self.assertEqual(two_pass, in_memory)
+
+    def test_jobs(self):
+        # Small chunks, so the features are parsed by several tasks
+        self.addCleanup(Geojsons.set_chunk_size, Geojsons.chunk_size)
+        Geojsons.set_chunk_size(2)
+        in_memory = tile_geojson('in_memory')
+        jobs = tile_geojson('jobs', jobs=2)
+        self.assertEqual(jobs, in_memory)
+
+        Geojsons.set_chunk_size(1)
+        roads = [Path('tests/geojson_tiler_test_data/roads/line_string_road.geojson'),
+                 Path('tests/geojson_tiler_test_data/roads/multi_line_string_road.geojson')]
+        road_properties = ['height', '1', 'width', '1', 'prec', 'NONE', 'z', 'NONE']
+        in_memory = tile_geojson('roads_in_memory', files=roads, properties=road_properties, is_roof=False)
+        jobs = tile_geojson('roads_jobs', files=roads, properties=road_properties, is_roof=False, jobs=3)
+        self.assertEqual(jobs, in_memory)
+
+    def test_line_buffer_collinear_points(self):
+        line_buffer = LineBuffer(buffer_size=4)
+        polygon = line_buffer.buffer_line_string([[0, 0, 1], [5, 0, 2], [10, 0, 3]])
+        # The left side, then the right side in reverse order
+        np.testing.assert_allclose(polygon, [[0, 2, 1], [5, 2, 2], [10, 2, 3], [10, -2, 3], [5, -2, 2], [0, -2, 1]], atol=1e-12)
+
+    def test_line_buffer_turn_back(self):
+        line_buffer = LineBuffer(buffer_size=4)
+        polygon = np.array(line_buffer.buffer_line_string([[0, 0, 0], [10, 0, 0], [0, 0, 0]]))
+        self.assertTrue(np.all(np.isfinite(polygon)))
+        # The point where the line turns back is offset along the normal of the previous segment
+        np.testing.assert_allclose(polygon[1], [10, 2, 0], atol=1e-12)
+        np.testing.assert_allclose(np.abs(polygon[:, 1]), 2, atol=1e-12)
+
+    def test_line_buffer_mitered_offsets(self):
+        line_buffer = LineBuffer(buffer_size=2)
+        left, right = line_buffer.get_mitered_offsets(np.array([[0., 0.], [10., 0.], [10., 10.]]), [3])
+        # The offset of the corner is the intersection of the offsets of its two segments
+        np.testing.assert_allclose(left, [[0, 1], [9, 1], [9, 10]], atol=1e-12)
+        np.testing.assert_allclose(right, [[0, -1], [11, -1], [11, 10]], atol=1e-12)
+
+    def test_buffer_line_strings(self):
+        line_buffer = LineBuffer(buffer_size=3)
+        lines = [[[0, 0, 0], [10, 0, 1]],
+                 [[0, 0, 0], [10, 0, 0], [10, 10, 5], [20, 15, 5]],
+                 [[5, 5, 2], [15, 5, 2], [5, 5, 2]],
+                 [[0, 0, 0], [3, 4, 0], [6, 8, 0]]]
+        polygons = line_buffer.buffer_line_strings(lines)
+        self.assertEqual(len(polygons), len(lines))
+        for line, polygon in zip(lines, polygons):
+            self.assertEqual(len(polygon), 2 * len(line))
+            np.testing.assert_allclose(polygon, line_buffer.buffer_line_string(line))
+        self.assertEqual(line_buffer.buffer_line_strings([]), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,23 @@
+import json
+import os
+import struct
 import unittest
 import numpy as np
 from argparse import Namespace
 from pathlib import Path
+from py3dtiles import GlTFMaterial, TriangleSoup
+from shapely.geometry import Point, Polygon
 
 from py3dtilers.Common.tiler import Tiler
 from py3dtilers.Common.feature import Feature, FeatureList
+from py3dtilers.Common.extrusion import extrude_rings
+from py3dtilers.Common.gltf_writer import GlTFWriter
+from py3dtilers.Common.group import Groups
+from py3dtilers.Common.kd_tree import kd_tree_indices
+from py3dtilers.Common.normals import compute_vertex_normals
+from py3dtilers.Common.polygon_index import find_containing_polygons
+from py3dtilers.Common.wkb_decoder import triangle_soup_from_wkb_multipolygon
+from py3dtilers.Common.tile_compression import DracoCompressor, MeshoptCompressor, TileCompressor
 from py3dtilers.Texture import Texture
 
 
@@ -47,6 +60,110 @@ uvs = [[np.array([0, 0]), np.array([0, 0]), np.array([0, 1])],
        [np.array([1, 1]), np.array([1, 0.5]), np.array([1, 0])]]
 
 
+def create_feature_list(name, offsets):
+    """
+    Create a FeatureList where each feature is a copy of the triangles, translated by an offset.
+    """
+    features = list()
+    for i, offset in enumerate(offsets):
+        feature = Feature(name + "_" + str(i))
+        feature.geom.triangles.append(np.array(triangles) + offset)
+        feature.set_box()
+        features.append(feature)
+    return FeatureList(features)
+
+
+def read_tileset(output_dir):
+    """
+    Read the tileset.json and the names of the tiles written in a directory.
+    """
+    with open(Path(output_dir, 'tileset.json')) as tileset_file:
+        return tileset_file.read(), sorted(os.listdir(Path(output_dir, 'tiles')))
+
+
+def read_batch_table_ids(b3dm_path):
+    """
+    Read the ids stored in the batch table of a b3dm tile.
+    """
+    with open(b3dm_path, 'rb') as b3dm_file:
+        header = b3dm_file.read(28)
+        feature_table_length = struct.unpack('<4sIIIIII', header)[3:5]
+        batch_table_json_length = struct.unpack('<4sIIIIII', header)[5]
+        b3dm_file.seek(28 + sum(feature_table_length))
+        return json.loads(b3dm_file.read(batch_table_json_length))['id']
+
+
+def create_wkb_multipolygon(polygons, byte_order='<'):
+    """
+    Create the WKB of a multipolygon. The polygons are lists of rings, the rings are lists of 3D (or 2D) points.
+    """
+    flag = 1 if byte_order == '<' else 0
+    with_z = len(polygons[0][0][0]) == 3
+    wkb = struct.pack(byte_order + 'bII', flag, 1006 if with_z else 6, len(polygons))
+    for rings in polygons:
+        wkb += struct.pack(byte_order + 'bII', flag, 1003 if with_z else 3, len(rings))
+        for ring in rings:
+            wkb += struct.pack(byte_order + 'I', len(ring) + 1)
+            for point in list(ring) + [ring[0]]:
+                wkb += struct.pack(byte_order + ('ddd' if with_z else 'dd'), *point)
+    return wkb
+
+
+def get_vector_area(triangles):
+    """
+    Return the sum of the cross products of the edges of the triangles, which doesn't depend on the triangulation of a planar polygon.
+    """
+    triangles = np.array(triangles, dtype=np.float64).reshape(-1, 3, 3)
+    return np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]).sum(axis=0)
+
+
+def create_gltf(feature_list, **writer_args):
+    """
+    Create the glTF of the features of a FeatureList, with a single material.
+    """
+    features = feature_list.get_features()
+    return GlTFWriter(**writer_args).create_gltf(features, [0] * len(features), [GlTFMaterial()], np.identity(4).flatten())
+
+
+def get_attribute(gltf, name, primitive_index=0):
+    """
+    Read the values of an attribute (or of the indices when name is 'indices') of a primitive of a glTF.
+    """
+    primitive = gltf.header['meshes'][0]['primitives'][primitive_index]
+    accessor_index = primitive['indices'] if name == 'indices' else primitive['attributes'][name]
+    return TileCompressor.get_accessor_data(gltf.header, gltf.body, accessor_index)
+
+
+def get_box_extent(box, position):
+    """
+    Return the mins and maxs of a box of a tileset.json, translated by the position of its tile.
+    """
+    center = np.array(box[:3]) + position
+    half_size = np.abs(np.array(box[3:]).reshape(3, 3)).sum(axis=0)
+    return center - half_size, center + half_size
+
+
+def create_side_triangles(ring, height):
+    """
+    Create the wall triangles of an extruded ring one by one, in the same order and winding as the triangles of the walls of a GeoJson feature.
+    """
+    length = len(ring)
+    vertices = [np.array(coord, dtype=np.float64) for coord in ring] + [np.array(coord, dtype=np.float64) + [0, 0, height] for coord in ring]
+    side_triangles = list()
+    for i in range(0, length):
+        side_triangles.append([vertices[i], vertices[length + i], vertices[length + ((i + 1) % length)]])
+        side_triangles.append([vertices[i], vertices[length + ((i + 1) % length)], vertices[((i + 1) % length)]])
+    return side_triangles
+
+
+def rotate_triangles(indices):
+    """
+    Rotate the indices of each triangle so they start with the lowest index, keeping the winding order.
+    """
+    shifts = np.argmin(indices, axis=1)[:, np.newaxis]
+    return np.take_along_axis(indices, (shifts + np.arange(3)) % 3, axis=1)
+
+
 class Test_Tile(unittest.TestCase):
     def test_kd_tree(self):
         feature = Feature("kd_tree")
@@ -62,6 +179,357 @@ class Test_Tile(unittest.TestCase):
 
         tileset.write_as_json(tiler.args.output_dir)
 
+    def test_jobs(self):
+        outputs = list()
+        for jobs in [1, 2]:
+            feature_list = create_feature_list("jobs", [[i * 1000, (i % 3) * 1000, 0] for i in range(10)])
+
+            tiler = Tiler()
+            tiler.args = get_default_namespace()
+            tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/jobs_' + str(jobs))
+            tiler.args.kd_tree_max = 2
+            tiler.args.lod1 = True
+            tiler.args.jobs = jobs
+
+            tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+            tileset.write_as_json(tiler.args.output_dir)
+            outputs.append(read_tileset(tiler.args.output_dir))
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertGreater(len(outputs[0][1]), 5)
+
+    def test_max_tile_size(self):
+        max_tile_size = 0.0012
+        feature_list = create_feature_list("max_tile_size", [[i * 1000, 0, 0] for i in range(10)])
+        groups = Groups(feature_list, kd_tree_max=100, max_tile_size=max_tile_size * 1e6).get_groups_as_list()
+        self.assertGreater(len(groups), 1)
+        for group in groups:
+            self.assertLessEqual(sum(feature.get_size_estimate() for feature in group.feature_list), max_tile_size * 1e6)
+
+        tiler = Tiler()
+        tiler.args = get_default_namespace()
+        tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/max_tile_size')
+        tiler.args.max_tile_size = max_tile_size
+
+        tileset = tiler.create_tileset_from_feature_list(create_feature_list("max_tile_size", [[i * 1000, 0, 0] for i in range(10)]))
+
+        tileset.write_as_json(tiler.args.output_dir)
+
+    def test_kd_tree_indices_with_weights(self):
+        rng = np.random.default_rng(0)
+        centroids = rng.random((200, 2)) * 1000
+        weights = rng.random(200) * 10
+        groups = kd_tree_indices(centroids, 30, weights=weights, max_weight=50)
+        self.assertEqual(sorted(np.concatenate(groups).tolist()), list(range(200)))
+        for group in groups:
+            self.assertLessEqual(len(group), 30)
+            self.assertLessEqual(weights[group].sum(), 50)
+
+    def test_wkb_decoder(self):
+        # Planar polygons: triangles, convex quads (in random planes, in both orientations), concave, vertical
+        # and degenerated quads, a pentagon and a polygon with a hole
+        rng = np.random.default_rng(0)
+        polygons = [[[[0, 0, 0], [10, 0, 0], [0, 10, 1]]],
+                    [[[0, 10, 1], [10, 0, 0], [0, 0, 0]]],
+                    [[[0, 0, 0], [10, 0, 0], [1, 1, 0], [0, 10, 0]]],
+                    [[[0, 0, 0], [10, 0, 0], [10, 0, 5], [0, 0, 5]]],
+                    [[[0, 0, 0], [5, 0, 0], [10, 0, 0], [0, 10, 0]]],
+                    [[[0, 0, 0], [10, 0, 0], [12, 5, 2], [5, 10, 3], [-2, 5, 1]]],
+                    [[[0, 0, 0], [10, 0, 0], [10, 10, 0], [0, 10, 0]], [[3, 3, 0], [3, 7, 0], [7, 7, 0], [7, 3, 0]]]]
+        for _ in range(20):
+            axes = np.linalg.qr(rng.normal(size=(3, 3)))[0][:, :2]
+            angles = np.sort(rng.random(4)) * 2 * np.pi
+            quad = (np.column_stack((np.cos(angles), np.sin(angles))) * rng.uniform(1, 10, (4, 1))) @ axes.T + [100, 200, 50]
+            polygons.append([quad.tolist() if rng.random() < 0.5 else quad[::-1].tolist()])
+
+        for byte_order in '<>':
+            # Each polygon has the same number of triangles and covers the same area as with py3dtiles
+            all_triangles = list()
+            for polygon in polygons:
+                wkb = create_wkb_multipolygon([polygon], byte_order)
+                triangles = triangle_soup_from_wkb_multipolygon(wkb).triangles[0]
+                expected_triangles = TriangleSoup.from_wkb_multipolygon(wkb).triangles[0]
+                self.assertEqual(len(triangles), len(expected_triangles))
+                np.testing.assert_allclose(get_vector_area(triangles), get_vector_area(expected_triangles), atol=1e-3)
+                all_triangles.append(triangles)
+
+            # The triangles of a multipolygon are in the order of the polygons
+            triangles = triangle_soup_from_wkb_multipolygon(create_wkb_multipolygon(polygons, byte_order)).triangles[0]
+            np.testing.assert_array_equal(triangles, np.concatenate(all_triangles))
+
+            # The data attached to the vertices (e.g. UVs) follow their vertices
+            uvs = [[[[point[0] / 10, point[1] / 10] for point in ring] for ring in polygon] for polygon in polygons]
+            triangle_soup = triangle_soup_from_wkb_multipolygon(create_wkb_multipolygon(polygons, byte_order), [create_wkb_multipolygon(uvs, byte_order)])
+            np.testing.assert_allclose(triangle_soup.triangles[1], triangle_soup.triangles[0][:, :, :2] / 10)
+
+    def test_wkb_decoder_differences(self):
+        # The coordinates are read as float64, py3dtiles reads them as float32
+        wkb = create_wkb_multipolygon([[[[1843366.125, 5174473.375, 200.5], [1843466.25, 5174373.5, 400], [1843566, 5174473, 200]]]])
+        self.assertEqual(triangle_soup_from_wkb_multipolygon(wkb).triangles[0][0, 0].tolist(), [1843366.125, 5174473.375, 200.5])
+
+        # A non-planar quad is always split along its diagonal (0, 2). py3dtiles triangulates its projection on the plane
+        # of its first corner, which can drop a triangle or use the other diagonal
+        quad = [[0, 0, 0], [10, 0, 3], [10, 10, 0], [0, 10, 3]]
+        triangles = triangle_soup_from_wkb_multipolygon(create_wkb_multipolygon([[quad]])).triangles[0]
+        np.testing.assert_array_equal(triangles, np.array(quad)[[[0, 1, 2], [0, 2, 3]]])
+
+    def test_tile_hierarchy(self):
+        for lod1 in [False, True]:
+            feature_list = create_feature_list("tile_hierarchy", [[(i % 5) * 1000, (i // 5) * 1000, 0] for i in range(20)])
+
+            tiler = Tiler()
+            tiler.args = get_default_namespace()
+            tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/tile_hierarchy' + ('_lod1' if lod1 else ''))
+            tiler.args.kd_tree_max = 1
+            tiler.args.tile_hierarchy = 'quadtree'
+            tiler.args.lod1 = lod1
+
+            tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+            tileset.write_as_json(tiler.args.output_dir)
+            with open(Path(tiler.args.output_dir, 'tileset.json')) as tileset_file:
+                root = json.load(tileset_file)['root']
+            self.assertLess(len(root['children']), 20)
+
+            nb_tiles_with_content = 0
+            nodes = [(child, np.zeros(3)) for child in root['children']]
+            while nodes:
+                node, parent_position = nodes.pop()
+                children = node.get('children', [])
+                self.assertLessEqual(len(children), 8)
+                position = parent_position + node['transform'][12:15]
+                mins, maxs = get_box_extent(node['boundingVolume']['box'], position)
+                for child in children:
+                    self.assertGreaterEqual(node['geometricError'], child['geometricError'])
+                    child_mins, child_maxs = get_box_extent(child['boundingVolume']['box'], position + child['transform'][12:15])
+                    self.assertTrue(np.all(mins <= child_mins + 1e-6) and np.all(child_maxs <= maxs + 1e-6))
+                nb_tiles_with_content += 'content' in node
+                nodes.extend((child, position) for child in children)
+            self.assertEqual(nb_tiles_with_content, 40 if lod1 else 20)
+
+    def test_indexed(self):
+        feature_list = create_feature_list("indexed", [[i * 1000, 0, 0] for i in range(3)])
+
+        tiler = Tiler()
+        tiler.args = get_default_namespace()
+        tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/indexed')
+        tiler.args.indexed = True
+
+        tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+        tileset.write_as_json(tiler.args.output_dir)
+
+        feature_list = create_feature_list("indexed", [[i * 1000, 0, 0] for i in range(3)])
+        gltf = create_gltf(feature_list)
+        indexed_gltf = create_gltf(feature_list, indexed=True)
+        self.assertNotIn('indices', gltf.header['meshes'][0]['primitives'][0])
+        self.assertIn('indices', indexed_gltf.header['meshes'][0]['primitives'][0])
+        positions = get_attribute(gltf, 'POSITION')
+        indexed_positions = get_attribute(indexed_gltf, 'POSITION')
+        self.assertLess(len(indexed_positions), len(positions))
+        # The indices rebuild the triangles of the non-indexed glTF
+        indices = get_attribute(indexed_gltf, 'indices').reshape(-1)
+        np.testing.assert_array_equal(indexed_positions[indices], positions)
+
+    def test_weld_vertices(self):
+        positions = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=np.float32)
+        # A negative zero is equal to a zero
+        normals = np.array([[0, 0, 1], [0, 0, 1], [0, 0, 1], [-0., 0, 1], [0, -0., 1], [0, 0, 1]], dtype=np.float32)
+        attributes = {'POSITION': positions, 'NORMAL': normals, '_BATCHID': np.zeros(6, dtype=np.float32)}
+        welded_attributes, ranges, indices = GlTFWriter.weld_vertices(attributes, [(0, 0, 6)])
+        np.testing.assert_array_equal(welded_attributes['POSITION'], positions[[0, 1, 2, 5]])
+        self.assertEqual(ranges, [(0, 0, 4)])
+        np.testing.assert_array_equal(indices[0], [0, 1, 2, 1, 2, 3])
+
+        # The vertices of different features aren't welded
+        attributes['_BATCHID'] = np.array([0, 0, 0, 1, 1, 1], dtype=np.float32)
+        welded_attributes, ranges, indices = GlTFWriter.weld_vertices(attributes, [(0, 0, 6)])
+        self.assertEqual(len(welded_attributes['POSITION']), 6)
+        np.testing.assert_array_equal(indices[0], np.arange(6))
+
+    def test_smooth_normals(self):
+        feature_list = create_feature_list("smooth_normals", [[0, 0, 0]])
+
+        tiler = Tiler()
+        tiler.args = get_default_namespace()
+        tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/smooth_normals')
+        tiler.args.obj = Path('tests/tiler_test_data/generated_objs/smooth_normals.obj')
+        tiler.args.smooth_normals = 60.
+
+        tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+        tileset.write_as_json(tiler.args.output_dir)
+
+        flat_normals = compute_vertex_normals(triangles)
+        face_normals = flat_normals[:, 0]
+        np.testing.assert_allclose(flat_normals, np.repeat(face_normals[:, np.newaxis], 3, axis=1))
+
+        # The top of the pyramid is shared by the 4 sides, its normal is the average of their normals
+        smooth_normals = compute_vertex_normals(triangles, 180)
+        for i in range(4):
+            np.testing.assert_allclose(smooth_normals[i, 1], [0, 0, 1], atol=1e-9)
+        np.testing.assert_allclose(np.linalg.norm(smooth_normals, axis=2), 1)
+
+        # The sides are more than 60 degrees apart, so the edges stay sharp, the two triangles of the base are coplanar
+        np.testing.assert_allclose(compute_vertex_normals(triangles, 60), flat_normals, atol=1e-9)
+
+        # A corner at -0.0 is at the same position as a corner at 0.0
+        centered_triangles = np.array(triangles, dtype=np.float64) - [1843466, 5174373, 0]
+        centered_triangles[0, 1, 0] = -0.
+        np.testing.assert_allclose(compute_vertex_normals(centered_triangles, 180), smooth_normals, atol=1e-9)
+
+        # The triangles of different features are never averaged
+        separated_normals = compute_vertex_normals(triangles, 180, groups=[0, 1, 2, 3, 4, 4])
+        np.testing.assert_allclose(separated_normals[:4], flat_normals[:4], atol=1e-9)
+
+    def test_quantize(self):
+        feature_list = create_feature_list("quantize", [[0, 0, 0]])
+
+        tiler = Tiler()
+        tiler.args = get_default_namespace()
+        tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/quantize')
+        tiler.args.quantize = True
+        tiler.args.indexed = True
+
+        tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+        tileset.write_as_json(tiler.args.output_dir)
+
+        gltf = create_gltf(create_feature_list("quantize", [[0, 0, 0]]), quantized=True)
+        attributes = gltf.header['meshes'][0]['primitives'][0]['attributes']
+        self.assertEqual(gltf.header['accessors'][attributes['POSITION']]['componentType'], GlTFWriter.SHORT)
+        self.assertEqual(gltf.header['accessors'][attributes['NORMAL']]['componentType'], GlTFWriter.BYTE)
+        self.assertTrue(gltf.header['accessors'][attributes['NORMAL']]['normalized'])
+        self.assertIn('KHR_mesh_quantization', gltf.header['extensionsUsed'])
+        self.assertIn('KHR_mesh_quantization', gltf.header['extensionsRequired'])
+
+        # The matrix of the node dequantizes the positions
+        matrix = np.array(gltf.header['nodes'][0]['matrix']).reshape(4, 4).T
+        quantized_positions = get_attribute(gltf, 'POSITION').astype(np.float64)
+        positions = (matrix[:3, :3] @ quantized_positions.T).T + matrix[:3, 3]
+        np.testing.assert_allclose(positions, np.array(triangles).reshape(-1, 3), atol=0.01)
+
+    @unittest.skipUnless(MeshoptCompressor.is_available(), 'meshoptimizer is not installed')
+    def test_meshopt_compression(self):
+        feature_list = create_feature_list("meshopt_compression", [[0, 0, 0]])
+
+        tiler = Tiler()
+        tiler.args = get_default_namespace()
+        tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/meshopt_compression')
+        tiler.args.indexed = True
+        tiler.args.quantize = True
+        tiler.args.compression = 'meshopt'
+
+        tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+        tileset.write_as_json(tiler.args.output_dir)
+
+        gltf = create_gltf(create_feature_list("meshopt_compression", [[0, 0, 0]]), indexed=True, quantized=True)
+        compressed_gltf = create_gltf(create_feature_list("meshopt_compression", [[0, 0, 0]]), indexed=True, quantized=True,
+                                      compressor=MeshoptCompressor())
+        self.assertIn('EXT_meshopt_compression', compressed_gltf.header['extensionsRequired'])
+
+        # Each buffer view is decoded back to the uncompressed data
+        meshoptimizer = MeshoptCompressor.get_module()
+        for buffer_view, compressed_view in zip(gltf.header['bufferViews'], compressed_gltf.header['bufferViews']):
+            extension = compressed_view['extensions']['EXT_meshopt_compression']
+            start = extension['byteOffset']
+            encoded_view = compressed_gltf.body[start:start + extension['byteLength']].tobytes()
+            data = gltf.body[buffer_view['byteOffset']:buffer_view['byteOffset'] + buffer_view['byteLength']]
+            if extension['mode'] == 'ATTRIBUTES':
+                decoded_view = meshoptimizer.decode_vertex_buffer(extension['count'], extension['byteStride'], encoded_view)
+                self.assertEqual(np.asarray(decoded_view).tobytes(), data.tobytes())
+            else:
+                # The index codec may rotate the vertices of a triangle, the triangles start at their lowest index to be compared
+                decoded_indices = np.asarray(meshoptimizer.decode_index_buffer(extension['count'], 4, encoded_view)).reshape(-1, 3)
+                indices = get_attribute(gltf, 'indices').reshape(-1, 3)
+                self.assertEqual(rotate_triangles(decoded_indices).tolist(), rotate_triangles(indices).tolist())
+
+    @unittest.skipUnless(DracoCompressor.is_available(), 'DracoPy is not installed')
+    def test_draco_compression(self):
+        gltf = create_gltf(create_feature_list("draco_compression", [[i * 1000, 0, 0] for i in range(3)]), indexed=True,
+                           compressor=DracoCompressor())
+        self.assertIn('KHR_draco_mesh_compression', gltf.header['extensionsRequired'])
+
+        # The primitive is decoded back, the ids of its attributes point to the Draco attributes of the right type
+        DracoPy = DracoCompressor.get_module()
+        primitive = gltf.header['meshes'][0]['primitives'][0]
+        extension = primitive['extensions']['KHR_draco_mesh_compression']
+        buffer_view = gltf.header['bufferViews'][extension['bufferView']]
+        mesh = DracoPy.decode(gltf.body[buffer_view['byteOffset']:buffer_view['byteOffset'] + buffer_view['byteLength']].tobytes())
+        draco_attributes = {attribute['unique_id']: attribute for attribute in mesh.attributes}
+        self.assertEqual(sorted(extension['attributes']), sorted(primitive['attributes']))
+        expected_types = {'POSITION': (DracoCompressor.POSITION, 3), 'NORMAL': (DracoCompressor.NORMAL, 3), '_BATCHID': (4, 1)}
+        for name, draco_id in extension['attributes'].items():
+            attribute = draco_attributes[draco_id]
+            self.assertEqual((attribute['attribute_type'], attribute['num_components']), expected_types[name])
+            self.assertEqual(gltf.header['accessors'][primitive['attributes'][name]]['count'], len(mesh.points))
+        self.assertEqual(gltf.header['accessors'][primitive['indices']]['count'], np.size(mesh.faces))
+        self.assertEqual(len(mesh.faces), 3 * len(triangles))
+
+        # The batch ids are encoded losslessly, the positions are quantized
+        batch_ids = draco_attributes[extension['attributes']['_BATCHID']]['data']
+        self.assertEqual(sorted(set(np.asarray(batch_ids).reshape(-1).tolist())), [0, 1, 2])
+        positions = np.array(triangles).reshape(-1, 3)
+        np.testing.assert_allclose(np.min(mesh.points, axis=0), positions.min(axis=0), atol=0.5)
+        np.testing.assert_allclose(np.max(mesh.points, axis=0), positions.max(axis=0) + [2000, 0, 0], atol=0.5)
+
+    def test_extrude_rings(self):
+        exterior_ring = [[0, 0, 5], [10, 0, 5], [10, 10, 5], [0, 10, 5]]
+        interior_ring = [[2, 2, 5], [2, 4, 5], [4, 4, 5], [4, 2, 5]]
+        # The triangulation of the square with a hole, indexing the points of both rings
+        roof_triangles = [[0, 1, 7], [0, 7, 4], [1, 2, 6], [1, 6, 7], [2, 3, 5], [2, 5, 6], [3, 0, 4], [3, 4, 5]]
+        points = np.array(exterior_ring + interior_ring, dtype=np.float64)
+        walls = create_side_triangles(exterior_ring, 3) + create_side_triangles(interior_ring, 3)
+
+        triangles = extrude_rings([exterior_ring, interior_ring], roof_triangles, 3)
+        self.assertEqual(triangles.shape, (8 + 2 * 8, 3, 3))
+        np.testing.assert_array_equal(triangles[:8], points[roof_triangles] + [0, 0, 3])
+        np.testing.assert_array_equal(triangles[8:], walls)
+        np.testing.assert_allclose(get_vector_area(triangles[:8]), [0, 0, 2 * 96])
+
+        triangles = extrude_rings([exterior_ring, interior_ring], roof_triangles, 3, with_floor=True)
+        self.assertEqual(triangles.shape, (2 * 8 + 2 * 8, 3, 3))
+        np.testing.assert_array_equal(triangles[:8], points[roof_triangles] + [0, 0, 3])
+        # The floor faces down
+        np.testing.assert_array_equal(triangles[8:16], points[np.array(roof_triangles)[:, ::-1]])
+        np.testing.assert_allclose(get_vector_area(triangles[8:16]), [0, 0, -2 * 96])
+        np.testing.assert_array_equal(triangles[16:], walls)
+
+        # The roof triangles index their own vertices (e.g. the vertices of a triangulation adding points),
+        # while the walls are still created from the rings
+        roof_vertices = np.array([[5, 5, 5], [0, 0, 5], [10, 0, 5], [10, 10, 5]], dtype=np.float64)
+        triangles = extrude_rings([exterior_ring, interior_ring], [[1, 2, 0], [2, 3, 0]], 3, roof_vertices=roof_vertices, with_floor=True)
+        self.assertEqual(triangles.shape, (2 * 2 + 2 * 8, 3, 3))
+        np.testing.assert_array_equal(triangles[:2], [[[0, 0, 8], [10, 0, 8], [5, 5, 8]], [[10, 0, 8], [10, 10, 8], [5, 5, 8]]])
+        np.testing.assert_array_equal(triangles[2:4], [[[5, 5, 5], [10, 0, 5], [0, 0, 5]], [[5, 5, 5], [10, 10, 5], [10, 0, 5]]])
+        np.testing.assert_array_equal(triangles[4:], walls)
+
+    def test_find_containing_polygons(self):
+        polygons = [Polygon([[2, 2], [4, 2], [4, 4], [2, 4]]),
+                    Polygon([[0, 0], [10, 0], [10, 10], [0, 10]]),
+                    Polygon([[1, 1], [5, 1], [5, 5], [1, 5]]),
+                    Polygon([[20, 0], [30, 0], [30, 10], [20, 10]])]
+        centroids = np.array([[3, 3, 7],  # In the first three polygons
+                              [8, 8, 7],  # Only in the second polygon
+                              [4.5, 4.5, 7],  # In the second and third polygons
+                              [2, 3, 7],  # On the boundary of the first polygon, inside the second and third ones
+                              [10, 5, 7],  # On the boundary of the second polygon only
+                              [20, 0, 7],  # On a corner of the last polygon
+                              [15, 5, 7],  # Between the polygons
+                              [-5, -5, 7]])  # Outside of all the polygons
+        polygon_indices = find_containing_polygons(centroids, polygons)
+        np.testing.assert_array_equal(polygon_indices, [0, 1, 1, 1, -1, -1, -1, -1])
+
+        # Same result as testing each point with each polygon, in order
+        expected = [next((i for i, polygon in enumerate(polygons) if Point(centroid[:2]).within(polygon)), -1) for centroid in centroids]
+        np.testing.assert_array_equal(polygon_indices, expected)
+        np.testing.assert_array_equal(find_containing_polygons(centroids[:, :2], polygons[::-1]), [1, 2, 1, 1, -1, -1, -1, -1])
+
+        self.assertEqual(find_containing_polygons(np.empty((0, 3)), polygons).tolist(), [])
+        self.assertEqual(find_containing_polygons([], polygons).tolist(), [])
+        np.testing.assert_array_equal(find_containing_polygons(centroids, []), [-1] * len(centroids))
+
     def test_lod1(self):
         feature = Feature("lod1")
         feature.geom.triangles.append(triangles)
@@ -91,6 +559,31 @@ class Test_Tile(unittest.TestCase):
 
         tileset.write_as_json(tiler.args.output_dir)
 
+    def test_loa_ids(self):
+        outputs = list()
+        for jobs in [1, 2]:
+            feature_list = create_feature_list("feature", [[i * 1000, 0, 0] for i in range(4)])
+
+            tiler = Tiler()
+            tiler.args = get_default_namespace()
+            tiler.args.output_dir = Path('tests/tiler_test_data/generated_tilesets/loa_ids_' + str(jobs))
+            tiler.args.loa = Path('tests/tiler_test_data/loa_polygons')
+            tiler.args.kd_tree_max = 1
+            tiler.args.jobs = jobs
+            tileset = tiler.create_tileset_from_feature_list(feature_list)
+
+            tileset.write_as_json(tiler.args.output_dir)
+            outputs.append(read_tileset(tiler.args.output_dir))
+
+            # Each tile has its own LOA, whose id is unique in the tileset
+            ids = list()
+            for tile_name in outputs[-1][1]:
+                ids.extend(read_batch_table_ids(Path(tiler.args.output_dir, 'tiles', tile_name)))
+            loa_ids = [id for id in ids if id.startswith('loa_')]
+            self.assertEqual(len(loa_ids), 4)
+            self.assertEqual(len(set(loa_ids)), 4)
+        self.assertEqual(outputs[1], outputs[0])
+
     def test_change_crs(self):
         feature = Feature("change_crs")
         feature.geom.triangles.append(triangles)